@@ -3,7 +3,8 @@ from flask_cors import CORS
 import os
 
 app = Flask(__name__)
-CORS(app)
+# En-têtes lisibles par le frontend (jeton de session, infos de l'image renvoyée en PNG)
+CORS(app, expose_headers=['X-Session-Id', 'X-Artifact-Url', 'X-Cipher-Mode', 'X-Cipher-Tiles'])
 
 # Ensure export directories exist
 EXPORT_DIR = os.path.join(app.root_path, 'static', 'exports')
@@ -17,31 +18,32 @@ from routes.encryption import encryption_bp
 from routes.decryption import decryption_bp
 from routes.analysis import analysis_bp
 from routes.export import export_bp
+from routes.charts import charts_bp
+from routes.jobs import jobs_bp
+from routes.artifacts import artifacts_bp
 
 app.register_blueprint(encryption_bp)
 app.register_blueprint(decryption_bp)
 app.register_blueprint(analysis_bp)
 app.register_blueprint(export_bp)
+app.register_blueprint(charts_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(artifacts_bp)
+
+from shared_state import attach_session_token
+app.after_request(attach_session_token)
 
 def clean_on_startup():
-    import os
-    import glob
+    # Same prefixes as the age-based cleanup (any extension: .png, raw .chaos, decrypt uploads)
+    from services import artifacts
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        static_dir = os.path.join(base_dir, 'static')
-        patterns = ['temp_*.png', 'encrypted_*.png', 'decrypted_*.png', 'temp_upload_*.png']
-        count = 0
-        for p in patterns:
-            for f in glob.glob(os.path.join(static_dir, p)):
-                try:
-                    os.remove(f)
-                    count += 1
-                except Exception:
-                    pass
-        print(f"Startup Cleanup: Removed {count} temporary files from static/.")
+        count = artifacts.cleanup(max_age=0)
+        print(f"Startup Cleanup: Removed {count} temporary files and chart folders from static/.")
     except Exception as e:
         print(f"Startup Cleanup Failed: {e}")
 
 if __name__ == '__main__':
     clean_on_startup()
+    from services.chaotic_maps import ChaoticMaps
+    print(f"Chaos kernels backend: {ChaoticMaps.get_backend()}")
     app.run(debug=True, use_reloader=False, port=5000)
@@ -0,0 +1,101 @@
+# Paramètres de déploiement du backend.
+# Chaque valeur peut être surchargée par une variable d'environnement du même nom.
+import os
+
+# Backend des noyaux chaotiques: 'auto' (numba si disponible), 'numba' ou 'python'
+CHAOS_KERNEL_BACKEND = os.environ.get('CHAOS_KERNEL_BACKEND', 'auto').lower()
+
+# Taille maximale (octets) du cache LRU des KeySchedule partagé par le processus
+KEY_SCHEDULE_CACHE_BYTES = int(os.environ.get('KEY_SCHEDULE_CACHE_BYTES', 512 * 1024 * 1024))
+
+# Taille maximale (octets) du cache d'orbites chaotiques extensibles par préfixe (0 = désactivé)
+SEQUENCE_CACHE_BYTES = int(os.environ.get('SEQUENCE_CACHE_BYTES', 256 * 1024 * 1024))
+
+# Keystream: 'auto' (flux par blocs si les orbites ne tiennent pas dans le cache de séquences),
+# 'stream' (toujours par blocs, aucune orbite flottante complète) ou 'cached'
+KEYSTREAM_MODE = os.environ.get('KEYSTREAM_MODE', 'auto').lower()
+# Nombre d'échantillons par bloc en mode flux
+KEYSTREAM_BLOCK_SIZE = int(os.environ.get('KEYSTREAM_BLOCK_SIZE', 1 << 16))
+# Index de points de reprise du keystream (déchiffrement d'une région): état (u, v, w)
+# conservé tous les KEYSTREAM_CHECKPOINT_INTERVAL échantillons, index gardés en cache LRU
+KEYSTREAM_CHECKPOINT_INTERVAL = int(os.environ.get('KEYSTREAM_CHECKPOINT_INTERVAL', 1 << 16))
+KEYSTREAM_INDEX_CACHE_SIZE = int(os.environ.get('KEYSTREAM_INDEX_CACHE_SIZE', 32))
+
+# Calcul simultané des 3 cartes: 'auto', 'off', 'thread' (noyaux numba sans GIL) ou 'process'
+CHAOS_PARALLEL_MODE = os.environ.get('CHAOS_PARALLEL_MODE', 'auto').lower()
+# Nombre de threads / processus dédiés aux cartes (au plus 3 sont utiles par requête)
+CHAOS_WORKERS = int(os.environ.get('CHAOS_WORKERS', 3))
+# En dessous de cette longueur, le coût de répartition dépasse le gain: calcul séquentiel
+CHAOS_PARALLEL_MIN_LENGTH = int(os.environ.get('CHAOS_PARALLEL_MIN_LENGTH', 1 << 16))
+
+# Mode de chaînage par défaut: 'cbc' (chaîne unique, référence NPCR/UACI) ou 'tiled'
+CIPHER_MODE = os.environ.get('CIPHER_MODE', 'cbc').lower()
+# Mode 'tiled': nombre de segments par défaut et de processus de chiffrement
+CBC_TILES = int(os.environ.get('CBC_TILES', os.cpu_count() or 1))
+CBC_TILE_WORKERS = int(os.environ.get('CBC_TILE_WORKERS', os.cpu_count() or 1))
+
+# Balayage différentiel multi-positions (NPCR/UACI): taille du pool de processus (plafond du
+# paramètre `workers`) et nombre maximal de positions
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', os.cpu_count() or 1))
+SWEEP_MAX_POSITIONS = int(os.environ.get('SWEEP_MAX_POSITIONS', 1000))
+
+# File de jobs asynchrones (?async=1): threads de travail, profondeur maximale (429 au-delà)
+# et durée de conservation des jobs terminés
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_DEPTH = int(os.environ.get('JOB_QUEUE_DEPTH', 16))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 600))
+
+# Flux de progression (SSE): intervalle minimal entre deux événements 'progress' (secondes)
+PROGRESS_INTERVAL = float(os.environ.get('PROGRESS_INTERVAL', 0.25))
+# Délai sans événement après lequel le flux SSE envoie un commentaire keep-alive
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
+# Sessions par client: inactivité avant suppression, plafonds mémoire (tableaux décodés
+# et key schedule) par session et pour l'ensemble des sessions, nombre maximal de sessions
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 1800))
+SESSION_MAX_BYTES = int(os.environ.get('SESSION_MAX_BYTES', 256 * 1024 * 1024))
+SESSIONS_MAX_BYTES = int(os.environ.get('SESSIONS_MAX_BYTES', 1024 * 1024 * 1024))
+SESSION_MAX_COUNT = int(os.environ.get('SESSION_MAX_COUNT', 1000))
+
+# État partagé entre processus (plusieurs workers WSGI): 'sqlite' (index local, sans service
+# externe) ou 'memory' (état propre à chaque processus, un seul worker)
+STATE_BACKEND = os.environ.get('STATE_BACKEND', 'sqlite').lower()
+STATE_DB_PATH = os.environ.get('STATE_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'state.sqlite3'))
+# Durée de conservation des fichiers produits (uploads, chiffrés, déchiffrés, graphes par session)
+ARTIFACT_RETENTION_SECONDS = int(os.environ.get('ARTIFACT_RETENTION_SECONDS', SESSION_TTL_SECONDS))
+
+# Images chiffrées/déchiffrées: 'disk' (fichiers de static/, partagés entre workers) ou
+# 'memory' (décodage depuis l'upload, PNG servis depuis un cache du processus, aucun fichier
+# temporaire; un seul worker ou routage collant). Surchargeable par requête (champ `store`).
+ARTIFACT_STORE = os.environ.get('ARTIFACT_STORE', 'disk').lower()
+ARTIFACT_CACHE_BYTES = int(os.environ.get('ARTIFACT_CACHE_BYTES', 256 * 1024 * 1024))
+
+# Format de l'image chiffrée: 'png' (compressé), 'png-stored' (PNG sans compression, affichable
+# par le navigateur) ou 'raw' (conteneur .chaos relu par memory-map). Le chiffré est
+# incompressible: deflate ne fait que coûter du CPU. Surchargeable par requête (champ `format`).
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'png').lower()
+
+# Rendu des graphes (histogrammes, corrélations, cartes, S-Box, métriques):
+# 'auto' (processus si plusieurs cœurs), 'process' (pool de processus), 'thread' ou 'off'
+# (séquentiel dans la requête)
+PLOT_POOL = os.environ.get('PLOT_POOL', 'auto').lower()
+PLOT_WORKERS = int(os.environ.get('PLOT_WORKERS', min(4, os.cpu_count() or 1)))
+# Résolution des PNG produits
+PLOT_DPI = int(os.environ.get('PLOT_DPI', 300))
+# Moteur de rendu: 'matplotlib' ou 'native' (NumPy + Pillow, sans import de matplotlib,
+# rendu bien plus rapide; apparence proche mais non identique)
+PLOT_BACKEND = os.environ.get('PLOT_BACKEND', 'matplotlib').lower()
+# Police TrueType du moteur natif (chemin ou nom de fichier; police Pillow par défaut si introuvable)
+PLOT_FONT = os.environ.get('PLOT_FONT', 'DejaVuSans.ttf')
+# Graphes des réponses interactives (/api/encrypt, /api/analysis): 'data' (séries JSON
+# tracées par le frontend, PNG rendus seulement à l'export ZIP) ou 'png' (rendu serveur
+# à chaque requête). Surchargeable par requête (paramètre `charts`)
+CHARTS = os.environ.get('CHARTS', 'data').lower()
+
+# Cache des résultats adressé par contenu (empreinte de l'upload + paramètres + version du
+# chiffrement): chiffré, journal, données des graphes et métriques d'analyse réutilisés quand la
+# même image est renvoyée avec la même clé. Niveau mémoire par processus, niveau disque partagé
+# (0 désactive un niveau)
+RESULT_CACHE_BYTES = int(os.environ.get('RESULT_CACHE_BYTES', 256 * 1024 * 1024))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'results'))
+RESULT_CACHE_DISK_BYTES = int(os.environ.get('RESULT_CACHE_DISK_BYTES', 1024 * 1024 * 1024))
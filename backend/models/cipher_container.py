@@ -0,0 +1,110 @@
+# Conteneur brut du chiffré ('.chaos'), alternative au PNG.
+#
+# Le chiffré est quasi uniforme: la compression deflate du PNG coûte du CPU sans rien gagner.
+# Le conteneur stocke un en-tête fixe de 64 octets suivi du vecteur chiffré X' tel quel
+# (ordre planaire R...G...B, celui de ImageProcessor.vectorize), lisible par memory-map.
+#
+# En-tête (little-endian):
+#   magic (8) | version du conteneur (u16) | version du chiffrement (u8) | mode (u8)
+#   | segments (u32) | N (u32) | M (u32) | canaux (u8) | longueur du key check (u8)
+#   | key check (16, zéros si absent, voir services/key_check) | réservé (jusqu'à 64 octets)
+import struct
+
+import numpy as np
+
+from services import cipher_modes
+
+MAGIC = b'CHAOSENC'
+CONTAINER_VERSION = 1
+HEADER_SIZE = 64
+EXTENSION = '.chaos'
+MIMETYPE = 'application/octet-stream'
+
+_HEADER = struct.Struct('<8sHBBIIIBB16s')
+_MODE_CODES = {cipher_modes.MODE_CBC: 0, cipher_modes.MODE_TILED: 1}
+_MODES = {code: mode for mode, code in _MODE_CODES.items()}
+
+
+def pack_header(N, M, mode, tiles, key_check=b''):
+    """En-tête de 64 octets décrivant une image chiffrée (N, M, 3)."""
+    if len(key_check) > 16:
+        raise ValueError("Key check trop long (16 octets maximum)")
+    header = _HEADER.pack(MAGIC, CONTAINER_VERSION, cipher_modes.VERSIONS[mode], _MODE_CODES[mode],
+                          tiles, N, M, 3, len(key_check), key_check)
+    return header.ljust(HEADER_SIZE, b'\0')
+
+
+def to_bytes(X_prime, N, M, mode, tiles, key_check=b''):
+    """Conteneur complet (en-tête + vecteur chiffré) en mémoire."""
+    return pack_header(N, M, mode, tiles, key_check) + np.ascontiguousarray(X_prime, dtype=np.uint8).tobytes()
+
+
+def _read_prefix(source, size):
+    # Chemin, octets, ou flux (position restaurée pour les lecteurs suivants)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:size])
+    if hasattr(source, 'read'):
+        pos = source.tell()
+        data = source.read(size)
+        source.seek(pos)
+        return data
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+
+def is_container(source):
+    """True si `source` (chemin, octets ou flux) commence par la signature du conteneur."""
+    try:
+        return _read_prefix(source, len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_header(source):
+    """Décode l'en-tête: dict N, M, mode, tiles, version, cipher_version, key_check."""
+    raw = _read_prefix(source, HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("Conteneur chiffré invalide")
+    _, version, cipher_version, mode_code, tiles, N, M, channels, kc_len, key_check = _HEADER.unpack_from(raw)
+    if version > CONTAINER_VERSION or mode_code not in _MODES or channels != 3:
+        raise ValueError(f"Conteneur chiffré non supporté (version {version})")
+    return {'N': N, 'M': M, 'mode': _MODES[mode_code], 'tiles': tiles, 'version': version,
+            'cipher_version': cipher_version, 'key_check': key_check[:kc_len]}
+
+
+def load_vector(source, mmap=True):
+    """
+    (en-tête, vecteur chiffré X'). Depuis un chemin, le vecteur est un memory-map en
+    lecture seule (aucune copie ni décodage); depuis des octets, une vue sans copie.
+    """
+    header = read_header(source)
+    length = 3 * header['N'] * header['M']
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(source, dtype=np.uint8, count=length, offset=HEADER_SIZE)
+    elif hasattr(source, 'read'):
+        pos = source.tell()
+        source.seek(pos + HEADER_SIZE)
+        data = np.frombuffer(source.read(length), dtype=np.uint8)
+        source.seek(pos)
+    elif mmap:
+        data = np.memmap(source, dtype=np.uint8, mode='r', offset=HEADER_SIZE, shape=(length,))
+    else:
+        data = np.fromfile(source, dtype=np.uint8, count=length, offset=HEADER_SIZE)
+    if data.size != length:
+        raise ValueError("Conteneur chiffré tronqué")
+    return header, data
+
+
+def metadata(header):
+    """Métadonnées équivalentes à celles du PNG (ChaosCrypt-*)."""
+    return cipher_modes.make_metadata(header['mode'], header['tiles'], header['key_check'])
+
+
+def write(target, X_prime, N, M, mode, tiles, key_check=b''):
+    """Écrit le conteneur dans un chemin ou un flux binaire."""
+    if hasattr(target, 'write'):
+        target.write(to_bytes(X_prime, N, M, mode, tiles, key_check))
+        return
+    with open(target, 'wb') as f:
+        f.write(pack_header(N, M, mode, tiles, key_check))
+        np.ascontiguousarray(X_prime, dtype=np.uint8).tofile(f)
@@ -1,13 +1,68 @@
+import io
+
 import numpy as np
 from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from models import cipher_container
+from services import cipher_modes
 
 class ImageProcessor:
     @staticmethod
     def load_image(filepath):
-        """Charge une image et la convertit en tableau numpy RGB."""
+        """Charge une image (ou un conteneur chiffré brut) et la convertit en tableau numpy RGB."""
+        if cipher_container.is_container(filepath):
+            header, X_prime = cipher_container.load_vector(filepath)
+            return ImageProcessor.reshape(X_prime, header['N'], header['M'])
         img = Image.open(filepath).convert('RGB')
         return np.array(img)
 
+    @staticmethod
+    def load_metadata(filepath):
+        """Retourne les métadonnées texte de l'image (chunks tEXt d'un PNG, en-tête du conteneur), {} sinon."""
+        if cipher_container.is_container(filepath):
+            return cipher_container.metadata(cipher_container.read_header(filepath))
+        with Image.open(filepath) as img:
+            return dict(getattr(img, 'text', None) or {})
+
+    @staticmethod
+    def save_image(filepath, image_array, metadata=None, compress_level=6):
+        """
+        Sauvegarde un tableau RGB en PNG, avec des métadonnées texte optionnelles.
+        `compress_level=0` produit un PNG "stocké" (sans deflate), utile pour un chiffré incompressible.
+        """
+        pnginfo = None
+        if metadata:
+            pnginfo = PngInfo()
+            for key, value in metadata.items():
+                pnginfo.add_text(key, str(value))
+        Image.fromarray(image_array).save(filepath, format='PNG', pnginfo=pnginfo, compress_level=compress_level)
+
+    @staticmethod
+    def encode_png(image_array, metadata=None, compress_level=6):
+        """Encode un tableau RGB en PNG (octets), sans passer par le disque."""
+        buf = io.BytesIO()
+        ImageProcessor.save_image(buf, image_array, metadata, compress_level)
+        return buf.getvalue()
+
+    @staticmethod
+    def encode_encrypted(image_array, mode, tiles, output_format='png', key_check=b''):
+        """
+        Encode une image chiffrée dans le format de sortie demandé.
+        Retourne (octets, type MIME, extension):
+        - 'png': PNG compressé (défaut historique)
+        - 'png-stored': PNG sans compression, affichable par le navigateur
+        - 'raw': conteneur brut (en-tête + vecteur chiffré), relu par memory-map
+        `key_check` (KCV) est enregistré dans l'en-tête du conteneur ou les métadonnées PNG.
+        """
+        if output_format == 'raw':
+            X_prime, N, M = ImageProcessor.vectorize(image_array)
+            data = cipher_container.to_bytes(X_prime, N, M, mode, tiles, key_check)
+            return data, cipher_container.MIMETYPE, cipher_container.EXTENSION
+        metadata = cipher_modes.make_metadata(mode, tiles, key_check)
+        compress_level = 0 if output_format == 'png-stored' else 6
+        return ImageProcessor.encode_png(image_array, metadata, compress_level), 'image/png', '.png'
+
     @staticmethod
     def vectorize(image_array):
         """
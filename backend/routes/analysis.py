@@ -1,77 +1,212 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from services.analysis_service import AnalysisService
-from services.export_service import ExportService
-from models.image_processor import ImageProcessor
+from services.export_service import get_chart_mode
 from services.encryption_service import EncryptionService
+from services.key_schedule import KeySchedule
+from services import chart_data
 import os
+import json
+import time
 import numpy as np
+import config
 
 analysis_bp = Blueprint('analysis', __name__)
 
-# Access SESSION_DATA from encryption module (in real app, use proper session store)
-from shared_state import SESSION_DATA
+# Per-client session (decoded arrays and key schedule kept in memory)
+from shared_state import SESSIONS, get_session, load_session_image, load_session_images
+from routes.jobs import submit_job, wants_async
+from routes.charts import session_export_service
+from services.result_cache import RESULT_CACHE
 
-@analysis_bp.route('/api/analysis', methods=['GET'])
-def analyze():
-    if 'original_path' not in SESSION_DATA or 'encrypted_path' not in SESSION_DATA:
-         return jsonify({'error': 'No session data. Encrypt an image first.'}), 400
-         
-    orig_path = SESSION_DATA['original_path']
-    enc_path = SESSION_DATA['encrypted_path']
-    params = SESSION_DATA['params']
-    
-    orig_img = ImageProcessor.load_image(orig_path)
-    enc_img = ImageProcessor.load_image(enc_path)
-    
-    # 1. Histograms
-    # Use absolute path for export service
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    export_service = ExportService(os.path.join(base_dir, 'static', 'exports'))
-    
-    hist_paths = export_service.generate_histograms(orig_img, enc_img)
-    
-    # 2. Correlation
-    corr_paths = export_service.generate_correlation_plots(orig_img, enc_img)
+def compute_metrics(job, orig_img, enc_img, params, cipher, schedule=None):
+    """Métriques de sécurité (corrélation, entropie, NPCR/UACI) d'un couple original/chiffré."""
+    # 1. Correlation
     corr_coeffs_orig = AnalysisService.calculate_correlation(orig_img)
     corr_coeffs_enc = AnalysisService.calculate_correlation(enc_img)
+    if job: job.check_cancelled()
     
-    # 3. Entropy
+    # 2. Entropy
     ent_orig = AnalysisService.calculate_entropy(orig_img)
     ent_enc = AnalysisService.calculate_entropy(enc_img)
     
-    # 4. NPCR & UACI (Differential Attack Test)
+    # 3. NPCR & UACI (Differential Attack Test)
     # Need to generate C2 from Image with 1 pixel changed
     # Modify FIRST pixel of original (avalanche effect test)
     orig_mod = orig_img.copy()
-    orig_mod[0, 0, 0] = (orig_mod[0, 0, 0] + 1) % 256
+    orig_mod[0, 0, 0] = (int(orig_mod[0, 0, 0]) + 1) % 256
     
-    # Save temp mod
-    mod_path = os.path.join(base_dir, 'static', 'temp_mod.png')
-    # Save/Reload to ensure format consistency
-    from PIL import Image
-    Image.fromarray(orig_mod).save(mod_path)
-    
-    # Encrypt modified image with SAME params
-    enc_mod_img, _, _, _ = EncryptionService.encrypt_image(mod_path, params)
+    # Incremental re-encryption in memory with the SAME key schedule (cached):
+    # the ciphertext prefix before the modified byte is reused as-is
+    if schedule is None:
+        schedule = KeySchedule.get(params, orig_img.size)
+    enc_mod_img = EncryptionService.reencrypt_from(enc_img, schedule, orig_mod, [(0, 0, 0)],
+                                                   cipher.get('mode', 'cbc'), cipher.get('tiles', 1))
     
     npcr, uaci = AnalysisService.calculate_npcr_uaci(enc_img, enc_mod_img)
+    if job: job.check_cancelled()
     
-    # Generate Metrics Plots
-    metric_paths = export_service.generate_metrics_plots(npcr, uaci, ent_orig, ent_enc)
+    return {
+        'entropy': {'original': ent_orig, 'encrypted': ent_enc},
+        'npcr': npcr,
+        'uaci': uaci,
+        'correlation_original': corr_coeffs_orig,
+        'correlation_encrypted': corr_coeffs_enc,
+        'key_space': '2^299'
+    }
+
+
+def run_analysis(job, session, params, cipher, schedule=None, charts='png'):
+    """
+    Analyse commune à la route synchrone, aux jobs et à l'export ZIP.
+    Les métriques d'une image et d'une clé déjà analysées viennent du cache des résultats;
+    les images de la session ne sont décodées que si elles sont nécessaires.
+    `charts`: 'png' (URL des graphes, rendus au premier accès) ou 'data' (séries pour le frontend).
+    Retourne (corps, statut HTTP); lève ValueError si les images ne sont plus disponibles.
+    """
+    result_key = session.get('result_key')
+    metrics = RESULT_CACHE.get(result_key, 'analysis')
+    images = None
+    if metrics is None:
+        images = load_session_images(session)
+        metrics = compute_metrics(job, *images, params, cipher, schedule)
+        RESULT_CACHE.update(result_key, analysis=metrics)
     
-    return jsonify({
-        'status': 'success',
-        'metrics': {
-            'entropy': {'original': ent_orig, 'encrypted': ent_enc},
-            'npcr': npcr,
-            'uaci': uaci,
-            'correlation_original': corr_coeffs_orig,
-            'correlation_encrypted': corr_coeffs_enc,
-            'key_space': '2^299'
-        },
-        'graphs': {
-            'histograms': hist_paths,
-            'correlation': corr_paths,
-            'metrics': metric_paths
+    response_data = {'status': 'success', 'metrics': metrics}
+    # Metric chart values, kept for lazy rendering and the ZIP export
+    analysis_metrics = {'npcr': metrics['npcr'], 'uaci': metrics['uaci'],
+                        'entropy_orig': metrics['entropy']['original'],
+                        'entropy_enc': metrics['entropy']['encrypted']}
+    SESSIONS.update(session, analysis_metrics=analysis_metrics)
+    if charts == 'png':
+        # Chart URLs only: each chart is rendered the first time it is fetched
+        # (from the session images, not needed to list the URLs)
+        export_service = session_export_service(session)
+        orig_img, enc_img = images or (None, None)
+        response_data['graphs'] = {
+            'histograms': export_service.urls(export_service.histogram_jobs(orig_img, enc_img)),
+            'correlation': export_service.urls(export_service.correlation_jobs(orig_img, enc_img)),
+            'metrics': export_service.urls(export_service.metrics_jobs(**analysis_metrics))
+        }
+    else:
+        # Raw series drawn by the frontend (metric bars come from 'metrics')
+        orig_img, enc_img = images or load_session_images(session)
+        response_data['charts'] = {
+            'histograms': chart_data.histograms(orig_img, enc_img),
+            'correlation': chart_data.correlation(orig_img, enc_img)
         }
-    })
+    return response_data, 200
+
+
+@analysis_bp.route('/api/analysis', methods=['GET'])
+def analyze():
+    session = get_session()
+    if session is None or 'original_path' not in session or 'encrypted_path' not in session:
+         return jsonify({'error': 'No session data. Encrypt an image first.'}), 400
+         
+    try:
+        charts = get_chart_mode(request.args.get('charts'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    args = (session, session['params'], dict(session.get('cipher', {})), session.get('schedule'), charts)
+    if wants_async():
+        return submit_job('analysis', run_analysis, *args)
+    try:
+        response_data, status = run_analysis(None, *args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(response_data), status
+
+@analysis_bp.route('/api/analysis/sweep', methods=['GET'])
+def differential_sweep():
+    """
+    Multi-position avalanche test: flips one bit at many plaintext positions
+    (first byte, corners, last byte, random) and streams NPCR/UACI as NDJSON lines
+    as soon as each re-encryption finishes, followed by a summary line.
+    Query: count (default 100), seed, bit (0-7), workers.
+    """
+    session = get_session()
+    if session is None or 'original_path' not in session or 'encrypted_path' not in session:
+         return jsonify({'error': 'No session data. Encrypt an image first.'}), 400
+
+    try:
+        count = min(int(request.args.get('count', 100)), config.SWEEP_MAX_POSITIONS)
+        seed = int(request.args.get('seed', 0))
+        bit = int(request.args.get('bit', 0))
+        workers = max(1, min(int(request.args.get('workers', config.SWEEP_WORKERS)), config.SWEEP_WORKERS))
+    except ValueError:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    if not 0 <= bit <= 7 or count < 1:
+        return jsonify({'error': 'Invalid parameters'}), 400
+
+    params = session['params']
+    cipher = session.get('cipher', {})
+    try:
+        orig_img, enc_img = load_session_images(session)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Keystream computed once (session / cached schedule), shared with every perturbed encryption
+    schedule = session.get('schedule') or KeySchedule.get(params, orig_img.size)
+    positions = AnalysisService.sweep_positions(orig_img.shape, count, seed)
+
+    def generate():
+        start = time.time()
+        results = []
+        for result in AnalysisService.differential_sweep(orig_img, enc_img, schedule, positions, bit,
+                                                         cipher.get('mode', 'cbc'), cipher.get('tiles', 1), workers):
+            result['elapsed'] = time.time() - start
+            results.append(result)
+            yield json.dumps(result) + '\n'
+        summary = AnalysisService.summarize_sweep(results)
+        summary['time'] = time.time() - start
+        yield json.dumps({'summary': summary}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@analysis_bp.route('/api/analysis/key-sensitivity', methods=['GET'])
+def key_sensitivity():
+    """
+    Key sensitivity test: each chaotic parameter is perturbed by +/-delta and the
+    ciphertexts are compared with the reference one (per-parameter difference rates + timing).
+    Query: delta (default 1e-14), size (top-left crop side in pixels, 0 = full image),
+    charts ('png' adds the chart URL, rendered on first fetch; it is also part of the ZIP export).
+    """
+    session = get_session()
+    if session is None or 'original_path' not in session:
+         return jsonify({'error': 'No session data. Encrypt an image first.'}), 400
+
+    try:
+        delta = float(request.args.get('delta', 1e-14))
+        size = int(request.args.get('size', 256))
+    except ValueError:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    try:
+        charts = get_chart_mode(request.args.get('charts'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    orig_img = load_session_image(session, 'original')
+    if orig_img is None:
+        return jsonify({'error': 'Session images are no longer available. Encrypt the image again.'}), 400
+    if size > 0:
+        # 13 full encryptions: a crop keeps the endpoint interactive on large images
+        orig_img = np.ascontiguousarray(orig_img[:size, :size])
+
+    cipher = session.get('cipher', {})
+    report = AnalysisService.key_sensitivity(orig_img, session['params'], delta,
+                                             cipher.get('mode', 'cbc'), cipher.get('tiles', 1))
+
+    # Kept for lazy rendering and the ZIP export (the report itself is small);
+    # the chart of a previous report is dropped
+    SESSIONS.update(session, key_sensitivity=report)
+    if 'chart_key' in session:
+        export_service = session_export_service(session)
+        jobs = export_service.key_sensitivity_jobs(report)
+        for _, subdir, filename, _ in jobs:
+            path = os.path.join(export_service.export_dir, subdir, filename)
+            if os.path.exists(path):
+                os.remove(path)
+        if charts == 'png':
+            report['graphs'] = export_service.urls(jobs)
+
+    return jsonify({'status': 'success', 'report': report})
@@ -0,0 +1,69 @@
+from flask import Blueprint, jsonify, request, send_file
+import io
+import os
+
+from models import cipher_container
+from services import artifacts
+from services.key_schedule import KEY_SCHEDULE_CACHE
+from services.result_cache import RESULT_CACHE
+
+artifacts_bp = Blueprint('artifacts', __name__)
+
+
+def wants_png():
+    """True si le client demande l'image elle-même en réponse (?response=png)."""
+    return request.args.get('response', request.form.get('response', '')).lower() == 'png'
+
+
+def artifact_bytes(url):
+    """Octets d'une image produite, qu'elle soit dans le cache mémoire ou dans static/."""
+    prefix = '/api/artifacts/'
+    if url.startswith(prefix):
+        entry = artifacts.ARTIFACT_CACHE.get(url[len(prefix):])
+        return entry[0] if entry else None
+    path = os.path.join(artifacts.STATIC_DIR, os.path.basename(url))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def png_response(url, headers=None):
+    """
+    Réponse portant directement l'image produite (URL conservée en en-tête):
+    image/png, ou application/octet-stream pour un conteneur chiffré brut.
+    """
+    data = artifact_bytes(url)
+    if data is None:
+        return jsonify({'error': 'Artifact not found'}), 404
+    mimetype = cipher_container.MIMETYPE if cipher_container.is_container(data) else 'image/png'
+    response = send_file(io.BytesIO(data), mimetype=mimetype)
+    response.headers['X-Artifact-Url'] = url
+    response.headers.update(headers or {})
+    return response
+
+
+@artifacts_bp.route('/api/artifacts/<artifact_id>', methods=['GET'])
+def get_artifact(artifact_id):
+    """Image (ou conteneur chiffré) produite en mode 'memory' (cache du processus)."""
+    entry = artifacts.ARTIFACT_CACHE.get(artifact_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown or expired artifact'}), 404
+    data, mimetype = entry
+    ext = cipher_container.EXTENSION if mimetype == cipher_container.MIMETYPE else '.png'
+    response = send_file(io.BytesIO(data), mimetype=mimetype,
+                         as_attachment=request.args.get('download') == '1',
+                         download_name=f'{artifact_id}{ext}')
+    # Contenu immuable (identifiant unique): réutilisable par le navigateur
+    response.headers['Cache-Control'] = 'private, max-age=3600, immutable'
+    return response
+
+
+@artifacts_bp.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Occupation and hit/miss counters of the process caches (results, key schedules, artifacts)."""
+    return jsonify({
+        'results': RESULT_CACHE.stats(),
+        'key_schedules': KEY_SCHEDULE_CACHE.stats(),
+        'artifacts': artifacts.ARTIFACT_CACHE.stats(),
+    })
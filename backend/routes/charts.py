@@ -0,0 +1,77 @@
+from flask import Blueprint, jsonify, send_file
+import os
+
+from services import artifacts
+from services.export_service import ExportService
+from services.key_schedule import KeySchedule
+from services.result_cache import RESULT_CACHE
+from shared_state import SESSIONS, load_session_image, load_session_images
+
+charts_bp = Blueprint('charts', __name__)
+
+# Charts are rendered on first fetch, then served from the session's export folder.
+# The folder is keyed by the image content and its parameters (session 'chart_key'):
+# another image or key gets new URLs, and rendered files are shared by all workers.
+# URLs and folders use the session's opaque export id, never the session token itself.
+
+
+def session_export_service(session, key=None):
+    """ExportService writing to the session's chart folder, with lazy /api/charts URLs."""
+    key = key or session['chart_key']
+    export_id = SESSIONS.export_id(session)
+    return ExportService(artifacts.session_chart_dir(export_id, key),
+                         url_prefix=f'/api/charts/{export_id}/{key}')
+
+
+def session_chart_jobs(session, export_service, subdir):
+    """Chart jobs of one export category, built from the session (data computed at render time)."""
+    if subdir in ('histograms', 'correlation'):
+        orig_img, enc_img = load_session_images(session)
+        if subdir == 'histograms':
+            return export_service.histogram_jobs(orig_img, enc_img)
+        return export_service.correlation_jobs(orig_img, enc_img)
+    if subdir in ('chaotic_maps', 'sbox'):
+        schedule = session.get('schedule')
+        if schedule is not None:
+            maps, sbox = schedule.maps_preview, schedule.S_Box
+        else:
+            # Only the start of the keystream is needed: no full key schedule to derive
+            length = RESULT_CACHE.get(session.get('result_key'), 'length')
+            if length is None:
+                orig_img = load_session_image(session, 'original')
+                if orig_img is None:
+                    raise ValueError("Session images are no longer available. Encrypt the image again.")
+                length = orig_img.size
+            maps, sbox = KeySchedule.chart_data(session['params'], length)
+        if subdir == 'sbox':
+            return export_service.sbox_jobs(sbox)
+        return export_service.chaotic_map_jobs(*maps) if maps else []
+    if subdir == 'metrics':
+        jobs = []
+        if session.get('analysis_metrics'):
+            jobs += export_service.metrics_jobs(**session['analysis_metrics'])
+        if session.get('key_sensitivity'):
+            jobs += export_service.key_sensitivity_jobs(session['key_sensitivity'])
+        return jobs
+    return []
+
+
+@charts_bp.route('/api/charts/<export_id>/<key>/<subdir>/<filename>', methods=['GET'])
+def get_chart(export_id, key, subdir, filename):
+    """Serves one chart PNG, rendering it on the first request (memoized per image and parameters)."""
+    session = SESSIONS.get_by_export_id(export_id)
+    if session is None or session.get('chart_key') != key:
+        return jsonify({'error': 'Chart not found (session expired or image replaced)'}), 404
+
+    export_service = session_export_service(session)
+    if subdir not in export_service.categories or filename != os.path.basename(filename) \
+            or not filename.endswith('.png'):
+        return jsonify({'error': 'Chart not found'}), 404
+    try:
+        path = export_service.render_one(session_chart_jobs(session, export_service, subdir), subdir, filename)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if path is None:
+        return jsonify({'error': 'Chart not found'}), 404
+    # Immutable for this key: a new image or new parameters produce new URLs
+    return send_file(path, mimetype='image/png', max_age=3600)
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
 from services.decryption_service import DecryptionService
+from services import artifacts, cipher_modes, key_check
+from models import cipher_container
+from models.image_processor import ImageProcessor
+import io
 import os
 from PIL import Image
 import numpy as np
@@ -8,7 +12,52 @@ import traceback
 
 decryption_bp = Blueprint('decryption', __name__)
 
-from shared_state import SESSION_DATA
+from shared_state import get_session, load_session_image
+from routes.jobs import submit_job, wants_async
+from routes.artifacts import png_response, wants_png
+
+
+def run_decryption(job, source, chaos_params, cipher=None, schedule=None, store='disk'):
+    """
+    Travail de déchiffrement commun à la route synchrone et aux jobs. Retourne (corps, statut HTTP).
+    source: chemin d'une image chiffrée (PNG ou conteneur brut), octets de l'upload
+    (mode 'memory'), ou tableau chiffré de la session (avec son mode `cipher`).
+    """
+    try:
+        if isinstance(source, bytes) and not cipher_container.is_container(source):
+            # Upload décodé en mémoire: image et métadonnées lues depuis les mêmes octets
+            metadata = ImageProcessor.load_metadata(io.BytesIO(source))
+            mode, tiles = cipher_modes.parse_metadata(metadata)
+            key_check.verify(chaos_params, cipher_modes.parse_key_check(metadata))
+            source, cipher = ImageProcessor.load_image(io.BytesIO(source)), {'mode': mode, 'tiles': tiles}
+        if isinstance(source, np.ndarray):
+            cipher = cipher or {}
+            decrypted_img_array = DecryptionService.decrypt_array(source, chaos_params, cipher.get('mode', 'cbc'),
+                                                                  cipher.get('tiles', 1), schedule,
+                                                                  cipher.get('key_check'))
+        else:
+            # Chemin, ou conteneur brut (octets): le vecteur chiffré est lu sans décodage PNG
+            decrypted_img_array = DecryptionService.decrypt_image(source, chaos_params)
+    except key_check.KeyMismatch:
+        # Rejeté après quelques centaines d'échantillons du keystream, sans déchiffrer
+        return {'error': 'Wrong key: the parameters do not match this encrypted image', 'code': 'key_mismatch'}, 400
+    if job: job.check_cancelled()
+    
+    if store == 'memory':
+        # Encodé en mémoire, servi par /api/artifacts/<id>
+        dec_id = artifacts.ARTIFACT_CACHE.put(ImageProcessor.encode_png(decrypted_img_array))
+        if dec_id is None:
+            raise ValueError("Decrypted image exceeds the in-memory artifact cache")
+        dec_url = artifacts.artifact_url(dec_id)
+    else:
+        # Save decrypted (unique file per request)
+        dec_path, dec_url = artifacts.new_artifact('decrypted_')
+        Image.fromarray(decrypted_img_array).save(dec_path)
+    
+    return {
+        'status': 'success',
+        'decrypted_url': dec_url
+    }, 200
 
 @decryption_bp.route('/api/decrypt', methods=['POST'])
 def decrypt():
@@ -22,6 +71,12 @@ def decrypt():
                 params = request.json
             else:
                 params = request.form.to_dict()
+        # Les options de requête ne sont pas des paramètres de clé (sinon le mode session serait ignoré)
+        params = {k: v for k, v in (params or {}).items() if k not in ('async', 'store', 'response', 'format')}
+        try:
+            store = artifacts.get_store(request.args.get('store', request.form.get('store')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         base_dir = os.path.dirname(os.path.abspath(__file__))
         backend_dir = os.path.dirname(base_dir)
@@ -30,28 +85,34 @@ def decrypt():
         enc_path = os.path.join(backend_dir, 'static', 'encrypted.png')
         
         path_to_decrypt = None
+        session = get_session()
+        session_data = session if session is not None else {}
 
-        if file:
+        if file and store == 'memory':
+            # Case A: User uploaded a file to decrypt, decoded straight from the stream
+            path_to_decrypt = file.read()
+        elif file:
             # Case A: User uploaded a file to decrypt
             ext = os.path.splitext(file.filename)[1].lower()
             if not ext: ext = '.png'
-            enc_path = os.path.join(backend_dir, 'static', f'temp_decrypt{ext}')
+            enc_path, _ = artifacts.new_artifact('temp_decrypt_', ext)
+            artifacts.cleanup()
             file.save(enc_path)
             path_to_decrypt = enc_path
         else:
-            # Case B: Session Mode (Decrypt last encrypted)
-            if 'encrypted_path' in SESSION_DATA and os.path.exists(SESSION_DATA['encrypted_path']):
-                path_to_decrypt = SESSION_DATA['encrypted_path']
-            elif os.path.exists(enc_path):
+            # Case B: Session Mode (Decrypt last encrypted, kept in memory by the session)
+            if session is not None:
+                path_to_decrypt = load_session_image(session, 'encrypted')
+            if path_to_decrypt is None and os.path.exists(enc_path):
                  path_to_decrypt = enc_path
             
-            if not path_to_decrypt:
+            if path_to_decrypt is None:
                  return jsonify({'error': 'No encrypted image found. Please upload one or encrypt an image first.'}), 404
 
         # Parse chaotic params
         # If session mode and no params provided, try to use session params
-        if not params and 'params' in SESSION_DATA:
-            chaos_params = SESSION_DATA['params']
+        if not params and 'params' in session_data:
+            chaos_params = session_data['params']
         else:
             # Use provided params or defaults
             try:
@@ -65,22 +126,21 @@ def decrypt():
                 }
             except ValueError as e:
                 # If these failed and we have session params, fallback?
-                if 'params' in SESSION_DATA:
-                     chaos_params = SESSION_DATA['params']
+                if 'params' in session_data:
+                     chaos_params = session_data['params']
                 else:
                     return jsonify({'error': 'Invalid parameters and no session params found'}), 400
 
-        # Decrypt
-        decrypted_img_array = DecryptionService.decrypt_image(path_to_decrypt, chaos_params)
-        
-        # Save decrypted
-        dec_path = os.path.join(backend_dir, 'static', 'decrypted.png')
-        Image.fromarray(decrypted_img_array).save(dec_path)
-        
-        return jsonify({
-            'status': 'success',
-            'decrypted_url': '/static/decrypted.png'
-        })
+        # Decrypt (the session schedule is reused only with the session key)
+        schedule = session_data.get('schedule') if chaos_params == session_data.get('params') else None
+        args = (path_to_decrypt, chaos_params, session_data.get('cipher'), schedule, store)
+        if wants_async():
+            return submit_job('decrypt', run_decryption, *args)
+        response_data, status = run_decryption(None, *args)
+        if status == 200 and wants_png():
+            # PNG bytes in the body: the client does not fetch the image back
+            return png_response(response_data['decrypted_url'])
+        return jsonify(response_data), status
 
     except Exception as e:
         print("Decryption CRITICAL Error:")
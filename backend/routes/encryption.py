@@ -1,7 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 from services.encryption_service import EncryptionService
-from services.export_service import ExportService
+from services.export_service import get_chart_mode
 from models.image_processor import ImageProcessor
+from services import cipher_modes, artifacts, key_check, chart_data, result_cache
+from services.result_cache import RESULT_CACHE
+from routes.jobs import submit_job, wants_async
+from routes.artifacts import png_response, wants_png
+from routes.charts import session_export_service
+import config
+import io
 import os
 import time
 from PIL import Image
@@ -9,25 +16,13 @@ import numpy as np
 
 encryption_bp = Blueprint('encryption', __name__)
 
-from shared_state import SESSION_DATA
+from shared_state import SESSIONS, get_session
+from services.key_schedule import KeySchedule
 
 @encryption_bp.route('/api/encrypt', methods=['POST'])
 def encrypt():
     import uuid
     import traceback
-    
-    # Helper to clean old files
-    def cleanup_old_files(folder_path):
-        try:
-            now = time.time()
-            for f in os.listdir(folder_path):
-                f_path = os.path.join(folder_path, f)
-                if os.path.isfile(f_path):
-                    # Delete temp files older than 5 minutes
-                    if (f.startswith('temp_upload_') or f.startswith('encrypted_')) and os.stat(f_path).st_mtime < now - 30:
-                        os.remove(f_path)
-        except Exception:
-            pass # Fail silently on cleanup
 
     try:
         if 'image' not in request.files:
@@ -49,76 +44,232 @@ def encrypt():
         except ValueError:
             return jsonify({'error': 'Invalid parameters'}), 400
 
-        # Save uploaded file temporarily
-        # Use absolute path relative to current file to ensure correct location regardless of CWD works
-        base_dir = os.path.dirname(os.path.abspath(__file__)) # .../backend/routes
-        backend_dir = os.path.dirname(base_dir) # .../backend
-        
-        # Preserve extension
-        ext = os.path.splitext(file.filename)[1].lower()
-        if not ext:
-            ext = '.png'
-            
+        # Chaining mode: single CBC chain (default) or tiled CBC segments
+        try:
+            cipher_mode = params.get('mode', config.CIPHER_MODE)
+            cipher_tiles = int(params.get('tiles', config.CBC_TILES))
+        except ValueError:
+            return jsonify({'error': 'Invalid parameters'}), 400
+
+        # Where the images live: static/ files (default) or in-memory artifacts,
+        # and how the ciphertext is encoded (PNG, stored PNG or raw container)
+        try:
+            store = artifacts.get_store(request.args.get('store', params.get('store')))
+            output_format = artifacts.get_format(request.args.get('format', params.get('format')))
+            charts = get_chart_mode(request.args.get('charts', params.get('charts')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         run_id = str(uuid.uuid4())
-        temp_filename = f'temp_upload_{run_id}{ext}'
-        temp_path = os.path.join(backend_dir, 'static', temp_filename)
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-        
-        # Clean up old files before adding new ones
-        cleanup_old_files(os.path.dirname(temp_path))
-        
-        file.save(temp_path)
-        
-        start_time = time.time()
+
+        if store == 'memory':
+            # Decoded straight from the upload stream: no temp file
+            source = file.read()
+            header = io.BytesIO(source)
+        else:
+            # Save uploaded file temporarily (unique per request: safe across concurrent workers)
+            # Preserve extension
+            ext = os.path.splitext(file.filename)[1].lower()
+            if not ext:
+                ext = '.png'
+            source, _ = artifacts.new_artifact('temp_upload_', ext, run_id)
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            
+            # Clean up old files (by age) before adding new ones
+            artifacts.cleanup()
+            
+            file.save(source)
+            header = source
         
         # Encrypt
-        encrypted_img, vectors, maps, process_log = EncryptionService.encrypt_image(temp_path, chaos_params)
-        
-        # Save encrypted image
-        enc_filename = f'encrypted_{run_id}.png'
-        enc_path = os.path.join(backend_dir, 'static', enc_filename)
-        Image.fromarray(encrypted_img).save(enc_path)
-        
-        # Generate Charts
-        export_service = ExportService(os.path.join(backend_dir, 'static', 'exports'))
-        
-        # Chaotic Maps
-        map_paths = export_service.generate_chaotic_map_plots(*maps)
-        
-        # S-Box
-        sbox_paths = export_service.generate_sbox_heatmap(vectors[5]) # S_Box is index 5
-        
-        # Store data for analysis step
-        SESSION_DATA['original_path'] = temp_path
-        SESSION_DATA['encrypted_path'] = enc_path
-        SESSION_DATA['params'] = chaos_params
-        
-        # Return result
-        response_data = {
-            'status': 'success',
-            'time': time.time() - start_time,
-            'encrypted_url': f'/static/{enc_filename}',
-            'graphs': {
-                'chaotic_maps': map_paths,
-                'sbox': sbox_paths
-            },
-            'process_log': process_log,
-            'params': chaos_params # Send back used params
-        }
-        
-        # Cache result for Page Refresh recovery
-        SESSION_DATA['last_result'] = response_data
-        
-        return jsonify(response_data)
+        with Image.open(header) as img:
+            total_pixels = 3 * img.width * img.height
+        try:
+            cipher_mode, cipher_tiles = cipher_modes.normalize(cipher_mode, cipher_tiles, total_pixels)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        session = get_session(create=True)
+        args = (session, source, run_id, chaos_params, cipher_mode, cipher_tiles, output_format, charts)
+        if wants_async():
+            return submit_job('encrypt', run_encryption, *args)
+        response_data, status = run_encryption(None, *args)
+        if status == 200 and wants_png():
+            # PNG bytes in the body: the client does not fetch the image back
+            return png_response(response_data['encrypted_url'], {'X-Cipher-Mode': cipher_mode,
+                                                                'X-Cipher-Tiles': str(cipher_tiles)})
+        return jsonify(response_data), status
         
     except Exception as e:
         print("ENCRYPTION CRITICAL ERROR:")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def run_encryption(job, session, source, run_id, chaos_params, cipher_mode, cipher_tiles, output_format='png',
+                   charts='png'):
+    """
+    Encryption work shared by the synchronous route and async jobs.
+    `source` is the saved upload path, or the upload bytes (in-memory store).
+    `output_format` is 'png', 'png-stored' or 'raw' (see artifacts.get_format).
+    `charts` is 'data' (chart series in the response) or 'png' (rendered chart files).
+    Returns (response body, HTTP status). `job` (or None) provides cooperative cancellation.
+    """
+    start_time = time.time()
+    # Avec un job, chaque étape et la progression de la boucle CBC alimentent son flux SSE
+    progress = job.report if job else None
+    in_memory = isinstance(source, bytes)
+    # Same upload, key and cipher version already encrypted: reuse the ciphertext
+    result_key = result_cache.make_key(result_cache.content_digest(source), chaos_params,
+                                       cipher_mode, cipher_tiles, output_format)
+    cached = RESULT_CACHE.get(result_key)
+    if cached is None:
+        orig_img = ImageProcessor.load_image(io.BytesIO(source) if in_memory else source)
+        encrypted_img, vectors, maps, process_log = EncryptionService.encrypt_image(orig_img, chaos_params, cipher_mode, cipher_tiles, progress)
+        if job: job.check_cancelled()
+        
+        # Save encrypted image (chaining mode and key check value recorded in PNG metadata /
+        # container header for decryption)
+        kcv = key_check.compute(chaos_params)
+        enc_data, enc_mimetype, enc_ext = ImageProcessor.encode_encrypted(encrypted_img, cipher_mode, cipher_tiles,
+                                                                          output_format, kcv)
+        sbox = vectors[5] # S_Box is index 5
+        RESULT_CACHE.put(result_key, {
+            'ciphertext': enc_data, 'mimetype': enc_mimetype, 'ext': enc_ext, 'key_check': kcv.hex(),
+            'length': int(orig_img.size), 'analysis': None})
+        # Decoded arrays and key schedule kept in the session for the analysis step
+        arrays = {'original': orig_img, 'encrypted': encrypted_img,
+                  'schedule': KeySchedule.get(chaos_params, orig_img.size)}
+    else:
+        # The cache keeps nothing key-equivalent: the process log (key, keystream samples) and
+        # chart data are rebuilt from the request's params; only the CBC pass is skipped
+        enc_data, enc_mimetype, enc_ext = cached['ciphertext'], cached['mimetype'], cached['ext']
+        kcv = bytes.fromhex(cached['key_check'])
+        orig_img = ImageProcessor.load_image(io.BytesIO(source) if in_memory else source)
+        process_log = EncryptionService.replay_log(orig_img, chaos_params, cipher_mode, cipher_tiles)
+        schedule = KeySchedule.get(chaos_params, orig_img.size)
+        maps, sbox = schedule.maps_preview, schedule.S_Box
+        arrays = {'original': orig_img, 'encrypted': None, 'schedule': schedule}
+    
+    stored = {}
+    if in_memory:
+        # Encoded once in memory, served by /api/artifacts/<id>; the upload is kept as well
+        # so that the session can re-decode the original if its arrays are evicted
+        enc_id = artifacts.ARTIFACT_CACHE.put(enc_data, enc_mimetype)
+        orig_id = artifacts.ARTIFACT_CACHE.put(source)
+        if enc_id is None:
+            raise ValueError("Encrypted image exceeds the in-memory artifact cache")
+        enc_path, enc_url = None, artifacts.artifact_url(enc_id)
+        stored = {'original_path': None, 'original_artifact': orig_id, 'encrypted_artifact': enc_id}
+    else:
+        enc_path, enc_url = artifacts.new_artifact('encrypted_', enc_ext, run_id)
+        with open(enc_path, 'wb') as f:
+            f.write(enc_data)
+        stored = {'original_path': source, 'original_artifact': None, 'encrypted_artifact': None}
+    
+    # Charts are keyed by the image content and its parameters (see routes/charts.py):
+    # re-submitting the same image and key keeps the charts already rendered for this session
+    chart_key = result_key[:16]
+    if charts == 'png':
+        # Chart URLs only: each chart is rendered the first time it is fetched
+        export_service = session_export_service(session, chart_key)
+        chart_fields = {'graphs': {'chaotic_maps': export_service.urls(export_service.chaotic_map_jobs(*maps)),
+                                   'sbox': export_service.urls(export_service.sbox_jobs(sbox))}}
+    else:
+        # Series drawn by the frontend; the PNG files are only rendered for the ZIP export
+        chart_fields = {'charts': {'chaotic_maps': chart_data.chaotic_maps(*maps),
+                                   'sbox': chart_data.sbox(sbox)}}
+    
+    # Return result
+    response_data = {
+        'status': 'success',
+        'time': time.time() - start_time,
+        'encrypted_url': enc_url,
+        **chart_fields,
+        'process_log': process_log,
+        'params': chaos_params, # Send back used params
+        'cipher': {'mode': cipher_mode, 'tiles': cipher_tiles, 'version': cipher_modes.VERSIONS[cipher_mode]},
+        'format': output_format,
+        'cached': cached is not None,
+        'session_id': session.id
+    }
+    
+    # Store data for analysis step (decoded arrays + key schedule kept in memory)
+    # and cache result for Page Refresh recovery
+    if session.get('chart_key') != chart_key:
+        # Different image or key: results of the previous analysis no longer apply
+        stored.update(analysis_metrics=None, key_sensitivity=None)
+    SESSIONS.update(session, **stored, **arrays,
+                    encrypted_path=enc_path,
+                    params=chaos_params, cipher={'mode': cipher_mode, 'tiles': cipher_tiles, 'key_check': kcv.hex()},
+                    chart_key=chart_key, result_key=result_key,
+                    last_result=response_data)
+    
+    return response_data, 200
+
 @encryption_bp.route('/api/result', methods=['GET'])
 def get_last_result():
     """Returns the last encryption result if valid session exists."""
-    if 'last_result' in SESSION_DATA:
-        return jsonify(SESSION_DATA['last_result'])
+    session = get_session()
+    if session is not None and 'last_result' in session:
+        return jsonify(session['last_result'])
     return jsonify({'error': 'No active session'}), 404
+
+@encryption_bp.route('/api/encrypt/batch', methods=['POST'])
+def encrypt_batch():
+    """
+    Chiffre plusieurs images avec la même clé (champ multi-fichiers 'images').
+    Les images de même taille sont chiffrées ensemble (CBC en lockstep).
+    Retourne un ZIP des images chiffrées (PNG avec le mode de chaînage et le KCV en métadonnées,
+    comme /api/encrypt: déchiffrables par /api/decrypt).
+    """
+    import io
+    import zipfile
+    import traceback
+
+    try:
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({'error': 'No images provided'}), 400
+
+        params = request.form.to_dict()
+        try:
+            chaos_params = {
+                'log_x0': float(params.get('log_x0', 0.1)),
+                'log_mu': float(params.get('log_mu', 3.99)),
+                'tent_x0': float(params.get('tent_x0', 0.2)),
+                'tent_r': float(params.get('tent_r', 1.99)),
+                'pwlcm_x0': float(params.get('pwlcm_x0', 0.3)),
+                'pwlcm_p': float(params.get('pwlcm_p', 0.254))
+            }
+        except ValueError:
+            return jsonify({'error': 'Invalid parameters'}), 400
+
+        # Regroupement par résolution: un lot lockstep par taille d'image
+        groups = {}
+        for idx, file in enumerate(files):
+            img_array = ImageProcessor.load_image(file.stream)
+            groups.setdefault(img_array.shape, []).append((idx, file.filename, img_array))
+
+        results = {}
+        for entries in groups.values():
+            encrypted = EncryptionService.encrypt_batch([img for _, _, img in entries], chaos_params)
+            for (idx, filename, _), enc_img in zip(entries, encrypted):
+                results[idx] = (filename, enc_img)
+
+        # Archive dans l'ordre d'envoi des fichiers; encrypt_batch chiffre en CBC sur toute l'image
+        kcv = key_check.compute(chaos_params)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+            for idx in sorted(results):
+                filename, enc_img = results[idx]
+                name = os.path.splitext(os.path.basename(filename or ''))[0] or f'image_{idx}'
+                png, _, _ = ImageProcessor.encode_encrypted(enc_img, 'cbc', 1, 'png', kcv)
+                zf.writestr(f'{idx:04d}_encrypted_{name}.png', png)
+
+        archive.seek(0)
+        return send_file(archive, mimetype='application/zip', as_attachment=True,
+                         download_name='encrypted_batch.zip')
+
+    except Exception as e:
+        print("BATCH ENCRYPTION CRITICAL ERROR:")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
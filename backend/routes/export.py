@@ -1,27 +1,61 @@
 from flask import Blueprint, jsonify, send_file
+import io
 import os
-import shutil
+import zipfile
+
+from routes.analysis import run_analysis
+from routes.charts import session_chart_jobs, session_export_service
+from services import artifacts
+from shared_state import SESSIONS, get_session
 
 export_bp = Blueprint('export', __name__)
 
+
+def render_session_charts(session):
+    """
+    Rend les graphes de la session qui ne l'ont pas encore été (rendu à la demande, voir
+    routes/charts.py) et retourne leur dossier. Sans clé de graphes (session sans chiffrement)
+    ou sans images, le dossier d'export est exporté tel quel.
+    """
+    if 'chart_key' not in session:
+        return artifacts.session_export_dir(SESSIONS.export_id(session), touch=False)
+    export_service = session_export_service(session)
+    try:
+        if not session.get('analysis_metrics'):
+            # Valeurs des graphes de métriques (l'analyse n'a pas encore été demandée)
+            run_analysis(None, session, session['params'], dict(session.get('cipher', {})),
+                         session.get('schedule'))
+        jobs = [job for subdir in export_service.categories
+                for job in session_chart_jobs(session, export_service, subdir)]
+    except ValueError:
+        return export_service.export_dir
+    export_service.render(jobs, missing_only=True)
+    return export_service.export_dir
+
+
 @export_bp.route('/api/export/zip', methods=['GET'])
 def export_zip():
-    """Crée un ZIP de tout le dossier exports et l'envoie."""
-    # Use absolute path
-    base_dir = os.path.dirname(os.path.abspath(__file__)) # .../backend/routes
-    backend_dir = os.path.dirname(base_dir) # .../backend
-    
-    src_dir = os.path.join(backend_dir, 'static', 'exports')
-    
+    """Crée un ZIP des graphes de la session courante et l'envoie."""
+    session = get_session()
+    if session is None:
+        return jsonify({'error': 'No exports found'}), 404
+
+    src_dir = render_session_charts(session)
     if not os.path.exists(src_dir):
         return jsonify({'error': 'No exports found'}), 404
-        
-    # shutil.make_archive creates the zip file. 
-    # root_dir is the directory whose contents will be at the root of the archive.
-    # base_name is the name of the file to create (without extension).
-    # We want to create it in specific location to avoid clutter/permissions issues.
-    output_path = os.path.join(backend_dir, 'output_graphs')
-    shutil.make_archive(output_path, 'zip', src_dir)
-    
+
+    # Archive construite en mémoire: pas de fichier de sortie commun à toutes les requêtes.
+    # Les chemins dans l'archive sont relatifs au dossier (histograms/..., metrics/...).
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for root, _, files in os.walk(src_dir):
+            for name in sorted(files):
+                if name.endswith('.tmp.png'):
+                    continue  # Graphe en cours de rendu à la demande
+                path = os.path.join(root, name)
+                zf.write(path, os.path.relpath(path, src_dir))
+    archive.seek(0)
+
     # Send the file
-    return send_file(output_path + '.zip', as_attachment=True)
+    return send_file(archive, mimetype='application/zip', as_attachment=True,
+                     download_name='output_graphs.zip')
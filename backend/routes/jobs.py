@@ -0,0 +1,105 @@
+import json
+import time
+
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from services.job_queue import JOB_QUEUE, QueueFull
+import config
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def wants_async():
+    """True si la requête demande un traitement asynchrone (?async=1 ou champ de formulaire)."""
+    value = request.args.get('async', request.form.get('async', ''))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def submit_job(kind, fn, *args):
+    """Planifie fn(job, *args) et retourne la réponse 202 (ou 429 si la file est pleine)."""
+    try:
+        job = JOB_QUEUE.submit(kind, fn, *args)
+    except QueueFull:
+        return jsonify({'error': 'Job queue is full, retry later'}), 429, {'Retry-After': '5'}
+    body = job.to_dict()
+    body['status_url'] = f'/api/jobs/{job.id}'
+    body['result_url'] = f'/api/jobs/{job.id}/result'
+    return jsonify(body), 202, {'Location': body['status_url']}
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Résultat du job: le même corps que la route synchrone une fois terminé, 202 avant."""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if not job.done:
+        return jsonify(job.to_dict()), 202
+    if job.status == 'cancelled':
+        return jsonify({'error': 'Job cancelled', **job.to_dict()}), 409
+    if job.result is None:
+        return jsonify({'error': job.error or 'Job failed', **job.to_dict()}), 500
+    return jsonify(job.result), job.http_status
+
+
+@jobs_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of the job journal: 'log' (process_log steps as they
+    happen), throttled 'progress' (bytes, percent, Mpixels/s) and a final 'end'.
+    Reconnecting clients resume after the Last-Event-ID header.
+    """
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    try:
+        after = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        after = 0
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    if job.future is None:
+        # Job exécuté par un autre worker: seul son statut est partagé, on attend sa fin
+        def generate():
+            current = job
+            while not current.done:
+                time.sleep(0.5)
+                current = JOB_QUEUE.get(job_id) or current
+            yield f"event: end\ndata: {json.dumps(current.to_dict())}\n\n"
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+    def generate():
+        cursor = after
+        while True:
+            events = job.wait_events(cursor, config.SSE_HEARTBEAT_SECONDS)
+            if not events:
+                # Commentaire SSE: garde la connexion ouverte à travers les proxys
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event['event'] == 'end':
+                    return
+            cursor += len(events)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = JOB_QUEUE.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+def jobs_stats():
+    return jsonify(JOB_QUEUE.stats())
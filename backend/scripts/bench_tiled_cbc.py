@@ -0,0 +1,63 @@
+"""
+Benchmark du mode CBC segmenté ('tiled'): débit de chiffrement selon le nombre de cœurs.
+
+Usage (depuis backend/):
+    python scripts/bench_tiled_cbc.py --size 1024 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.image_processor import ImageProcessor
+from services import cipher_modes
+from services.encryption_service import EncryptionService
+from services.key_schedule import KeySchedule
+
+DEFAULT_PARAMS = {'log_x0': 0.1, 'log_mu': 3.99, 'tent_x0': 0.2, 'tent_r': 1.99, 'pwlcm_x0': 0.3, 'pwlcm_p': 0.254}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1024, help="Côté de l'image carrée de test (pixels)")
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help="Nombres de processus à tester")
+    parser.add_argument('--repeat', type=int, default=2, help="Mesures par configuration (la meilleure est gardée)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (args.size, args.size, 3), dtype=np.uint8)
+    X, _, _ = ImageProcessor.vectorize(image)
+    schedule = KeySchedule.get(DEFAULT_PARAMS, len(X))
+    X = X ^ schedule.AL
+    megabytes = len(X) / 1e6
+
+    # Référence: chaîne CBC unique (mode par défaut)
+    t0 = time.perf_counter()
+    EncryptionService.encrypt_vector(X, schedule, cipher_modes.MODE_CBC)
+    base = time.perf_counter() - t0
+    print(f"Image {args.size}x{args.size}x3 ({megabytes:.1f} Mo), {cpus} CPU")
+    print(f"{'mode':<8}{'workers':>8}{'tiles':>7}{'temps (s)':>12}{'Mo/s':>9}{'speedup':>9}")
+    print(f"{'cbc':<8}{1:>8}{1:>7}{base:>12.3f}{megabytes / base:>9.2f}{1.0:>9.2f}")
+
+    for workers in workers_list:
+        tiles = workers
+        # Premier appel: démarrage du pool (non mesuré)
+        EncryptionService.encrypt_vector(X[:tiles * 1024], KeySchedule.get(DEFAULT_PARAMS, tiles * 1024),
+                                         cipher_modes.MODE_TILED, tiles, workers)
+        best = float('inf')
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            EncryptionService.encrypt_vector(X, schedule, cipher_modes.MODE_TILED, tiles, workers)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{'tiled':<8}{workers:>8}{tiles:>7}{best:>12.3f}{megabytes / best:>9.2f}{base / best:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Déchiffrement en flux d'un conteneur chiffré brut (.chaos) vers un fichier .npy (N, M, 3),
+pour les images plus grandes que la RAM. Affiche la durée et le pic de mémoire résidente.
+
+Usage (depuis backend/):
+    python scripts/stream_decrypt.py mosaic.chaos mosaic.npy --log-x0 0.1 --block-size 1048576
+    # Comparaison avec le déchiffrement en mémoire (image entière chargée)
+    python scripts/stream_decrypt.py mosaic.chaos mosaic.npy --in-memory
+    # Une seule région (lignes 1000..1512, colonnes 2000..2512), via l'index de points de reprise
+    python scripts/stream_decrypt.py mosaic.chaos tile.npy --rows 1000 1512 --cols 2000 2512
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import cipher_container
+from services.chaotic_maps import ChaoticMaps
+from services.decryption_service import DecryptionService
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PARAMS = {'log_x0': 0.1, 'log_mu': 3.99, 'tent_x0': 0.2, 'tent_r': 1.99, 'pwlcm_x0': 0.3, 'pwlcm_p': 0.254}
+
+
+def peak_rss_bytes():
+    """
+    Pic de mémoire résidente du processus (octets) depuis son lancement, None si la plateforme
+    ne le fournit pas. Mesuré ici, où le processus ne fait qu'un seul déchiffrement.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss est en Kio sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="Conteneur chiffré (.chaos)")
+    parser.add_argument('output', help="Image déchiffrée (.npy, tableau (N, M, 3) uint8)")
+    for key in ChaoticMaps.PARAM_KEYS:
+        parser.add_argument('--' + key.replace('_', '-'), type=float, default=DEFAULT_PARAMS[key])
+    parser.add_argument('--block-size', type=int, default=None, help="Octets par bloc (défaut: KEYSTREAM_BLOCK_SIZE)")
+    parser.add_argument('--in-memory', action='store_true', help="Déchiffrement classique, pour comparer")
+    parser.add_argument('--rows', type=int, nargs=2, metavar=('R0', 'R1'), help="Région: lignes [R0, R1)")
+    parser.add_argument('--cols', type=int, nargs=2, metavar=('C0', 'C1'), help="Région: colonnes [C0, C1)")
+    args = parser.parse_args()
+
+    params = {key: getattr(args, key) for key in ChaoticMaps.PARAM_KEYS}
+    if args.rows or args.cols:
+        header = cipher_container.read_header(args.source)
+        start = time.time()
+        region = DecryptionService.decrypt_region(args.source, params, args.rows or (0, header['N']),
+                                                  args.cols or (0, header['M']))
+        np.save(args.output, region)
+        print(f"Région {region.shape[0]}x{region.shape[1]} en {time.time() - start:.1f}s "
+              f"(index de points de reprise compris)")
+        peak = peak_rss_bytes()
+    elif args.in_memory:
+        np.save(args.output, DecryptionService.decrypt_image(args.source, params))
+        peak = peak_rss_bytes()
+    else:
+        stats = DecryptionService.decrypt_stream(args.source, args.output, params, args.block_size)
+        print(f"{stats['N']}x{stats['M']} ({stats['mode']}, {stats['tiles']} segment(s)): "
+              f"{stats['blocks']} blocs de {stats['block_size']} octets en {stats['time']:.1f}s")
+        peak = peak_rss_bytes()
+
+    size = os.path.getsize(args.source)
+    if peak is not None:
+        print(f"Chiffré: {size / 2**20:.1f} Mio, pic de mémoire résidente: {peak / 2**20:.1f} Mio")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,44 @@
 import numpy as np
 import math
+from concurrent.futures import FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import time
+import config
+from services.chaotic_maps import ChaoticMaps
+from services.encryption_service import EncryptionService
+from services.key_schedule import KeySchedule
+from services.worker_pools import get_process_pool
+from models.image_processor import ImageProcessor
+
+
+def _share_arrays(arrays):
+    """Copie les tableaux dans un segment de mémoire partagée: (segment, [(nom, offset, forme, dtype)])."""
+    spec, offset = [], 0
+    for name, arr in arrays.items():
+        spec.append((name, offset, arr.shape, arr.dtype.str))
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, start, shape, dtype) in spec:
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = arrays[name]
+    return shm, spec
+
+
+def _sweep_worker_run(shm_name, spec, iv_val, mode, tiles, index, position, bit):
+    """Test différentiel dans un worker du pool, sur les données du balayage en mémoire partagée."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+                  for name, start, shape, dtype in spec}
+        # Seuls les champs utilisés par reencrypt_from / tile_layout
+        schedule = SimpleNamespace(length=arrays['AL'].shape[0], iv_val=iv_val,
+                                   **{k: arrays[k] for k in ('AL', 'BL', 'CL', 'C', 'S_Box')})
+        result = AnalysisService.differential_test(arrays['orig'], arrays['enc'], schedule, position, bit,
+                                                   mode, tiles, index)
+        del arrays, schedule  # Aucune vue ne doit survivre à la fermeture du segment
+        return result
+    finally:
+        shm.close()
 
 class AnalysisService:
     @staticmethod
@@ -123,3 +162,144 @@ class AnalysisService:
         val_y = channel_data[ys + dy, xs + dx]
         
         return val_x, val_y
+
+    @staticmethod
+    def sweep_positions(shape, count, seed=0):
+        """
+        Positions (ligne, colonne, canal) pour le balayage différentiel:
+        premier octet, coins de chaque canal, dernier octet, puis positions aléatoires.
+        """
+        N, M, _ = shape
+        fixed = [(0, 0, 0)]
+        for c in range(3):
+            fixed += [(0, 0, c), (0, M - 1, c), (N - 1, 0, c), (N - 1, M - 1, c)]
+        fixed.append((N - 1, M - 1, 2))
+
+        positions = list(dict.fromkeys(fixed))[:count]
+        rng = np.random.default_rng(seed)
+        seen = set(positions)
+        while len(positions) < min(count, N * M * 3):
+            pos = (int(rng.integers(N)), int(rng.integers(M)), int(rng.integers(3)))
+            if pos not in seen:
+                seen.add(pos)
+                positions.append(pos)
+        return positions
+
+    @staticmethod
+    def differential_test(orig_img, enc_img, schedule, position, bit=0, mode='cbc', tiles=1, index=0):
+        """Inverse le bit `bit` du clair en `position`, rechiffre (incrémental) et mesure NPCR/UACI."""
+        y, x, c = position
+        orig_mod = orig_img.copy()
+        orig_mod[y, x, c] ^= np.uint8(1 << bit)
+        enc_mod = EncryptionService.reencrypt_from(enc_img, schedule, orig_mod, [position], mode, tiles)
+        npcr, uaci = AnalysisService.calculate_npcr_uaci(enc_img, enc_mod)
+        return {'index': index, 'position': [int(y), int(x), int(c)], 'bit': bit,
+                'npcr': float(npcr), 'uaci': float(uaci)}
+
+    @staticmethod
+    def differential_sweep(orig_img, enc_img, schedule, positions, bit=0, mode='cbc', tiles=1, workers=1):
+        """
+        Balayage NPCR/UACI sur plusieurs positions modifiées, avec un keystream calculé une fois.
+        Les rechiffrements tournent dans le pool de processus partagé 'sweep' (SWEEP_WORKERS),
+        au plus `workers` à la fois; images et keystream sont placés une fois en mémoire partagée.
+        Les résultats sont produits (yield) au fur et à mesure de leur achèvement.
+        """
+        workers = min(workers, config.SWEEP_WORKERS)
+        if workers <= 1 or len(positions) <= 1:
+            for index, position in enumerate(positions):
+                yield AnalysisService.differential_test(orig_img, enc_img, schedule, position, bit, mode, tiles, index)
+            return
+
+        pool = get_process_pool('sweep', config.SWEEP_WORKERS)
+        shm, spec = _share_arrays({'orig': orig_img, 'enc': enc_img, 'AL': schedule.AL, 'BL': schedule.BL,
+                                   'CL': schedule.CL, 'C': schedule.C, 'S_Box': schedule.S_Box})
+        pending = set()
+        try:
+            queued = iter(enumerate(positions))
+            while True:
+                for index, position in queued:
+                    pending.add(pool.submit(_sweep_worker_run, shm.name, spec, schedule.iv_val, mode, tiles,
+                                            index, position, bit))
+                    if len(pending) >= workers:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # Client déconnecté ou erreur: abandon des rechiffrements non démarrés
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            shm.close()
+            shm.unlink()
+
+    @staticmethod
+    def summarize_sweep(results):
+        """Distribution des NPCR/UACI d'un balayage (min, max, moyenne, écart-type, quantiles)."""
+        summary = {'count': len(results)}
+        for metric in ('npcr', 'uaci'):
+            values = np.array([r[metric] for r in results], dtype=np.float64)
+            if values.size == 0:
+                summary[metric] = None
+                continue
+            summary[metric] = {
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'mean': float(values.mean()),
+                'std': float(values.std()),
+                'p05': float(np.percentile(values, 5)),
+                'p50': float(np.percentile(values, 50)),
+                'p95': float(np.percentile(values, 95)),
+            }
+        return summary
+
+    @staticmethod
+    def key_sensitivity(image_array, params, delta=1e-14, mode='cbc', tiles=1):
+        """
+        Sensibilité à la clé: chaque paramètre chaotique est perturbé de ±delta, l'image est
+        chiffrée avec chaque clé et comparée au chiffré de référence (taux de différence / UACI).
+        Les 1 + 12 orbites sont itérées ensemble (generate_keystream_batch).
+        """
+        timing = {}
+        t0 = time.time()
+        X, N, M = ImageProcessor.vectorize(image_array)
+        length = len(X)
+
+        labels = [None]
+        param_sets = [params]
+        for name in ChaoticMaps.PARAM_KEYS:
+            for sign in ('+', '-'):
+                perturbed = dict(params)
+                perturbed[name] = float(params[name]) + (delta if sign == '+' else -delta)
+                labels.append((name, sign))
+                param_sets.append(perturbed)
+
+        control = ChaoticMaps.generate_keystream_batch(param_sets, length)
+        timing['keystream'] = time.time() - t0
+
+        t1 = time.time()
+        schedules = [KeySchedule.from_control_vectors(length, *control[k]) for k in range(len(param_sets))]
+        timing['schedules'] = time.time() - t1
+
+        t2 = time.time()
+        ciphers = [ImageProcessor.reshape(EncryptionService.encrypt_vector(X ^ s.AL, s, mode, tiles), N, M)
+                   for s in schedules]
+        timing['encryption'] = time.time() - t2
+
+        parameters = {name: {} for name in ChaoticMaps.PARAM_KEYS}
+        for (name, sign), cipher in zip(labels[1:], ciphers[1:]):
+            rate, uaci = AnalysisService.calculate_npcr_uaci(ciphers[0], cipher)
+            parameters[name][sign] = {'difference_rate': float(rate), 'uaci': float(uaci)}
+        timing['total'] = time.time() - t0
+
+        rates = [v['difference_rate'] for p in parameters.values() for v in p.values()]
+        return {
+            'delta': delta,
+            'size': [int(N), int(M)],
+            'keys': len(param_sets),
+            'parameters': parameters,
+            'mean_difference_rate': float(np.mean(rates)),
+            'timing': timing,
+        }
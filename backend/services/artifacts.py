@@ -0,0 +1,154 @@
+# Fichiers produits par les requêtes (uploads, images chiffrées/déchiffrées, graphes).
+#
+# Chaque fichier porte un identifiant unique et les graphes sont rangés par session:
+# deux requêtes concurrentes (éventuellement sur deux workers) n'écrivent jamais
+# le même chemin. Le nettoyage se fait par âge, jamais d'après "le dernier fichier".
+#
+# En mode 'memory', les images ne passent plus par le disque: elles sont encodées en
+# mémoire et servies depuis un cache LRU du processus (/api/artifacts/<id>).
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import config
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+EXPORTS_DIR = os.path.join(STATIC_DIR, 'exports')
+SESSION_EXPORTS_DIR = os.path.join(EXPORTS_DIR, 'sessions')
+
+# Préfixes des fichiers temporaires de static/ supprimés par cleanup() ('temp_': temp_upload_,
+# temp_decrypt_ et les anciens temp_*.png, comme le nettoyage historique au démarrage)
+TEMP_PREFIXES = ('temp_', 'encrypted_', 'decrypted_')
+
+
+def new_artifact(prefix, ext='.png', run_id=None):
+    """(chemin absolu, URL /static/...) d'un nouveau fichier de static/ propre à la requête."""
+    filename = f'{prefix}{run_id or uuid.uuid4().hex}{ext}'
+    return os.path.join(STATIC_DIR, filename), f'/static/{filename}'
+
+
+def session_export_dir(export_id, touch=True):
+    """
+    Dossier des graphes d'une session (exporté tel quel par /api/export/zip), nommé d'après
+    son identifiant d'export (SessionStore.export_id), jamais d'après le jeton de session.
+    `touch` rafraîchit sa date: le nettoyage par âge épargne les sessions actives.
+    """
+    path = os.path.join(SESSION_EXPORTS_DIR, export_id)
+    if touch:
+        os.makedirs(path, exist_ok=True)
+        os.utime(path)
+    return path
+
+
+def chart_key(*parts):
+    """Clé des graphes d'une session: empreinte de l'image chiffrée et des paramètres qui les déterminent."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def session_chart_dir(export_id, key, touch=True):
+    """
+    Dossier des graphes de la clé `key` dans le dossier d'export de la session (rendus à la
+    demande, puis réutilisés tant que la clé ne change pas). À la création, les dossiers des
+    clés précédentes (image ou paramètres remplacés) sont supprimés.
+    """
+    base = session_export_dir(export_id, touch)
+    path = os.path.join(base, key)
+    if touch and not os.path.isdir(path):
+        for name in os.listdir(base):
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cleanup(max_age=None):
+    """
+    Supprime les fichiers temporaires (toutes extensions: .png, .chaos, uploads) et dossiers
+    de graphes plus anciens que `max_age` secondes. Retourne le nombre d'éléments supprimés.
+    """
+    max_age = config.ARTIFACT_RETENTION_SECONDS if max_age is None else max_age
+    limit = time.time() - max_age
+    removed = 0
+    try:
+        for name in os.listdir(STATIC_DIR):
+            path = os.path.join(STATIC_DIR, name)
+            if name.startswith(TEMP_PREFIXES) and os.path.isfile(path) and os.stat(path).st_mtime < limit:
+                os.remove(path)
+                removed += 1
+        if os.path.isdir(SESSION_EXPORTS_DIR):
+            for name in os.listdir(SESSION_EXPORTS_DIR):
+                path = os.path.join(SESSION_EXPORTS_DIR, name)
+                if os.stat(path).st_mtime < limit:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+    except OSError:
+        pass  # Fichier supprimé entre-temps par un autre worker: sans conséquence
+    return removed
+
+
+def get_store(value=None):
+    """Stockage des images produites: 'disk' (static/) ou 'memory' (cache du processus)."""
+    store = (value or config.ARTIFACT_STORE).lower()
+    if store not in ('disk', 'memory'):
+        raise ValueError(f"Stockage d'artefacts inconnu: {store}")
+    return store
+
+
+OUTPUT_FORMATS = ('png', 'png-stored', 'raw')
+
+
+def get_format(value=None):
+    """Format de l'image chiffrée produite: 'png', 'png-stored' ou 'raw' (conteneur .chaos)."""
+    output_format = (value or config.OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format de sortie inconnu: {output_format}")
+    return output_format
+
+
+class ArtifactCache:
+    """Cache LRU thread-safe d'artefacts encodés (octets + type MIME), borné en octets."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, data, mimetype='image/png', artifact_id=None):
+        """Ajoute un artefact; retourne son identifiant, ou None s'il dépasse la capacité du cache."""
+        if len(data) > self.max_bytes:
+            return None
+        artifact_id = artifact_id or uuid.uuid4().hex
+        with self._lock:
+            old = self._entries.pop(artifact_id, None)
+            if old is not None:
+                self.current_bytes -= len(old[0])
+            self._entries[artifact_id] = (data, mimetype)
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+        return artifact_id
+
+    def get(self, artifact_id):
+        """(octets, type MIME) ou None si absent (évincé, ou produit par un autre worker)."""
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            if entry is not None:
+                self._entries.move_to_end(artifact_id)
+            return entry
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.current_bytes, 'max_bytes': self.max_bytes}
+
+
+ARTIFACT_CACHE = ArtifactCache(config.ARTIFACT_CACHE_BYTES)
+
+
+def artifact_url(artifact_id):
+    return f'/api/artifacts/{artifact_id}'
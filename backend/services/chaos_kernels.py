@@ -0,0 +1,135 @@
+# Noyaux d'itération des cartes chaotiques (Logistique, Tente, PWLCM).
+#
+# Chaque noyau remplit le tableau `out` avec les itérés successifs à partir de
+# l'état `x` et retourne l'état final, ce qui permet de reprendre une orbite là
+# où elle s'est arrêtée. Le backend est choisi une seule fois, à l'import:
+# - 'numba'  : noyaux compilés JIT (mêmes opérations flottantes, sans fastmath)
+# - 'python' : boucles Python de référence (repli si numba est absent)
+import numpy as np
+import config
+
+
+def _logistic_kernel(x, mu, out):
+    # Xn+1 = μ * Xn * (1 - Xn)
+    for i in range(out.shape[0]):
+        x = mu * x * (1 - x)
+        out[i] = x
+    return x
+
+
+def _tent_kernel(x, r, out):
+    # Xn+1 = r * Xn si Xn < 0.5, r * (1 - Xn) sinon
+    for i in range(out.shape[0]):
+        if x < 0.5:
+            x = r * x
+        else:
+            x = r * (1 - x)
+        out[i] = x
+    return x
+
+
+def _pwlcm_kernel(x, p, out):
+    # PWLCM symétrique autour de 0.5: f(x) = f(1 - x) pour x >= 0.5
+    for i in range(out.shape[0]):
+        if 0 <= x < p:
+            x = x / p
+        elif p <= x < 0.5:
+            x = (x - p) / (0.5 - p)
+        elif 0.5 <= x < 1:
+            temp_x = 1 - x
+            if 0 <= temp_x < p:
+                x = temp_x / p
+            elif p <= temp_x < 0.5:
+                x = (temp_x - p) / (0.5 - p)
+        out[i] = x
+    return x
+
+
+# Noyaux "batch": K jeux de paramètres itérés ensemble, vectorisés sur l'axe des clés.
+# x et le paramètre sont des vecteurs (K,), `out` est de forme (n, K).
+# Les opérations flottantes sont les mêmes, élément par élément, que les noyaux scalaires.
+
+def _logistic_batch_kernel(x, mu, out):
+    for i in range(out.shape[0]):
+        x = mu * x * (1 - x)
+        out[i] = x
+    return x
+
+
+def _tent_batch_kernel(x, r, out):
+    for i in range(out.shape[0]):
+        # min(x, 1 - x) vaut x si x < 0.5 et 1 - x sinon (égaux en 0.5)
+        x = r * np.minimum(x, 1 - x)
+        out[i] = x
+    return x
+
+
+def _pwlcm_batch_kernel(x, p, out):
+    for i in range(out.shape[0]):
+        # Symétrie: sur [0.5, 1) on applique les deux premières branches à 1 - x
+        y = np.where((0.5 <= x) & (x < 1), 1 - x, x)
+        x = np.where((0 <= y) & (y < p), y / p,
+                     np.where((p <= y) & (y < 0.5), (y - p) / (0.5 - p), x))
+        out[i] = x
+    return x
+
+
+def _per_key_batch(kernel):
+    """Version "batch" qui itère chaque clé avec le noyau scalaire (colonne de `out`)."""
+    def batch(x, param, out):
+        final = np.empty_like(x)
+        for k in range(x.shape[0]):
+            final[k] = kernel(x[k], param[k], out[:, k])
+        return final
+    return batch
+
+
+PYTHON_KERNELS = {
+    'logistic': _logistic_kernel,
+    'tent': _tent_kernel,
+    'pwlcm': _pwlcm_kernel,
+}
+
+PYTHON_BATCH_KERNELS = {
+    'logistic': _logistic_batch_kernel,
+    'tent': _tent_batch_kernel,
+    'pwlcm': _pwlcm_batch_kernel,
+}
+
+
+def _load_numba_kernels():
+    """Compile les noyaux avec numba. Retourne None si numba est indisponible."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # nogil: les noyaux compilés libèrent le GIL et peuvent tourner en parallèle
+    kernels = {name: njit(cache=True, nogil=True)(fn) for name, fn in PYTHON_KERNELS.items()}
+    # Compilé, le noyau scalaire par clé est plus rapide que des opérations vectorielles par pas
+    batch_kernels = {name: njit(nogil=True)(_per_key_batch(fn)) for name, fn in kernels.items()}
+    return kernels, batch_kernels
+
+
+def _select_backend(requested):
+    if requested in ('auto', 'numba'):
+        kernels = _load_numba_kernels()
+        if kernels is not None:
+            return ('numba',) + kernels
+        if requested == 'numba':
+            print("Chaos kernels: numba requested but not installed, falling back to Python.")
+    return 'python', PYTHON_KERNELS, PYTHON_BATCH_KERNELS
+
+
+BACKEND, KERNELS, BATCH_KERNELS = _select_backend(config.CHAOS_KERNEL_BACKEND)
+
+# En Python pur, la vectorisation sur l'axe des clés ne rentabilise le coût fixe
+# des opérations NumPy par pas qu'à partir de quelques dizaines de clés.
+VECTOR_MIN_KEYS = 48
+_PYTHON_PER_KEY_KERNELS = {name: _per_key_batch(fn) for name, fn in PYTHON_KERNELS.items()}
+
+
+def get_batch_kernel(name, keys):
+    """Noyau "batch" le plus rapide pour K = `keys` jeux de paramètres."""
+    if BACKEND == 'python' and keys < VECTOR_MIN_KEYS:
+        return _PYTHON_PER_KEY_KERNELS[name]
+    return BATCH_KERNELS[name]
@@ -1,6 +1,17 @@
 import numpy as np
+import config
+from services import chaos_kernels, parallel_chaos
+from services.sequence_cache import SEQUENCE_CACHE
 
 class ChaoticMaps:
+    # Clés de paramètres attendues (ordre canonique, sert aussi de clé de cache)
+    PARAM_KEYS = ('log_x0', 'log_mu', 'tent_x0', 'tent_r', 'pwlcm_x0', 'pwlcm_p')
+
+    @staticmethod
+    def get_backend():
+        """Retourne le nom du backend de noyaux actif ('numba' ou 'python')."""
+        return chaos_kernels.BACKEND
+
     @staticmethod
     def logistic_map(x0, mu, length):
         """
@@ -8,10 +19,7 @@ class ChaoticMaps:
         Xn+1 = μ * Xn * (1 - Xn)
         """
         sequence = np.zeros(length)
-        x = x0
-        for i in range(length):
-            x = mu * x * (1 - x)
-            sequence[i] = x
+        chaos_kernels.KERNELS['logistic'](float(x0), float(mu), sequence)
         return sequence
 
     @staticmethod
@@ -22,13 +30,7 @@ class ChaoticMaps:
              = r * (1 - Xn)    si Xn >= 0.5
         """
         sequence = np.zeros(length)
-        x = x0
-        for i in range(length):
-            if x < 0.5:
-                x = r * x
-            else:
-                x = r * (1 - x)
-            sequence[i] = x
+        chaos_kernels.KERNELS['tent'](float(x0), float(r), sequence)
         return sequence
 
     @staticmethod
@@ -38,24 +40,7 @@ class ChaoticMaps:
         Piecewise Linear Chaotic Map
         """
         sequence = np.zeros(length)
-        x = x0
-        for i in range(length):
-            if 0 <= x < p:
-                x = x / p
-            elif p <= x < 0.5:
-                x = (x - p) / (0.5 - p)
-            elif 0.5 <= x < 1:
-                # Exploiting symmetry: f(1-x, p) is equivalent to processing 1-x with the first two conditions
-                # Essentially PWLCM is symmetric around 0.5
-                temp_x = 1 - x
-                if 0 <= temp_x < p:
-                    x = temp_x / p
-                elif p <= temp_x < 0.5:
-                    x = (temp_x - p) / (0.5 - p)
-                else: 
-                     # Should not happen if x is in [0.5, 1) -> 1-x in (0, 0.5]
-                     pass
-            sequence[i] = x
+        chaos_kernels.KERNELS['pwlcm'](float(x0), float(p), sequence)
         return sequence
 
     @staticmethod
@@ -63,10 +48,15 @@ class ChaoticMaps:
         """
         Génère les 3 séquences chaotiques (u, v, w) basées sur les paramètres.
         Params dict doit contenir: 'log_x0', 'log_mu', 'tent_x0', 'tent_r', 'pwlcm_x0', 'pwlcm_p'
+        Les orbites viennent du cache de séquences (préfixes servis sans copie,
+        extension depuis l'état final sauvegardé) et sont en lecture seule.
+        Les orbites manquantes sont calculées simultanément (voir parallel_chaos).
         """
-        u = ChaoticMaps.logistic_map(params['log_x0'], params['log_mu'], length)
-        v = ChaoticMaps.tent_map(params['tent_x0'], params['tent_r'], length)
-        w = ChaoticMaps.pwlcm_map(params['pwlcm_x0'], params['pwlcm_p'], length)
+        u, v, w = SEQUENCE_CACHE.get_many([
+            ('logistic', params['log_x0'], params['log_mu']),
+            ('tent', params['tent_x0'], params['tent_r']),
+            ('pwlcm', params['pwlcm_x0'], params['pwlcm_p']),
+        ], length, run_kernels=parallel_chaos.run_kernels)
         return u, v, w
 
     @staticmethod
@@ -90,3 +80,131 @@ class ChaoticMaps:
         c = (u >= w).astype(np.uint8)
         
         return al, bl, cl, c
+
+    @staticmethod
+    def quantize_block(u, v, w, control, scratch):
+        """
+        Quantification (identique à generate_control_vectors) écrite directement
+        dans `control` (uint8, lignes AL, BL, CL, C) via un seul tampon flottant.
+        """
+        for seq, out in zip((u, v, w), control[:3]):
+            np.multiply(seq, 1e14, out=scratch)
+            np.mod(scratch, 256, out=scratch)
+            np.floor(scratch, out=scratch)
+            np.copyto(out, scratch, casting='unsafe')
+        np.greater_equal(u, w, out=control[3].view(np.bool_))
+
+    @staticmethod
+    def iter_keystream(params, length, block_size=None, states=None):
+        """
+        Itère les 3 cartes par blocs de taille fixe sans jamais matérialiser u, v, w.
+        Yield (start, uvw, control): uvw (3, n) float64 et control (4, n) uint8 (AL, BL, CL, C).
+        Les tampons sont réutilisés d'un bloc à l'autre: copier ce qui doit être conservé.
+        `states` (u, v, w) reprend les orbites depuis un point de reprise au lieu des x0.
+        """
+        block_size = block_size or config.KEYSTREAM_BLOCK_SIZE
+        maps = [
+            ('logistic', float(params['log_mu'])),
+            ('tent', float(params['tent_r'])),
+            ('pwlcm', float(params['pwlcm_p'])),
+        ]
+        if states is None:
+            states = [float(params['log_x0']), float(params['tent_x0']), float(params['pwlcm_x0'])]
+        states = [float(x) for x in states]
+
+        floats = np.empty((3, min(block_size, length)))
+        control = np.empty((4, min(block_size, length)), dtype=np.uint8)
+        scratch = np.empty(min(block_size, length))
+
+        for start in range(0, length, block_size):
+            n = min(block_size, length - start)
+            uvw = floats[:, :n]
+            # Les 3 cartes d'un bloc sont indépendantes: calcul simultané si activé
+            states = parallel_chaos.run_kernels([
+                (name, states[k], param, uvw[k]) for k, (name, param) in enumerate(maps)
+            ])
+            ChaoticMaps.quantize_block(uvw[0], uvw[1], uvw[2], control[:, :n], scratch[:n])
+            yield start, uvw, control[:, :n]
+
+    @staticmethod
+    def generate_keystream(params, length, preview_length=0, block_size=None, mode=None):
+        """
+        Génère AL, BL, CL, C (uint8) dans un tampon (4, length) préalloué.
+        Seuls les `preview_length` premiers échantillons flottants de u, v, w sont conservés
+        (graphes des cartes). Retourne (AL, BL, CL, C), (u_preview, v_preview, w_preview).
+        """
+        mode = mode or config.KEYSTREAM_MODE
+        if mode == 'auto':
+            # Les orbites complètes ne valent la peine d'être gardées que si elles tiennent en cache
+            fits = 3 * length * np.dtype(np.float64).itemsize <= config.SEQUENCE_CACHE_BYTES
+            mode = 'cached' if fits else 'stream'
+        block_size = block_size or config.KEYSTREAM_BLOCK_SIZE
+
+        control = np.empty((4, length), dtype=np.uint8)
+        preview = np.empty((3, min(preview_length, length)))
+
+        if mode == 'cached':
+            u, v, w = ChaoticMaps.generate_sequences(params, length)
+            scratch = np.empty(min(block_size, length))
+            for start in range(0, length, block_size):
+                stop = min(start + block_size, length)
+                ChaoticMaps.quantize_block(u[start:stop], v[start:stop], w[start:stop],
+                                           control[:, start:stop], scratch[:stop - start])
+            preview[:] = (u[:preview.shape[1]], v[:preview.shape[1]], w[:preview.shape[1]])
+        else:
+            for start, uvw, block in ChaoticMaps.iter_keystream(params, length, block_size):
+                control[:, start:start + block.shape[1]] = block
+                if start < preview.shape[1]:
+                    count = min(preview.shape[1] - start, uvw.shape[1])
+                    preview[:, start:start + count] = uvw[:, :count]
+
+        return tuple(control), tuple(preview)
+
+    @staticmethod
+    def _batch_params(param_sets):
+        """Vecteurs (K,) de paramètres, dans l'ordre de PARAM_KEYS."""
+        return {k: np.array([float(p[k]) for p in param_sets]) for k in ChaoticMaps.PARAM_KEYS}
+
+    @staticmethod
+    def generate_sequences_batch(param_sets, length):
+        """
+        Génère u, v, w pour K jeux de paramètres itérés ensemble (vecteurs sur l'axe des clés).
+        Retourne trois tableaux (K, length), identiques à generate_sequences clé par clé.
+        """
+        vec = ChaoticMaps._batch_params(param_sets)
+        maps = (('logistic', 'log_x0', 'log_mu'), ('tent', 'tent_x0', 'tent_r'), ('pwlcm', 'pwlcm_x0', 'pwlcm_p'))
+        sequences = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, x_key, p_key in maps:
+                out = np.empty((length, len(param_sets)))
+                chaos_kernels.get_batch_kernel(name, len(param_sets))(vec[x_key], vec[p_key], out)
+                sequences.append(np.ascontiguousarray(out.T))
+        return tuple(sequences)
+
+    @staticmethod
+    def generate_keystream_batch(param_sets, length, block_size=None):
+        """
+        Keystream (AL, BL, CL, C) pour K jeux de paramètres, itérés ensemble par blocs.
+        Retourne un tableau uint8 (K, 4, length); seuls des blocs flottants sont alloués.
+        """
+        block_size = block_size or config.KEYSTREAM_BLOCK_SIZE
+        vec = ChaoticMaps._batch_params(param_sets)
+        maps = (('logistic', 'log_mu'), ('tent', 'tent_r'), ('pwlcm', 'pwlcm_p'))
+        states = [vec['log_x0'], vec['tent_x0'], vec['pwlcm_x0']]
+        keys = len(param_sets)
+
+        control = np.empty((keys, 4, length), dtype=np.uint8)
+        floats = np.empty((3, min(block_size, length), keys))
+        scratch = np.empty(min(block_size, length))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, length, block_size):
+                n = min(block_size, length - start)
+                for k, (name, p_key) in enumerate(maps):
+                    states[k] = chaos_kernels.get_batch_kernel(name, keys)(states[k], vec[p_key], floats[k, :n])
+                # (n, K) -> une ligne contiguë par clé pour la quantification
+                uvw = np.ascontiguousarray(floats[:, :n].transpose(2, 0, 1))
+                for key in range(keys):
+                    ChaoticMaps.quantize_block(uvw[key, 0], uvw[key, 1], uvw[key, 2],
+                                               control[key, :, start:start + n], scratch[:n])
+        return control
@@ -0,0 +1,54 @@
+# Séries brutes des graphes, sérialisables en JSON, tracées côté client (frontend).
+#
+# Mêmes données que celles transmises au rendu PNG (ExportService): comptages
+# d'histogramme, paires de pixels voisins, premiers itérés des cartes, S-Box.
+# Les séries d'octets (paires, S-Box) sont transmises en base64 (tableau typé Uint8Array
+# côté client): 4 fois moins volumineux qu'une liste JSON d'entiers.
+import base64
+
+import numpy as np
+
+from services.analysis_service import AnalysisService
+
+CHANNELS = ('red', 'green', 'blue')
+DIRECTIONS = ('Horizontal', 'Vertical', 'Diagonal')
+
+
+def encode_bytes(values):
+    """Octets (uint8) en base64."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=np.uint8).tobytes()).decode('ascii')
+
+
+def histograms(original_img, encrypted_img):
+    """{'original'|'encrypted': {canal: 256 comptages}}."""
+    return {name: {channel: np.bincount(img[:, :, i].ravel(), minlength=256).tolist()
+                   for i, channel in enumerate(CHANNELS)}
+            for name, img in (('original', original_img), ('encrypted', encrypted_img))}
+
+
+def correlation(original_img, encrypted_img, num_pairs=3000):
+    """
+    {'original'|'encrypted': {direction: {canal: {'x', 'y'}}}}: paires (pixel, voisin)
+    échantillonnées comme pour les scatter plots, en base64.
+    """
+    data = {}
+    for name, img in (('original', original_img), ('encrypted', encrypted_img)):
+        data[name] = {}
+        for d in DIRECTIONS:
+            data[name][d.lower()] = {}
+            for i, channel in enumerate(CHANNELS):
+                val_x, val_y = AnalysisService.get_correlation_data(img, d, i, num_pairs)
+                data[name][d.lower()][channel] = {'x': encode_bytes(val_x), 'y': encode_bytes(val_y)}
+    return data
+
+
+def chaotic_maps(u, v, w, limit=1000):
+    """Premiers itérés des 3 cartes (arrondis: la précision d'affichage suffit)."""
+    return {name: np.round(np.asarray(data[:limit], dtype=float), 6).tolist()
+            for name, data in (('logistic', u), ('tent', v), ('pwlcm', w))}
+
+
+def sbox(table):
+    """S-Box 256x256 en base64 (ligne par ligne)."""
+    table = np.asarray(table)
+    return {'shape': list(table.shape), 'data': encode_bytes(table)}
@@ -0,0 +1,95 @@
+# Rendu des graphes avec l'API objet de matplotlib (Figure), sans état pyplot partagé.
+#
+# Chaque fonction est indépendante et ne reçoit que les petites données du graphe
+# (comptages d'histogramme, paires échantillonnées, 1000 itérés, table 256x256, scalaires):
+# elle peut tourner dans un processus du pool de rendu (voir ExportService).
+# Signature commune: fn(path, dpi, **données) -> path.
+import numpy as np
+from matplotlib.figure import Figure
+
+
+def _save(fig, path, dpi):
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    return path
+
+
+def histogram(path, dpi, counts, color, title):
+    """Histogramme 256 niveaux à partir des comptages (np.bincount)."""
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar(np.arange(256), counts, width=1, align='edge', color=color, alpha=0.7)
+    ax.set_title(title)
+    ax.set_xlabel("Valeur Pixel")
+    ax.set_ylabel("Fréquence")
+    return _save(fig, path, dpi)
+
+
+def scatter(path, dpi, x, y, color, title):
+    """Nuage de corrélation entre pixels voisins (paires échantillonnées)."""
+    fig = Figure(figsize=(5, 5))
+    ax = fig.subplots()
+    ax.scatter(x, y, s=1, c=color)
+    ax.set_title(title)
+    ax.set_xlabel("Pixel (x, y)")
+    ax.set_ylabel("Pixel voisin")
+    ax.set_xlim(0, 255)
+    ax.set_ylim(0, 255)
+    return _save(fig, path, dpi)
+
+
+def chaotic_map(path, dpi, samples, color, title):
+    """Premiers itérés d'une carte chaotique."""
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(samples, '.', markersize=1, color=color)
+    ax.set_title(title)
+    ax.set_xlabel("n")
+    ax.set_ylabel("Xn")
+    return _save(fig, path, dpi)
+
+
+def sbox_heatmap(path, dpi, sbox):
+    """Heatmap de la S-Box 256x256 avec barre de couleurs."""
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    im = ax.imshow(sbox, cmap='viridis', interpolation='nearest')
+    fig.colorbar(im, ax=ax)
+    ax.set_title("Visualisation S-Box (256x256)")
+    return _save(fig, path, dpi)
+
+
+def grouped_bars(path, dpi, labels, series, title, ylabel, figsize=(8, 5), ylim=None, hline=None):
+    """
+    Barres groupées: `series` = [(légende, valeurs, couleur, alpha)].
+    `hline` = (valeur, couleur, légende) trace une ligne de référence.
+    """
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    x = np.arange(len(labels))
+    width = 0.35
+    for k, (label, values, color, alpha) in enumerate(series):
+        ax.bar(x + (k - 0.5) * width, values, width, label=label, color=color, alpha=alpha)
+    if hline is not None:
+        value, color, label = hline
+        ax.axhline(value, color=color, linestyle='--', label=label)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    ax.legend()
+    return _save(fig, path, dpi)
+
+
+def labeled_bars(path, dpi, labels, values, colors, title, ylabel, ylim):
+    """Barres simples annotées de leur valeur (comparaison d'entropie)."""
+    fig = Figure(figsize=(6, 5))
+    ax = fig.subplots()
+    ax.bar(labels, values, color=colors)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_ylim(*ylim)
+    for i, v in enumerate(values):
+        ax.text(i, v + 0.1, f"{v:.4f}", ha='center')
+    return _save(fig, path, dpi)
@@ -0,0 +1,67 @@
+# Modes de chaînage du chiffrement, versionnés et enregistrés avec le chiffré.
+# - 'cbc'   (v1): une chaîne CBC unique sur les 3NM octets (défaut, NPCR/UACI comparables)
+# - 'tiled' (v2): K segments CBC indépendants, chacun avec son IV chaotique,
+#                 chiffrables en parallèle
+
+MODE_CBC = 'cbc'
+MODE_TILED = 'tiled'
+VERSIONS = {MODE_CBC: 1, MODE_TILED: 2}
+
+# Clés des métadonnées texte (PNG) décrivant le mode
+META_VERSION = 'ChaosCrypt-Version'
+META_MODE = 'ChaosCrypt-Mode'
+META_TILES = 'ChaosCrypt-Tiles'
+META_KEY_CHECK = 'ChaosCrypt-KCV'
+
+
+def normalize(mode, tiles, length):
+    """Valide (mode, tiles): le mode 'cbc' est toujours un seul segment."""
+    mode = (mode or MODE_CBC).lower()
+    if mode not in VERSIONS:
+        raise ValueError(f"Mode de chiffrement inconnu: {mode}")
+    if mode == MODE_CBC:
+        return MODE_CBC, 1
+    tiles = int(tiles)
+    if not 1 <= tiles <= length:
+        raise ValueError(f"Nombre de segments invalide: {tiles} (1..{length})")
+    return MODE_TILED, tiles
+
+
+def make_metadata(mode, tiles, key_check=b''):
+    metadata = {META_VERSION: str(VERSIONS[mode]), META_MODE: mode, META_TILES: str(tiles)}
+    if key_check:
+        metadata[META_KEY_CHECK] = key_check.hex()
+    return metadata
+
+
+def parse_metadata(metadata):
+    """Retourne (mode, tiles) depuis les métadonnées; chaîne CBC unique si absentes."""
+    mode = metadata.get(META_MODE, MODE_CBC)
+    tiles = int(metadata.get(META_TILES, 1))
+    return mode, tiles
+
+
+def parse_key_check(metadata):
+    """Valeur de contrôle de clé (octets) des métadonnées, b'' si absente (chiffré ancien)."""
+    return bytes.fromhex(metadata.get(META_KEY_CHECK, ''))
+
+
+def tile_bounds(length, tiles):
+    """Bornes [start, stop) des K segments (tailles égales à un octet près)."""
+    return [(k * length // tiles, (k + 1) * length // tiles) for k in range(tiles)]
+
+
+def tile_layout(schedule, tiles):
+    """
+    Liste [(start, stop, iv)] des segments. Le premier garde l'IV de session;
+    le segment k > 0 prend un IV dérivé du keystream à la position qui le précède:
+    IV_k = (IV + AL[s_k - 1] + CL[s_k - 1]) mod 256.
+    """
+    layout = []
+    for k, (start, stop) in enumerate(tile_bounds(schedule.length, tiles)):
+        if k == 0:
+            iv = schedule.iv_val
+        else:
+            iv = (schedule.iv_val + int(schedule.AL[start - 1]) + int(schedule.CL[start - 1])) % 256
+        layout.append((start, stop, iv))
+    return layout
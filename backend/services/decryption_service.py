@@ -1,8 +1,16 @@
+import time
+
 import numpy as np
+import config
+from services import cipher_modes, key_check
 from services.chaotic_maps import ChaoticMaps
+from services.key_schedule import KeySchedule
+from services.keystream_index import KeystreamIndex
 from services.permutation import PermutationService
+from models import cipher_container
 from models.image_processor import ImageProcessor
 
+
 class DecryptionService:
     @staticmethod
     def get_modular_inverse_table():
@@ -22,86 +30,233 @@ class DecryptionService:
         return table
 
     @staticmethod
-    def decrypt_image(image_path, params):
+    def decrypt_vector(X_prime, schedule, tiles=1):
         """
-        Exécute l'algorithme complet de déchiffrement (Projet 4).
+        Déchiffrement CBC entièrement vectorisé (sans boucle Python).
+        X[i] = InvTrans(X'[i]) ^ X'[i-1], avec X'[-1] = IV, puis X = X ^ AL.
+        Chaque position ne lit que le chiffré (X'[i] et X'[i-1]) : aucune
+        dépendance entre itérations, tout le vecteur est traité d'un coup.
+        En mode segmenté (tiles > 1), chaque segment repart de son propre IV.
         """
-        # 1. Chargement et Vectorisation
-        img_array = ImageProcessor.load_image(image_path)
-        X_prime, N, M = ImageProcessor.vectorize(img_array)
-        total_pixels = 3 * N * M
-        
-        # 2. Régénération des séquences
-        u, v, w = ChaoticMaps.generate_sequences(params, total_pixels)
-        AL, BL, CL, C = ChaoticMaps.generate_control_vectors(u, v, w)
+        X_prime = np.asarray(X_prime, dtype=np.uint8)
+        AL, BL, CL, C = schedule.AL, schedule.BL, schedule.CL, schedule.C
         
-        # Force BL to be odd (same as encryption)
-        # Type casting for safer numpy operations
-        BL = BL.astype(np.uint8) | 1
+        # Inverse Substitution: Inv_S_Box[AL[i], X'[i]] (lookup 2D en une passe)
+        X_rec = schedule.Inv_S_Box[AL, X_prime]
         
-        # 3. Génération P-Box et S-Box
-        P_Box = PermutationService.generate_permutation(AL)
-        S_Box = PermutationService.generate_sbox(P_Box, AL)
+        # Inverse Affine: (y - b) * a^-1 mod 256
+        # L'arithmétique uint8 boucle naturellement modulo 256.
+        affine = (X_prime - CL) * schedule.inv_table[BL]
+        np.copyto(X_rec, affine, where=C.astype(bool))
         
-        # Génération des inverses
-        # S-Box Inverse
-        Inv_S_Box = np.zeros_like(S_Box)
-        for r in range(256):
-            Inv_S_Box[r] = np.argsort(S_Box[r])
-        Inv_S_Box = Inv_S_Box.astype(np.int32)
+        # Inverse Diffusion: XOR avec le chiffré décalé d'une position (IV en tête)
+        X_rec[1:] ^= X_prime[:-1]
+        for start, _, iv in cipher_modes.tile_layout(schedule, tiles):
+            # Début de segment: on remplace X'[start-1] par l'IV du segment
+            prev = int(X_prime[start - 1]) if start > 0 else 0
+            X_rec[start] ^= np.uint8(prev ^ iv)
         
-        # Affine Inverse (BL^-1 mod 256)
-        # Using a lookup table for speed since mod is 256
-        def modInverse(n):
-            return pow(int(n), -1, 256)
-        v_modInverse = np.vectorize(modInverse)
-        BL_inv = v_modInverse(BL).astype(np.int32)
-        
-        # 4. IV Generation (Key-Dependent to match Encryption)
-        iv_val = (int(np.sum(AL)) + int(np.sum(BL)) + int(np.sum(CL))) % 256
-        
-        # 5. Déchiffrement CBC (Inverse Loop)
-        # X_prime is Ciphertext. X_rec works as diffused-plaintext intermediate.
-        
-        # Optimisation: Cast arrays to int32 to avoid overflow/wrap during calc
-        X_prime_int = X_prime.astype(np.int32)
-        AL_int = AL.astype(np.int32)
-        CL_int = CL.astype(np.int32)
-        C_int = C.astype(np.int32)
-        
-        X_rec = np.zeros(total_pixels, dtype=np.uint8)
-        
-        # Loop i from End down to 1
-        # X[i] = InvTrans(X'[i]) ^ X'[i-1]
+        # Inverse Pre-diffusion XOR
+        X_rec ^= AL
+        return X_rec
+
+    @staticmethod
+    def decrypt_image(image_path, params, mode=None, tiles=None):
+        """
+        Exécute l'algorithme complet de déchiffrement (Projet 4).
+        Le mode de chaînage (et le nombre de segments) est lu dans les métadonnées
+        de l'image chiffrée, sauf s'il est passé explicitement.
+        `image_path` peut être un PNG ou un conteneur brut (chemin ou octets).
+        Une clé qui ne correspond pas à la valeur de contrôle (KCV) est rejetée avant
+        tout décodage (key_check.KeyMismatch).
+        """
+        if cipher_container.is_container(image_path):
+            return DecryptionService.decrypt_container(image_path, params, mode, tiles)
+        metadata = ImageProcessor.load_metadata(image_path)
+        key_check.verify(params, cipher_modes.parse_key_check(metadata))
+        # 1. Chargement
+        img_array = ImageProcessor.load_image(image_path)
+        if mode is None:
+            mode, tiles = cipher_modes.parse_metadata(metadata)
+        return DecryptionService.decrypt_array(img_array, params, mode, tiles)
+
+    @staticmethod
+    def decrypt_container(source, params, mode=None, tiles=None, schedule=None):
+        """
+        Déchiffre un conteneur brut (chemin ou octets): le vecteur chiffré est lu par
+        memory-map, sans décodage PNG ni vectorisation (il est déjà en ordre planaire).
+        """
+        header, X_prime = cipher_container.load_vector(source)
+        key_check.verify(params, header['key_check'])
+        N, M = header['N'], header['M']
+        if mode is None:
+            mode, tiles = header['mode'], header['tiles']
+        mode, tiles = cipher_modes.normalize(mode, tiles or 1, X_prime.size)
+        if schedule is None or schedule.length != X_prime.size:
+            schedule = KeySchedule.get(params, X_prime.size)
+        X_final = DecryptionService.decrypt_vector(X_prime, schedule, tiles)
+        return ImageProcessor.reshape(X_final, N, M)
+
+    @staticmethod
+    def decrypt_region(source, params, rows, cols, index=None):
+        """
+        Déchiffre uniquement la région rows=(r0, r1) x cols=(c0, c1) d'un conteneur brut
+        (chemin ou octets). Retourne un tableau (r1 - r0, c1 - c0, 3).
+        Chaque ligne de chaque plan est un intervalle du vecteur chiffré: son keystream
+        est régénéré depuis le point de reprise le plus proche (KeystreamIndex), et X'[i-1]
+        est lu dans le chiffré memory-mappé. Rien d'autre n'est déchiffré.
+        """
+        header, X_prime = cipher_container.load_vector(source)
+        key_check.verify(params, header['key_check'])
+        N, M = header['N'], header['M']
+        (r0, r1), (c0, c1) = rows, cols
+        if not (0 <= r0 < r1 <= N and 0 <= c0 < c1 <= M):
+            raise ValueError(f"Région invalide: lignes {r0}..{r1}, colonnes {c0}..{c1} (image {N}x{M})")
+        plane = N * M
+        length = 3 * plane
+        mode, tiles = cipher_modes.normalize(header['mode'], header['tiles'], length)
+        if index is None or index.length != length:
+            index = KeystreamIndex.get(params, length)
+        inv_table = DecryptionService.get_modular_inverse_table()
+        tile_starts = [start for start, _ in cipher_modes.tile_bounds(length, tiles)[1:]]
+
+        lines = [(ch, r) for ch in range(3) for r in range(r0, r1)]
+        ranges = [(ch * plane + r * M + c0, ch * plane + r * M + c1) for ch, r in lines]
+        region = np.empty((r1 - r0, c1 - c0, 3), dtype=np.uint8)
+        for (ch, r), (a, b), (AL, BL, CL, C) in zip(lines, ranges, index.iter_ranges(ranges)):
+            Xp = np.asarray(X_prime[a:b])
+            X_rec = index.Inv_S_Box[AL, Xp]
+            np.copyto(X_rec, (Xp - CL) * inv_table[BL], where=C.view(np.bool_))
+            X_rec[1:] ^= Xp[:-1]
+            X_rec[0] ^= X_prime[a - 1] if a > 0 else np.uint8(index.iv_val)
+            # Début de segment (mode 'tiled'): X'[s-1] remplacé par IV_k = IV + AL[s-1] + CL[s-1]
+            for s in (s for s in tile_starts if a <= s < b):
+                if s == a:
+                    al_prev, _, cl_prev, _ = index.read(s - 1, s)[:, 0]
+                else:
+                    al_prev, cl_prev = AL[s - a - 1], CL[s - a - 1]
+                iv = (index.iv_val + int(al_prev) + int(cl_prev)) % 256
+                X_rec[s - a] ^= np.uint8(int(X_prime[s - 1]) ^ iv)
+            X_rec ^= AL
+            region[r - r0, :, ch] = X_rec
+        return region
+
+    @staticmethod
+    def decrypt_array(img_array, params, mode=cipher_modes.MODE_CBC, tiles=1, schedule=None, kcv=None):
+        """
+        Déchiffre une image chiffrée déjà décodée (N, M, 3).
+        `schedule` évite la consultation du cache quand l'appelant le détient déjà (session).
+        `kcv`: valeur de contrôle de clé connue de l'appelant, vérifiée avant le keystream complet.
+        """
+        key_check.verify(params, kcv)
+        # 1. Vectorisation
+        X_prime, N, M = ImageProcessor.vectorize(img_array)
+        total_pixels = 3 * N * M
+        mode, tiles = cipher_modes.normalize(mode, tiles or 1, total_pixels)
         
-        for i in range(total_pixels - 1, 0, -1):
-            prev_cipher = X_prime_int[i-1]
-            curr_cipher = X_prime_int[i]
-            
-            if C_int[i] == 0:
-                # Inverse Substitution
-                temp = Inv_S_Box[AL_int[i], curr_cipher]
-            else:
-                # Inverse Affine: (y - b) * a^-1
-                temp = ((curr_cipher - CL_int[i]) * BL_inv[i]) % 256
-                
-            # Inverse Diffusion
-            X_rec[i] = temp ^ prev_cipher
-            
-        # Handle i=0
-        # X[0] = InvTrans(X'[0]) ^ IV
-        curr_cipher = X_prime_int[0]
-        if C_int[0] == 0:
-            temp = Inv_S_Box[AL_int[0], curr_cipher]
-        else:
-            temp = ((curr_cipher - CL_int[0]) * BL_inv[0]) % 256
-            
-        X_rec[0] = temp ^ iv_val
+        # 2-4. Key schedule (séquences, vecteurs de contrôle, S-Box inverse, IV)
+        # Partagé avec le chiffrement via le cache du processus
+        if schedule is None or schedule.length != total_pixels:
+            schedule = KeySchedule.get(params, total_pixels)
         
-        # 6. Inverse Pre-diffusion XOR
-        # X_final = X_rec ^ AL
-        X_final = np.bitwise_xor(X_rec, AL.astype(np.uint8))
+        # 5-6. Déchiffrement CBC vectorisé + XOR inverse de pré-diffusion
+        X_final = DecryptionService.decrypt_vector(X_prime, schedule, tiles)
         
         # 7. Reshape
         decrypted_img = ImageProcessor.reshape(X_final, N, M)
         return decrypted_img
+
+    @staticmethod
+    def decrypt_stream(src_path, dst_path, params, block_size=None, on_chunk=None):
+        """
+        Déchiffrement en flux d'un conteneur brut vers un fichier .npy (N, M, 3) memory-mappé,
+        pour les images plus grandes que la RAM. Le chiffré, le keystream et la sortie sont
+        traités par blocs planaires: la mémoire de travail reste bornée par `block_size`.
+
+        L'IV dépend des sommes de tout le keystream: le premier octet (et le début de chaque
+        segment en mode 'tiled') est d'abord déchiffré avec un prédécesseur provisoire,
+        puis corrigé par un XOR une fois le keystream entièrement parcouru.
+        Retourne des statistiques (dimensions, mode, blocs, durée).
+        """
+        start_time = time.time()
+        header = cipher_container.read_header(src_path)
+        key_check.verify(params, header['key_check'])
+        N, M = header['N'], header['M']
+        plane = N * M
+        length = 3 * plane
+        mode, tiles = cipher_modes.normalize(header['mode'], header['tiles'], length)
+        # La S-Box se construit sur AL[:256]: le premier bloc doit les contenir
+        block_size = max(block_size or config.KEYSTREAM_BLOCK_SIZE, 256)
+
+        out = np.lib.format.open_memmap(dst_path, mode='w+', dtype=np.uint8, shape=(N, M, 3))
+        data_offset = out.offset
+        del out
+
+        # Débuts de segments k > 0: leur IV_k dépend de AL/CL/X' en s_k - 1, relevés au passage
+        tile_starts = [start for start, _ in cipher_modes.tile_bounds(length, tiles)[1:]]
+        pending = {s - 1: s for s in tile_starts}
+        patches = {}
+        inv_table = DecryptionService.get_modular_inverse_table()
+        Inv_S_Box = None
+        sums = 0
+        blocks = 0
+
+        for start, _, control in ChaoticMaps.iter_keystream(params, length, block_size):
+            AL, BL, CL, C = control
+            stop = start + AL.shape[0]
+            np.bitwise_or(BL, 1, out=BL)
+            if Inv_S_Box is None:
+                P_Box = PermutationService.generate_permutation(AL)
+                Inv_S_Box = PermutationService.generate_inverse_sbox(PermutationService.generate_sbox(P_Box, AL))
+            sums += int(AL.sum(dtype=np.int64)) + int(BL.sum(dtype=np.int64)) + int(CL.sum(dtype=np.int64))
+
+            # Fenêtre X'[start - 1:stop] (copiée, puis démappée: le RSS reste borné)
+            lo = max(start - 1, 0)
+            window = np.memmap(src_path, dtype=np.uint8, mode='r',
+                               offset=cipher_container.HEADER_SIZE + lo, shape=(stop - lo,))
+            X_win = np.array(window)
+            del window
+            X_prime = X_win[start - lo:]
+
+            X_rec = Inv_S_Box[AL, X_prime]
+            np.copyto(X_rec, (X_prime - CL) * inv_table[BL], where=C.view(np.bool_))
+            # Diffusion inverse: X'[i-1], y compris le dernier octet du bloc précédent
+            if start > 0:
+                X_rec ^= X_win[:-1]
+            else:
+                X_rec[1:] ^= X_prime[:-1]
+            X_rec ^= AL
+
+            for pos in [p for p in pending if start <= p < stop]:
+                patches[pending.pop(pos)] = (int(X_prime[pos - start]), int(AL[pos - start]), int(CL[pos - start]))
+
+            # Écriture dans la sortie entrelacée (N, M, 3), plan par plan, ligne entière par fenêtre
+            for c in range(start // plane, (stop - 1) // plane + 1):
+                a, b = max(start, c * plane), min(stop, (c + 1) * plane)
+                p, q = a - c * plane, b - c * plane
+                r0, r1 = p // M, (q - 1) // M + 1
+                window = np.memmap(dst_path, dtype=np.uint8, mode='r+',
+                                   offset=data_offset + r0 * M * 3, shape=((r1 - r0) * M, 3))
+                window[p - r0 * M:q - r0 * M, c] = X_rec[a - start:b - start]
+                window.flush()
+                del window
+            blocks += 1
+            if on_chunk: on_chunk(stop - start)
+
+        # Correction des débuts de chaîne: X'[-1] = IV, et X'[s_k - 1] -> IV_k pour les segments
+        iv_val = sums % 256
+        fixes = {0: iv_val}
+        for s, (prev, al, cl) in patches.items():
+            fixes[s] = prev ^ ((iv_val + al + cl) % 256)
+        for s, value in fixes.items():
+            window = np.memmap(dst_path, dtype=np.uint8, mode='r+',
+                               offset=data_offset + (s % plane) * 3 + s // plane, shape=(1,))
+            window[0] ^= np.uint8(value)
+            window.flush()
+            del window
+
+        return {
+            'N': N, 'M': M, 'mode': mode, 'tiles': tiles,
+            'blocks': blocks, 'block_size': block_size,
+            'time': time.time() - start_time,
+        }
@@ -1,12 +1,51 @@
-import matplotlib
-matplotlib.use('Agg') # Backend non-interactif
-import matplotlib.pyplot as plt
+import functools
+import importlib
 import numpy as np
 import os
+import uuid
+import config
+from services import worker_pools
 from services.analysis_service import AnalysisService
 
+
+# Graphes des réponses interactives: séries JSON (tracées par le frontend) ou PNG rendus ici
+CHART_MODES = ('data', 'png')
+
+
+def get_chart_mode(value=None):
+    """Mode de graphes demandé (CHARTS par défaut); lève ValueError si inconnu."""
+    mode = (value or config.CHARTS).lower()
+    if mode not in CHART_MODES:
+        raise ValueError(f"Mode de graphes inconnu: {mode}")
+    return mode
+
+
+def _renderer():
+    """
+    Module de rendu selon PLOT_BACKEND: 'matplotlib' (chart_renderer) ou 'native'
+    (native_charts, NumPy + Pillow). Import à la demande: matplotlib n'est jamais
+    chargé par le backend natif.
+    """
+    if config.PLOT_BACKEND == 'native':
+        return importlib.import_module('services.native_charts')
+    return importlib.import_module('services.chart_renderer')
+
+
+def _plot_pool():
+    """Pool de rendu des graphes selon PLOT_POOL (None: rendu séquentiel dans le processus)."""
+    mode = config.PLOT_POOL
+    if mode == 'auto':
+        # Sur un seul cœur, le pool n'ajoute que le coût des échanges entre processus
+        mode = 'process' if config.PLOT_WORKERS > 1 else 'off'
+    if mode == 'process':
+        return worker_pools.get_process_pool('plots', config.PLOT_WORKERS)
+    if mode == 'thread':
+        return worker_pools.get_thread_pool('plots', config.PLOT_WORKERS)
+    return None
+
+
 class ExportService:
-    def __init__(self, export_dir='static/exports'):
+    def __init__(self, export_dir='static/exports', dpi=None, url_prefix=None):
         # Ensure export directory is absolute to avoid relative path issues
         if not os.path.isabs(export_dir):
              # Get the directory where app.py is located (one level up from services/)
@@ -14,6 +53,11 @@ class ExportService:
             export_dir = os.path.join(base_dir, export_dir)
             
         self.export_dir = export_dir
+        # URL publique du dossier (servi sous /static, éventuellement un sous-dossier de session),
+        # ou route de rendu à la demande (voir routes/charts.py)
+        static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+        self.url_prefix = url_prefix or '/static/' + os.path.relpath(export_dir, static_dir).replace(os.sep, '/')
+        self.dpi = dpi or config.PLOT_DPI
         self.categories = ['histograms', 'correlation', 'chaotic_maps', 'sbox', 'metrics']
         self._ensure_directories()
 
@@ -21,134 +65,151 @@ class ExportService:
         for category in self.categories:
             os.makedirs(os.path.join(self.export_dir, category), exist_ok=True)
 
-    def save_plot(self, fig, subdir, filename):
-        """Sauvegarde une figure dans le sous-dossier spécifié."""
-        path = os.path.join(self.export_dir, subdir, filename)
-        fig.savefig(path, dpi=300, bbox_inches='tight')
-        plt.close(fig)
-        return f"/static/exports/{subdir}/{filename}"
+    def urls(self, jobs):
+        """URL des graphes de `jobs`, sans les rendre (rendu au premier accès)."""
+        return [f"{self.url_prefix}/{subdir}/{filename}" for _, subdir, filename, _ in jobs]
 
-    def generate_histograms(self, original_img, encrypted_img):
-        """Génère et sauvegarde 6 histogrammes."""
+    def render(self, jobs, missing_only=False):
+        """
+        Rend une liste de graphes [(fonction du module de rendu, sous-dossier, fichier, données)]
+        et retourne leurs URL dans le même ordre. Les graphes sont répartis sur le pool de
+        rendu: chaque tâche ne transporte que les petites données de son graphe.
+        `données` peut être une fonction sans argument, appelée seulement si le graphe est
+        rendu. Avec `missing_only`, les fichiers déjà présents sont conservés.
+        """
+        pool = _plot_pool()
+        urls, futures, renamed = [], [], []
+        for fn, subdir, filename, data in jobs:
+            path = os.path.join(self.export_dir, subdir, filename)
+            urls.append(f"{self.url_prefix}/{subdir}/{filename}")
+            if missing_only and os.path.exists(path):
+                continue
+            if callable(data):
+                data = data()
+            # Fichier temporaire puis renommage: un graphe servi à la demande n'est jamais partiel
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp.png"
+            renamed.append((tmp_path, path))
+            if pool is None:
+                fn(tmp_path, self.dpi, **data)
+            else:
+                futures.append(pool.submit(fn, tmp_path, self.dpi, **data))
+        for future in futures:
+            future.result()
+        for tmp_path, path in renamed:
+            os.replace(tmp_path, path)
+        return urls
+
+    def render_one(self, jobs, subdir, filename):
+        """
+        Chemin du graphe `subdir/filename` parmi `jobs`, rendu au premier appel puis réutilisé.
+        None si aucun job ne produit ce fichier.
+        """
+        jobs = [job for job in jobs if (job[1], job[2]) == (subdir, filename)]
+        if not jobs:
+            return None
+        self.render(jobs, missing_only=True)
+        return os.path.join(self.export_dir, subdir, filename)
+
+    def histogram_jobs(self, original_img, encrypted_img):
+        """6 histogrammes (comptages calculés au rendu, 256 valeurs par graphe)."""
+        renderer = _renderer()
         channels = ['Red', 'Green', 'Blue']
         colors = ['red', 'green', 'blue']
         
-        paths = []
+        def data(img, i, title):
+            return {'counts': np.bincount(img[:, :, i].ravel(), minlength=256), 'color': colors[i], 'title': title}
         
-        # Original
-        for i, color in enumerate(colors):
-            fig, ax = plt.subplots(figsize=(6, 4))
-            ax.hist(original_img[:,:,i].flatten(), bins=256, range=(0, 256), color=color, alpha=0.7)
-            ax.set_title(f"Histogramme {channels[i]} (Original)")
-            ax.set_xlabel("Valeur Pixel")
-            ax.set_ylabel("Fréquence")
-            paths.append(self.save_plot(fig, 'histograms', f'hist_orig_{color}.png'))
-
-        # Encrypted
-        for i, color in enumerate(colors):
-            fig, ax = plt.subplots(figsize=(6, 4))
-            ax.hist(encrypted_img[:,:,i].flatten(), bins=256, range=(0, 256), color=color, alpha=0.7)
-            ax.set_title(f"Histogramme {channels[i]} (Chiffré)")
-            ax.set_xlabel("Valeur Pixel")
-            ax.set_ylabel("Fréquence")
-            paths.append(self.save_plot(fig, 'histograms', f'hist_enc_{color}.png'))
-            
-        return paths
+        jobs = []
+        for img, prefix, suffix in ((original_img, 'orig', 'Original'), (encrypted_img, 'enc', 'Chiffré')):
+            for i, color in enumerate(colors):
+                jobs.append((renderer.histogram, 'histograms', f'hist_{prefix}_{color}.png',
+                             functools.partial(data, img, i, f"Histogramme {channels[i]} ({suffix})")))
+        return jobs
 
-    def generate_correlation_plots(self, original_img, encrypted_img):
-        """Génère et sauvegarde 18 scatter plots (9 orig + 9 enc)."""
+    def correlation_jobs(self, original_img, encrypted_img):
+        """18 scatter plots (9 orig + 9 enc), 3000 paires par graphe."""
+        renderer = _renderer()
         directions = ['Horizontal', 'Vertical', 'Diagonal']
         channels = ['Red', 'Green', 'Blue']
         colors = ['red', 'green', 'blue']
         
-        paths = []
+        def data(img, d, i, title):
+            val_x, val_y = AnalysisService.get_correlation_data(img, d, i)
+            return {'x': val_x, 'y': val_y, 'color': colors[i], 'title': title}
         
-        # Helper internal function
-        def plot_corr(img, prefix, title_suffix):
+        jobs = []
+        for img, prefix, title_suffix in ((original_img, 'orig', 'Original'), (encrypted_img, 'enc', 'Chiffré')):
             for d in directions:
                 for i, c in enumerate(channels):
-                    val_x, val_y = AnalysisService.get_correlation_data(img, d, i)
-                    
-                    fig, ax = plt.subplots(figsize=(5, 5))
-                    ax.scatter(val_x, val_y, s=1, c=colors[i])
-                    ax.set_title(f"{c} {d} ({title_suffix})")
-                    ax.set_xlabel("Pixel (x, y)")
-                    ax.set_ylabel(f"Pixel voisin")
-                    ax.set_xlim(0, 255)
-                    ax.set_ylim(0, 255)
-                    
-                    filename = f"corr_{prefix}_{d.lower()}_{c.lower()}.png"
-                    paths.append(self.save_plot(fig, 'correlation', filename))
-
-        plot_corr(original_img, 'orig', 'Original')
-        plot_corr(encrypted_img, 'enc', 'Chiffré')
-        
-        return paths
+                    jobs.append((renderer.scatter, 'correlation', f"corr_{prefix}_{d.lower()}_{c.lower()}.png",
+                                 functools.partial(data, img, d, i, f"{c} {d} ({title_suffix})")))
+        return jobs
 
-    def generate_chaotic_map_plots(self, u, v, w):
-        """Génère les plots des 3 cartes chaotiques (1000 premières itérations)."""
+    def chaotic_map_jobs(self, u, v, w):
+        """Plots des 3 cartes chaotiques (1000 premières itérations)."""
+        renderer = _renderer()
         limit = 1000
         maps = [('Logistique', u, 'blue'), ('Tente', v, 'green'), ('PWLCM', w, 'purple')]
-        paths = []
+        return [(renderer.chaotic_map, 'chaotic_maps', f'map_{name.lower()}.png',
+                 {'samples': np.asarray(data[:limit]), 'color': color,
+                  'title': f"Carte {name} (1000 premières itérations)"})
+                for name, data, color in maps]
+
+    def sbox_jobs(self, sbox):
+        """Heatmap de la S-Box."""
+        renderer = _renderer()
+        return [(renderer.sbox_heatmap, 'sbox', 'sbox_heatmap.png', {'sbox': np.asarray(sbox)})]
+
+    def metrics_jobs(self, npcr, uaci, entropy_orig, entropy_enc):
+        """Graphes NPCR/UACI et Entropie."""
+        renderer = _renderer()
+        return [
+            # NPCR/UACI Bar Chart
+            (renderer.grouped_bars, 'metrics', 'npcr_uaci_comparison.png', {
+                'labels': ['NPCR', 'UACI'],
+                'series': [('Calculé', [npcr, uaci], 'blue', 1.0), ('Idéal', [99.6094, 33.4635], 'green', 0.5)],
+                'title': 'Test Analyse Différentielle', 'ylabel': 'Pourcentage (%)'}),
+            # Entropy Comparison
+            (renderer.labeled_bars, 'metrics', 'entropy_comparison.png', {
+                'labels': ['Original', 'Chiffré', 'Idéal (8)'], 'values': [entropy_orig, entropy_enc, 8.0],
+                'colors': ['red', 'blue', 'green'], 'title': 'Comparaison Entropie',
+                'ylabel': 'Entropie (bits)', 'ylim': (0, 8.5)}),
+        ]
+
+    def key_sensitivity_jobs(self, report):
+        """Graphe des taux de différence par paramètre perturbé (±delta)."""
+        renderer = _renderer()
+        names = list(report['parameters'].keys())
+        plus = [report['parameters'][n]['+']['difference_rate'] for n in names]
+        minus = [report['parameters'][n]['-']['difference_rate'] for n in names]
         
-        for name, data, color in maps:
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.plot(data[:limit], '.', markersize=1, color=color)
-            ax.set_title(f"Carte {name} (1000 premières itérations)")
-            ax.set_xlabel("n")
-            ax.set_ylabel("Xn")
-            paths.append(self.save_plot(fig, 'chaotic_maps', f'map_{name.lower()}.png'))
-            
-        return paths
+        return [(renderer.grouped_bars, 'metrics', 'key_sensitivity.png', {
+            'labels': names,
+            'series': [(f"+{report['delta']:g}", plus, 'blue', 1.0), (f"-{report['delta']:g}", minus, 'purple', 1.0)],
+            'title': 'Sensibilité à la Clé', 'ylabel': 'Taux de différence (%)', 'figsize': (9, 5),
+            'ylim': (min(plus + minus + [99.0]) - 1, 100.5),
+            'hline': (99.6094, 'green', 'Idéal (99.61%)')})]
+
+    def generate_histograms(self, original_img, encrypted_img):
+        """Génère et sauvegarde 6 histogrammes."""
+        return self.render(self.histogram_jobs(original_img, encrypted_img))
+
+    def generate_correlation_plots(self, original_img, encrypted_img):
+        """Génère et sauvegarde 18 scatter plots (9 orig + 9 enc)."""
+        return self.render(self.correlation_jobs(original_img, encrypted_img))
+
+    def generate_chaotic_map_plots(self, u, v, w):
+        """Génère les plots des 3 cartes chaotiques."""
+        return self.render(self.chaotic_map_jobs(u, v, w))
 
     def generate_sbox_heatmap(self, sbox):
         """Génère la heatmap de la S-Box."""
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(sbox, cmap='viridis', interpolation='nearest')
-        fig.colorbar(im, ax=ax)
-        ax.set_title("Visualisation S-Box (256x256)")
-        path = self.save_plot(fig, 'sbox', 'sbox_heatmap.png')
-        return [path]
+        return self.render(self.sbox_jobs(sbox))
     
     def generate_metrics_plots(self, npcr, uaci, entropy_orig, entropy_enc):
         """Génère les graphes pour NPCR/UACI et Entropie."""
-        paths = []
-        
-        # NPCR/UACI Bar Chart
-        fig, ax = plt.subplots(figsize=(8, 5))
-        metrics = ['NPCR', 'UACI']
-        values = [npcr, uaci]
-        ideals = [99.6094, 33.4635]
-        
-        x = np.arange(len(metrics))
-        width = 0.35
-        
-        rects1 = ax.bar(x - width/2, values, width, label='Calculé', color='blue')
-        rects2 = ax.bar(x + width/2, ideals, width, label='Idéal', color='green', alpha=0.5)
-        
-        ax.set_ylabel('Pourcentage (%)')
-        ax.set_title('Test Analyse Différentielle')
-        ax.set_xticks(x)
-        ax.set_xticklabels(metrics)
-        ax.legend()
-        
-        paths.append(self.save_plot(fig, 'metrics', 'npcr_uaci_comparison.png'))
-        
-        # Entropy Comparison
-        fig, ax = plt.subplots(figsize=(6, 5))
-        labels = ['Original', 'Chiffré', 'Idéal (8)']
-        e_vals = [entropy_orig, entropy_enc, 8.0]
-        colors = ['red', 'blue', 'green']
-        
-        ax.bar(labels, e_vals, color=colors)
-        ax.set_ylabel('Entropie (bits)')
-        ax.set_title('Comparaison Entropie')
-        ax.set_ylim(0, 8.5)
-        
-        # Add text labels on bars
-        for i, v in enumerate(e_vals):
-            ax.text(i, v + 0.1, f"{v:.4f}", ha='center')
-            
-        paths.append(self.save_plot(fig, 'metrics', 'entropy_comparison.png'))
-        
-        return paths
+        return self.render(self.metrics_jobs(npcr, uaci, entropy_orig, entropy_enc))
+
+    def generate_key_sensitivity_plot(self, report):
+        """Génère le graphe des taux de différence par paramètre perturbé (±delta)."""
+        return self.render(self.key_sensitivity_jobs(report))
@@ -0,0 +1,224 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from services.state_backend import STATE_BACKEND
+
+
+class QueueFull(Exception):
+    """La file de jobs a atteint sa profondeur maximale."""
+
+
+class JobCancelled(Exception):
+    """Levée par un job qui constate sa propre annulation."""
+
+
+class Job:
+    """
+    Travail asynchrone: statut, résultat (payload, code HTTP), jeton d'annulation
+    et journal d'événements (étapes, progression) relu par le flux SSE.
+    """
+    __slots__ = ('id', 'kind', 'status', 'created', 'started', 'finished',
+                 'result', 'http_status', 'error', 'cancel_event', 'future', 'events', '_cond',
+                 'remote_cancel', '_last_remote_check')
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.http_status = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.events = []
+        self._cond = threading.Condition()
+        # Annulation demandée depuis un autre worker (backend d'état partagé), consultée au plus 1x/s
+        self.remote_cancel = None
+        self._last_remote_check = 0.0
+
+    @staticmethod
+    def from_record(record):
+        """Vue en lecture seule d'un job exécuté par un autre worker (entrée du backend d'état)."""
+        info = record['job']
+        job = Job(info['kind'])
+        job.id = info['job_id']
+        for key in ('status', 'created', 'started', 'finished', 'error'):
+            setattr(job, key, info[key])
+        job.result = record.get('result')
+        job.http_status = record.get('http_status')
+        return job
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def check_cancelled(self):
+        """Point d'annulation coopératif, à appeler entre deux étapes du traitement."""
+        if not self.cancel_event.is_set() and self.remote_cancel is not None:
+            now = time.time()
+            if now - self._last_remote_check >= 1.0:
+                self._last_remote_check = now
+                if self.remote_cancel():
+                    self.cancel_event.set()
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def emit(self, event, data):
+        """Ajoute un événement au journal du job et réveille les flux en attente."""
+        with self._cond:
+            self.events.append({'id': len(self.events), 'event': event, 'data': data})
+            self._cond.notify_all()
+
+    def report(self, event, data):
+        """Callback de progression des services: émet puis sert de point d'annulation."""
+        self.emit(event, data)
+        self.check_cancelled()
+
+    def wait_events(self, after, timeout):
+        """Événements d'indice >= after, en attendant au plus `timeout` s qu'il en arrive."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > after, timeout)
+            return self.events[after:]
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """
+    Pool borné de threads de travail avec file d'attente limitée.
+    submit() lève QueueFull quand `max_depth` jobs attendent déjà (contre-pression).
+    Les jobs terminés sont conservés `retention` secondes pour la lecture du résultat.
+    Avec un `backend` d'état partagé, statut et résultat y sont publiés: n'importe quel
+    worker peut répondre au suivi d'un job, ou en demander l'annulation.
+    """
+
+    NAMESPACE = 'jobs'
+
+    def __init__(self, workers, max_depth, retention, backend=None):
+        self.max_depth = max_depth
+        self.retention = retention
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args):
+        """Planifie fn(job, *args) -> (payload, code HTTP). Retourne le Job créé."""
+        job = Job(kind)
+        with self._lock:
+            self._purge()
+            if sum(1 for j in self._jobs.values() if j.status == 'queued') >= self.max_depth:
+                raise QueueFull()
+            self._jobs[job.id] = job
+        if self.backend is not None:
+            job.remote_cancel = lambda: self._remote_cancel_requested(job.id)
+            self._publish(job)
+        job.future = self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        """Job local, sinon sa vue publiée par un autre worker (None si inconnu)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.backend is not None:
+            record = self.backend.get(self.NAMESPACE, job_id)
+            if record is not None:
+                job = Job.from_record(record[1])
+        return job
+
+    def cancel(self, job_id):
+        """Annule un job en attente; un job en cours est prévenu via son cancel_event."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.future is None:
+            # Job d'un autre worker: la demande passe par le backend d'état
+            if not job.done:
+                self.backend.put(self.NAMESPACE, job_id, {'cancel': True}, merge=True)
+            return job
+        job.cancel_event.set()
+        if job.status == 'queued' and job.future.cancel():
+            self._finish(job, 'cancelled')
+        return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'max_depth': self.max_depth, 'jobs': counts}
+
+    def _run(self, job, fn, args):
+        try:
+            job.check_cancelled()
+        except JobCancelled:
+            self._finish(job, 'cancelled')
+            return
+        job.status = 'running'
+        job.started = time.time()
+        if self.backend is not None:
+            self._publish(job)
+        try:
+            payload, http_status = fn(job, *args)
+        except JobCancelled:
+            self._finish(job, 'cancelled')
+        except Exception as e:
+            print(f"JOB {job.id} ({job.kind}) FAILED:")
+            traceback.print_exc()
+            job.error = str(e)
+            self._finish(job, 'failed')
+        else:
+            if job.cancel_event.is_set():
+                # Annulé pendant l'exécution: le résultat est abandonné
+                self._finish(job, 'cancelled')
+            else:
+                job.result, job.http_status = payload, http_status
+                if http_status >= 400:
+                    job.error = (payload or {}).get('error')
+                self._finish(job, 'succeeded' if http_status < 400 else 'failed')
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        if self.backend is not None:
+            self._publish(job)
+        # Dernier événement du journal: le flux SSE se termine sur 'end'
+        job.emit('end', job.to_dict())
+
+    def _publish(self, job):
+        record = {'job': job.to_dict()}
+        if job.done:
+            record.update(result=job.result, http_status=job.http_status)
+        self.backend.put(self.NAMESPACE, job.id, record, merge=True)
+
+    def _remote_cancel_requested(self, job_id):
+        record = self.backend.get(self.NAMESPACE, job_id)
+        return record is not None and record[1].get('cancel', False)
+
+    def _purge(self):
+        now = time.time()
+        expired = [jid for jid, j in self._jobs.items() if j.done and now - j.finished > self.retention]
+        for jid in expired:
+            del self._jobs[jid]
+        if self.backend is not None and expired:
+            self.backend.purge(self.NAMESPACE, self.retention)
+
+
+JOB_QUEUE = JobQueue(config.JOB_WORKERS, config.JOB_QUEUE_DEPTH, config.JOB_RETENTION_SECONDS, STATE_BACKEND)
@@ -0,0 +1,36 @@
+# Valeur de contrôle de clé (KCV), enregistrée avec le chiffré.
+#
+# Empreinte SHA-256 tronquée des premiers échantillons du keystream (AL, BL impair, CL, C):
+# au déchiffrement, une clé erronée est rejetée après ces quelques centaines d'itérations,
+# au lieu de générer tout le keystream et de renvoyer une image de bruit.
+# Les premiers échantillons ne dépendent pas de la taille de l'image.
+import hashlib
+
+import numpy as np
+
+from services.chaotic_maps import ChaoticMaps
+
+SAMPLES = 256
+SIZE = 8
+_DOMAIN = b'ChaosCrypt-KCV-v1'
+
+
+class KeyMismatch(ValueError):
+    """La clé fournie ne correspond pas à la valeur de contrôle du chiffré."""
+
+
+def compute(params):
+    """KCV (SIZE octets) d'un jeu de paramètres."""
+    _, _, control = next(ChaoticMaps.iter_keystream(params, SAMPLES, SAMPLES))
+    np.bitwise_or(control[1], 1, out=control[1])
+    return hashlib.sha256(_DOMAIN + control.tobytes()).digest()[:SIZE]
+
+
+def verify(params, expected):
+    """Lève KeyMismatch si `expected` (octets, ou hexadécimal) est présent et diffère."""
+    if not expected:
+        return  # Chiffré antérieur aux KCV: pas de vérification possible
+    if isinstance(expected, str):
+        expected = bytes.fromhex(expected)
+    if compute(params) != expected:
+        raise KeyMismatch("Clé incorrecte: la valeur de contrôle du chiffré ne correspond pas")
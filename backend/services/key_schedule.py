@@ -0,0 +1,149 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import config
+from services.chaotic_maps import ChaoticMaps
+from services.permutation import PermutationService
+
+# Nombre d'échantillons flottants conservés pour les graphes des cartes chaotiques
+PREVIEW_LENGTH = 1000
+
+
+class KeySchedule:
+    """
+    Matériel de clé dérivé d'un couple (params, longueur), calculé une seule fois.
+    Contient les vecteurs de contrôle (AL, BL impair, CL, C), la P-Box, la S-Box
+    et son inverse (tables 256x256), la table des inverses modulaires et l'IV.
+    Les tableaux sont en lecture seule: un même schedule est partagé entre requêtes.
+    """
+    __slots__ = ('length', 'AL', 'BL', 'CL', 'C', 'P_Box', 'S_Box', 'Inv_S_Box',
+                 'inv_table', 'iv_val', 'maps_preview')
+
+    def __init__(self, length, AL, BL, CL, C, P_Box, S_Box, Inv_S_Box, inv_table, iv_val, maps_preview):
+        self.length = length
+        self.AL, self.BL, self.CL, self.C = AL, BL, CL, C
+        self.P_Box, self.S_Box, self.Inv_S_Box = P_Box, S_Box, Inv_S_Box
+        self.inv_table = inv_table
+        self.iv_val = iv_val
+        self.maps_preview = maps_preview
+        for arr in (AL, BL, CL, C, P_Box, S_Box, Inv_S_Box, *maps_preview):
+            arr.setflags(write=False)
+
+    @staticmethod
+    def build(params, length):
+        """Dérive le schedule complet depuis les cartes chaotiques."""
+        # Keystream uint8 écrit directement (par blocs si les orbites sont trop grandes)
+        (AL, BL, CL, C), maps_preview = ChaoticMaps.generate_keystream(params, length, PREVIEW_LENGTH)
+        return KeySchedule.from_control_vectors(length, AL, BL, CL, C, maps_preview)
+
+    @staticmethod
+    def from_control_vectors(length, AL, BL, CL, C, maps_preview=()):
+        """
+        Complète un schedule à partir d'un keystream déjà quantifié
+        (par ex. issu de ChaoticMaps.generate_keystream_batch). BL est forcé impair sur place.
+        """
+        # Import local: decryption_service importe lui-même ce module
+        from services.decryption_service import DecryptionService
+
+        # IMPORTANT: Force BL to be odd for Affine invertibility
+        np.bitwise_or(BL, 1, out=BL)
+
+        P_Box = PermutationService.generate_permutation(AL)
+        S_Box = PermutationService.generate_sbox(P_Box, AL)
+        Inv_S_Box = PermutationService.generate_inverse_sbox(S_Box)
+
+        # IV (Key-Dependent): entropie globale des clés
+        iv_val = (int(np.sum(AL)) + int(np.sum(BL)) + int(np.sum(CL))) % 256
+
+        return KeySchedule(length, AL, BL, CL, C, P_Box, S_Box, Inv_S_Box,
+                           DecryptionService.get_modular_inverse_table(), iv_val, tuple(maps_preview))
+
+    @staticmethod
+    def chart_data(params, length):
+        """
+        Données des graphes ((u, v, w) des PREVIEW_LENGTH premiers itérés, S-Box) sans dériver
+        le schedule complet: elles ne dépendent que du début du keystream.
+        """
+        (AL, _, _, _), maps_preview = ChaoticMaps.generate_keystream(params, min(length, PREVIEW_LENGTH),
+                                                                     PREVIEW_LENGTH)
+        P_Box = PermutationService.generate_permutation(AL)
+        return maps_preview, PermutationService.generate_sbox(P_Box, AL)
+
+    @staticmethod
+    def get(params, length):
+        """Retourne le schedule depuis le cache du processus (le construit si absent)."""
+        return KEY_SCHEDULE_CACHE.get(params, length)
+
+    @property
+    def vectors(self):
+        """Tuple (AL, BL, CL, C, P_Box, S_Box, iv_val) tel que retourné par encrypt_image."""
+        return (self.AL, self.BL, self.CL, self.C, self.P_Box, self.S_Box, self.iv_val)
+
+    @property
+    def nbytes(self):
+        arrays = (self.AL, self.BL, self.CL, self.C, self.P_Box, self.S_Box, self.Inv_S_Box, *self.maps_preview)
+        return sum(arr.nbytes for arr in arrays)
+
+
+class KeyScheduleCache:
+    """Cache LRU thread-safe des KeySchedule, borné en octets."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(params, length):
+        return tuple(float(params[k]) for k in ChaoticMaps.PARAM_KEYS) + (int(length),)
+
+    def get(self, params, length):
+        key = self.make_key(params, length)
+        with self._lock:
+            schedule = self._entries.get(key)
+            if schedule is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return schedule
+            self.misses += 1
+
+        # Construction hors verrou: les autres clés restent servies pendant ce temps
+        schedule = KeySchedule.build(params, length)
+        self.put(key, schedule)
+        return schedule
+
+    def put(self, key, schedule):
+        size = schedule.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = schedule
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+KEY_SCHEDULE_CACHE = KeyScheduleCache(config.KEY_SCHEDULE_CACHE_BYTES)
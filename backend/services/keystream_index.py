@@ -0,0 +1,137 @@
+# Index de points de reprise du keystream, pour le déchiffrement d'une région.
+#
+# Déchiffrer l'octet i ne demande que X'[i-1] et le keystream en i, mais les cartes doivent
+# être itérées depuis x0 pour atteindre i. L'index conserve l'état (u, v, w) des trois cartes
+# tous les `interval` échantillons (24 octets par point), ainsi que l'IV (qui dépend de tout
+# le keystream) et AL[:256] (S-Box): on repart du point le plus proche, au plus `interval`
+# itérations avant la position voulue.
+#
+# Un état des cartes équivaut à la clé à partir de sa position: un index sauvegardé
+# (save/load) ne doit jamais être distribué avec le chiffré.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from services.chaotic_maps import ChaoticMaps
+from services.key_schedule import KeyScheduleCache
+from services.permutation import PermutationService
+
+
+class KeystreamIndex:
+    """Points de reprise (u, v, w) d'un couple (params, longueur), tous les `interval` échantillons."""
+    __slots__ = ('params', 'length', 'interval', 'states', 'iv_val', 'al_head', 'Inv_S_Box')
+
+    def __init__(self, params, length, interval, states, iv_val, al_head):
+        self.params = params
+        self.length = length
+        self.interval = interval
+        self.states = states
+        self.iv_val = iv_val
+        self.al_head = al_head
+        P_Box = PermutationService.generate_permutation(al_head)
+        self.Inv_S_Box = PermutationService.generate_inverse_sbox(PermutationService.generate_sbox(P_Box, al_head))
+
+    @staticmethod
+    def build(params, length, interval=None):
+        """Un seul parcours du keystream, par blocs de `interval`: états, IV et AL[:256]."""
+        interval = interval or config.KEYSTREAM_CHECKPOINT_INTERVAL
+        count = (length + interval - 1) // interval
+        states = np.empty((count, 3))
+        states[0] = (params['log_x0'], params['tent_x0'], params['pwlcm_x0'])
+        sums, heads = 0, []
+        for start, uvw, control in ChaoticMaps.iter_keystream(params, length, interval):
+            AL, BL, CL, _ = control
+            np.bitwise_or(BL, 1, out=BL)
+            sums += int(AL.sum(dtype=np.int64)) + int(BL.sum(dtype=np.int64)) + int(CL.sum(dtype=np.int64))
+            if sum(len(h) for h in heads) < 256:
+                # AL[:256] (S-Box), sur plusieurs blocs si l'intervalle est plus court
+                heads.append(AL[:256].copy())
+            k = start // interval + 1
+            if k < count:
+                # Dernier itéré du bloc = état d'où repart le point suivant
+                states[k] = uvw[:, -1]
+        al_head = np.concatenate(heads)[:256]
+        return KeystreamIndex(params, length, interval, states, sums % 256, al_head)
+
+    @staticmethod
+    def get(params, length):
+        """Retourne l'index depuis le cache du processus (le construit si absent)."""
+        return KEYSTREAM_INDEX_CACHE.get(params, length)
+
+    def iter_ranges(self, ranges):
+        """
+        Keystream (AL, BL impair, CL, C) de chaque intervalle [a, b) de `ranges` (croissants).
+        Repart du point de reprise le plus proche, ou continue depuis l'intervalle précédent
+        s'il est plus près: seules les itérations entre deux intervalles sont perdues.
+        """
+        pos, states = None, None
+        for a, b in ranges:
+            checkpoint = a // self.interval
+            if pos is None or not checkpoint * self.interval <= pos <= a:
+                pos, states = checkpoint * self.interval, self.states[checkpoint]
+            control = np.empty((4, b - a), dtype=np.uint8)
+            for start, uvw, block in ChaoticMaps.iter_keystream(self.params, b - pos, self.interval, states):
+                lo, hi = pos + start, pos + start + block.shape[1]
+                if hi > a:
+                    control[:, max(lo, a) - a:hi - a] = block[:, max(a - lo, 0):]
+                states = uvw[:, -1].copy()
+            pos = b
+            np.bitwise_or(control[1], 1, out=control[1])
+            yield control
+
+    def read(self, start, stop):
+        """Keystream (4, stop - start) sur un seul intervalle."""
+        return next(self.iter_ranges([(start, stop)]))
+
+    @property
+    def nbytes(self):
+        return self.states.nbytes + self.al_head.nbytes + self.Inv_S_Box.nbytes
+
+    def save(self, path):
+        """Sauvegarde (.npz). Aussi sensible que la clé: à garder à l'écart du chiffré."""
+        np.savez(path, states=self.states, iv_val=self.iv_val, al_head=self.al_head,
+                 length=self.length, interval=self.interval)
+
+    @staticmethod
+    def load(path, params):
+        with np.load(path) as data:
+            return KeystreamIndex(params, int(data['length']), int(data['interval']), data['states'],
+                                  int(data['iv_val']), data['al_head'])
+
+
+class KeystreamIndexCache:
+    """Cache LRU thread-safe des KeystreamIndex (quelques Kio chacun), borné en nombre."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, params, length):
+        key = KeyScheduleCache.make_key(params, length)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+        index = KeystreamIndex.build(params, length)
+        self.put(params, index)
+        return index
+
+    def put(self, params, index):
+        key = KeyScheduleCache.make_key(params, index.length)
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'bytes': sum(index.nbytes for index in self._entries.values())}
+
+
+KEYSTREAM_INDEX_CACHE = KeystreamIndexCache(config.KEYSTREAM_INDEX_CACHE_SIZE)
@@ -0,0 +1,275 @@
+# Rendu des graphes directement avec NumPy et Pillow, sans matplotlib.
+#
+# Même interface que chart_renderer (fn(path, dpi, **données) -> path), même mise en page
+# générale: les données sont rastérisées en NumPy (barres depuis les comptages, points
+# "splattés", S-Box via une table de couleurs), puis axes, graduations et textes sont
+# dessinés avec ImageDraw. Sélectionné par PLOT_BACKEND='native'.
+import math
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+import config
+
+# Table viridis reconstruite par interpolation de 9 points de contrôle (256 x RGB)
+_VIRIDIS_ANCHORS = np.array([
+    (68, 1, 84), (71, 44, 122), (59, 81, 139), (44, 113, 142), (33, 144, 141),
+    (39, 173, 129), (92, 200, 99), (170, 220, 50), (253, 231, 37)], dtype=float)
+VIRIDIS = np.stack([np.interp(np.linspace(0, 1, 256), np.linspace(0, 1, len(_VIRIDIS_ANCHORS)), channel)
+                    for channel in _VIRIDIS_ANCHORS.T], axis=1).round().astype(np.uint8)
+
+_fonts = {}
+
+
+def _font(size):
+    size = max(8, int(round(size)))
+    if size not in _fonts:
+        try:
+            # Police TrueType avec accents (recherchée aussi dans les dossiers système)
+            _fonts[size] = ImageFont.truetype(config.PLOT_FONT, size)
+        except OSError:
+            try:
+                _fonts[size] = ImageFont.load_default(size=size)
+            except TypeError:  # Pillow sans FreeType: police bitmap de taille fixe
+                _fonts[size] = ImageFont.load_default()
+    return _fonts[size]
+
+
+def _rgb(color, alpha=1.0):
+    """Couleur nommée, mélangée au fond blanc selon `alpha` (pas de superposition ici)."""
+    rgb = np.array(ImageColor.getrgb(color)[:3], dtype=float)
+    return tuple(int(round(c * alpha + 255 * (1 - alpha))) for c in rgb)
+
+
+def _ticks(lo, hi, target=6):
+    """Graduations "rondes" (pas de 1, 2, 2.5 ou 5 x 10^k) dans [lo, hi]."""
+    raw = (hi - lo) / target
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if raw <= m * magnitude)
+    first = math.ceil(lo / step) * step
+    return [round(t, 10) for t in np.arange(first, hi + step * 1e-9, step)]
+
+
+def _with_margin(lo, hi, margin=0.05):
+    span = (hi - lo) or 1.0
+    return lo - margin * span, hi + margin * span
+
+
+class _Chart:
+    """Zone de tracé avec axes, graduations, titre et étiquettes, sur un canevas NumPy."""
+
+    def __init__(self, figsize, dpi, xlim, ylim, title, xlabel='', ylabel='',
+                 xticks=None, yticks=None, xticklabels=None, right=0):
+        self.scale = dpi / 72
+        self.W, self.H = int(figsize[0] * dpi), int(figsize[1] * dpi)
+        self.font, self.title_font = _font(10 * self.scale), _font(12 * self.scale)
+        self.xlim, self.ylim = xlim, ylim
+        self.xticks = _ticks(*sorted(xlim)) if xticks is None else xticks
+        self.yticks = _ticks(*sorted(ylim)) if yticks is None else yticks
+        self.xticklabels = xticklabels or [f'{t:g}' for t in self.xticks]
+        self.yticklabels = [f'{t:g}' for t in self.yticks]
+        self.title, self.xlabel, self.ylabel = title, xlabel, ylabel
+
+        pad, self.tick = int(4 * self.scale), int(3.5 * self.scale)
+        text_h = self._size('0', self.font)[1]
+        label_w = max(self._size(s, self.font)[0] for s in self.yticklabels)
+        self.left = pad + (text_h + pad if ylabel else 0) + label_w + self.tick + pad
+        self.bottom = self.tick + pad + text_h + pad + (text_h + pad if xlabel else 0) + pad
+        self.top = self._size(title, self.title_font)[1] + 3 * pad
+        self.right = 3 * pad + right
+        self.x0, self.x1 = self.left, self.W - self.right
+        self.y0, self.y1 = self.top, self.H - self.bottom
+        self.pixels = np.full((self.H, self.W, 3), 255, dtype=np.uint8)
+
+    @staticmethod
+    def _size(text, font):
+        box = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+        return box[2] - box[0], box[3] - box[1]
+
+    def px(self, x):
+        lo, hi = self.xlim
+        return self.x0 + (np.asarray(x, dtype=float) - lo) / (hi - lo) * (self.x1 - self.x0)
+
+    def py(self, y):
+        lo, hi = self.ylim
+        return self.y1 - (np.asarray(y, dtype=float) - lo) / (hi - lo) * (self.y1 - self.y0)
+
+    def fill_columns(self, heights, color):
+        """Barres au pixel près: `heights` donne la valeur y de chaque colonne de la zone de tracé."""
+        rows = np.arange(self.y0, self.y1)[:, None]
+        mask = rows >= np.clip(self.py(heights), self.y0, self.y1)[None, :]
+        mask &= rows < self.py(0)
+        self.pixels[self.y0:self.y1, self.x0:self.x1][mask] = color
+
+    def splat(self, x, y, color, size_pt=1.0):
+        """Points carrés de `size_pt` points de côté, coupés aux bords de la zone de tracé."""
+        d = max(1, int(round(size_pt * self.scale)))
+        cols = np.round(self.px(x)).astype(int) - d // 2
+        rows = np.round(self.py(y)).astype(int) - d // 2
+        for dy in range(d):
+            for dx in range(d):
+                r, c = rows + dy, cols + dx
+                keep = (r >= self.y0) & (r < self.y1) & (c >= self.x0) & (c < self.x1)
+                self.pixels[r[keep], c[keep]] = color
+
+    def rect(self, xa, xb, ya, yb, color):
+        """Rectangle en coordonnées données."""
+        ca, cb = sorted((int(round(float(self.px(xa)))), int(round(float(self.px(xb))))))
+        ra, rb = sorted((int(round(float(self.py(ya)))), int(round(float(self.py(yb))))))
+        self.pixels[max(ra, self.y0):min(rb, self.y1), max(ca, self.x0):min(cb, self.x1)] = color
+
+    def finish(self, path, legend=None, texts=(), hlines=(), extra=None):
+        """
+        Cadre, graduations, étiquettes, légende [(libellé, couleur)], lignes de référence
+        [(y, couleur)], textes [(x, y, texte)], puis écriture du PNG (compression rapide).
+        `extra(img, draw)` complète le dessin (barre de couleurs).
+        """
+        img = Image.fromarray(self.pixels)
+        draw = ImageDraw.Draw(img)
+        width = max(1, int(round(0.8 * self.scale)))
+        for value, color in hlines:
+            # Ligne de référence en tirets
+            y = int(round(float(self.py(value))))
+            step = int(4 * self.scale)
+            for x in range(self.x0, self.x1, 2 * step):
+                draw.line([(x, y), (min(x + step, self.x1), y)], fill=color, width=width * 2)
+        for x, y, text in texts:
+            draw.text((float(self.px(x)), float(self.py(y))), text, fill='black', font=self.font, anchor='md')
+        draw.rectangle([self.x0, self.y0, self.x1, self.y1], outline='black', width=width)
+        for t, label in zip(self.xticks, self.xticklabels):
+            x = float(self.px(t))
+            if self.x0 - 1 <= x <= self.x1 + 1:
+                draw.line([(x, self.y1), (x, self.y1 + self.tick)], fill='black', width=width)
+                draw.text((x, self.y1 + self.tick + 2 * self.scale), label, fill='black', font=self.font, anchor='mt')
+        for t, label in zip(self.yticks, self.yticklabels):
+            y = float(self.py(t))
+            if self.y0 - 1 <= y <= self.y1 + 1:
+                draw.line([(self.x0 - self.tick, y), (self.x0, y)], fill='black', width=width)
+                draw.text((self.x0 - self.tick - 2 * self.scale, y), label, fill='black', font=self.font, anchor='rm')
+        draw.text(((self.x0 + self.x1) / 2, self.y0 - 4 * self.scale), self.title, fill='black',
+                  font=self.title_font, anchor='md')
+        if self.xlabel:
+            draw.text(((self.x0 + self.x1) / 2, self.H - 4 * self.scale), self.xlabel, fill='black',
+                      font=self.font, anchor='md')
+        if self.ylabel:
+            w, h = self._size(self.ylabel, self.font)
+            label = Image.new('RGB', (w + 4, h + 8), 'white')
+            ImageDraw.Draw(label).text((2, 2), self.ylabel, fill='black', font=self.font)
+            label = label.rotate(90, expand=True)
+            img.paste(label, (int(4 * self.scale), int((self.y0 + self.y1 - label.height) / 2)))
+        if legend:
+            self._legend(draw, legend)
+        if extra:
+            extra(img, draw)
+        img.save(path, format='PNG', compress_level=1)
+        return path
+
+    def _legend(self, draw, entries):
+        pad = int(5 * self.scale)
+        sw = int(14 * self.scale)
+        text_w = max(self._size(label, self.font)[0] for label, _ in entries)
+        line_h = self._size('Ag', self.font)[1] + pad
+        x1, y0 = self.x1 - pad, self.y0 + pad
+        x0, y1 = x1 - (pad * 3 + sw + text_w), y0 + pad + line_h * len(entries)
+        draw.rectangle([x0, y0, x1, y1], fill='white', outline=(204, 204, 204), width=max(1, int(self.scale / 2)))
+        for k, (label, color) in enumerate(entries):
+            y = y0 + pad + k * line_h
+            draw.rectangle([x0 + pad, y, x0 + pad + sw, y + line_h - pad], fill=color)
+            draw.text((x0 + 2 * pad + sw, y + (line_h - pad) / 2), label, fill='black', font=self.font, anchor='lm')
+
+
+def histogram(path, dpi, counts, color, title):
+    """Barres des 256 niveaux, rastérisées colonne par colonne depuis les comptages."""
+    counts = np.asarray(counts, dtype=float)
+    chart = _Chart((6, 4), dpi, _with_margin(0, 256), (0, max(counts.max(), 1) * 1.05), title,
+                   "Valeur Pixel", "Fréquence")
+    # Niveau de gris couvert par chaque colonne de pixels
+    cols = np.arange(chart.x0, chart.x1) + 0.5
+    levels = np.floor(chart.xlim[0] + (cols - chart.x0) / (chart.x1 - chart.x0) * (chart.xlim[1] - chart.xlim[0]))
+    inside = (levels >= 0) & (levels < 256)
+    heights = np.where(inside, counts[np.clip(levels, 0, 255).astype(int)], 0)
+    chart.fill_columns(heights, _rgb(color, 0.7))
+    return chart.finish(path)
+
+
+def scatter(path, dpi, x, y, color, title):
+    """Nuage de points (pixel, voisin) sur [0, 255]²."""
+    chart = _Chart((5, 5), dpi, (0, 255), (0, 255), title, "Pixel (x, y)", "Pixel voisin")
+    chart.splat(x, y, _rgb(color))
+    return chart.finish(path)
+
+
+def chaotic_map(path, dpi, samples, color, title):
+    """Itérés x_n en fonction de n."""
+    samples = np.asarray(samples, dtype=float)
+    chart = _Chart((10, 4), dpi, _with_margin(0, len(samples) - 1), _with_margin(samples.min(), samples.max()),
+                   title, "n", "Xn")
+    chart.splat(np.arange(len(samples)), samples, _rgb(color))
+    return chart.finish(path)
+
+
+def sbox_heatmap(path, dpi, sbox):
+    """S-Box 256x256 colorée par la table viridis, avec barre de couleurs."""
+    sbox = np.asarray(sbox)
+    scale = dpi / 72
+    bar_w, bar_gap = int(14 * scale), int(18 * scale)
+    label_w = int(30 * scale)
+    chart = _Chart((10, 8), dpi, (-0.5, 255.5), (255.5, -0.5), "Visualisation S-Box (256x256)",
+                   xticks=list(range(0, 256, 50)), yticks=list(range(0, 256, 50)),
+                   right=bar_gap + bar_w + label_w)
+    # Zone de tracé carrée (aspect 1, comme imshow), centrée verticalement
+    side = min(chart.x1 - chart.x0, chart.y1 - chart.y0)
+    chart.x1 = chart.x0 + side
+    chart.y0 += (chart.y1 - chart.y0 - side) // 2
+    chart.y1 = chart.y0 + side
+    heat = Image.fromarray(VIRIDIS[sbox.astype(np.uint8)]).resize((side, side), Image.NEAREST)
+    chart.pixels[chart.y0:chart.y1, chart.x0:chart.x1] = np.asarray(heat)
+
+    lo, hi = int(sbox.min()), int(sbox.max())
+    bx0 = chart.x1 + bar_gap
+    gradient = VIRIDIS[np.linspace(255, 0, side).round().astype(int)]
+    chart.pixels[chart.y0:chart.y1, bx0:bx0 + bar_w] = gradient[:, None, :]
+
+    def colorbar(img, draw):
+        draw.rectangle([bx0, chart.y0, bx0 + bar_w, chart.y1], outline='black', width=max(1, int(0.8 * scale)))
+        for t in _ticks(lo, hi):
+            y = chart.y1 - (t - lo) / ((hi - lo) or 1) * side
+            draw.line([(bx0 + bar_w, y), (bx0 + bar_w + chart.tick, y)], fill='black', width=max(1, int(0.8 * scale)))
+            draw.text((bx0 + bar_w + chart.tick + 2 * scale, y), f'{t:g}', fill='black', font=chart.font, anchor='lm')
+
+    return chart.finish(path, extra=colorbar)
+
+
+def grouped_bars(path, dpi, labels, series, title, ylabel, figsize=(8, 5), ylim=None, hline=None):
+    """Barres groupées (`series` = [(légende, valeurs, couleur, alpha)]), ligne de référence optionnelle."""
+    width = 0.35
+    x = np.arange(len(labels))
+    values = [v for _, vals, _, _ in series for v in vals]
+    if ylim is None:
+        ylim = (0, max(values + ([hline[0]] if hline else [])) * 1.05)
+    chart = _Chart(figsize, dpi, _with_margin(-0.5 * width * len(series), len(labels) - 1 + 0.5 * width * len(series)),
+                   ylim, title, '', ylabel, xticks=list(x), xticklabels=list(labels))
+    legend = []
+    for k, (label, vals, color, alpha) in enumerate(series):
+        rgb = _rgb(color, alpha)
+        for xi, v in zip(x, vals):
+            left = xi + (k - 0.5) * width - width / 2
+            chart.rect(left, left + width, max(ylim[0], 0), v, rgb)
+        legend.append((label, rgb))
+    hlines = []
+    if hline is not None:
+        value, color, label = hline
+        hlines.append((value, _rgb(color)))
+        legend.append((label, _rgb(color)))
+    return chart.finish(path, legend=legend, hlines=hlines)
+
+
+def labeled_bars(path, dpi, labels, values, colors, title, ylabel, ylim):
+    """Barres simples annotées de leur valeur."""
+    width = 0.8
+    chart = _Chart((6, 5), dpi, _with_margin(-width / 2, len(labels) - 1 + width / 2), ylim, title, '', ylabel,
+                   xticks=list(range(len(labels))), xticklabels=list(labels))
+    for i, (v, color) in enumerate(zip(values, colors)):
+        chart.rect(i - width / 2, i + width / 2, 0, v, _rgb(color))
+    texts = [(i, v + 0.1, f"{v:.4f}") for i, v in enumerate(values)]
+    return chart.finish(path, texts=texts)
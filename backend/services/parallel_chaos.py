@@ -0,0 +1,70 @@
+# Exécution simultanée des noyaux chaotiques (u, v et w sont indépendants).
+#
+# Un "job" est un tuple (map_name, state, param, out): le noyau remplit `out`
+# depuis l'état `state` et l'état final est retourné. Trois modes:
+# - 'thread'  : pool de threads; efficace avec les noyaux numba (nogil)
+# - 'process' : pool de processus écrivant dans des segments de mémoire partagée
+# - 'off'     : exécution séquentielle dans le thread appelant
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import config
+from services import chaos_kernels
+from services.worker_pools import get_process_pool, get_thread_pool
+
+
+def get_mode():
+    """Mode effectif: 'auto' choisit les threads avec numba, les processus sinon."""
+    mode = config.CHAOS_PARALLEL_MODE
+    if mode != 'auto':
+        return mode
+    if chaos_kernels.BACKEND == 'numba':
+        return 'thread'
+    return 'process' if (os.cpu_count() or 1) > 1 else 'off'
+
+
+def _run_job(job):
+    map_name, state, param, out = job
+    return chaos_kernels.KERNELS[map_name](state, param, out)
+
+
+def _process_worker(shm_name, length, map_name, state, param):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        final_state = chaos_kernels.KERNELS[map_name](state, param, out)
+        del out
+        return final_state
+    finally:
+        shm.close()
+
+
+def _run_jobs_in_processes(jobs, pool):
+    segments, futures = [], []
+    try:
+        for map_name, state, param, out in jobs:
+            shm = shared_memory.SharedMemory(create=True, size=max(out.nbytes, 1))
+            segments.append(shm)
+            futures.append(pool.submit(_process_worker, shm.name, out.shape[0], map_name, state, param))
+        states = []
+        for shm, future, (_, _, _, out) in zip(segments, futures, jobs):
+            states.append(future.result())
+            out[:] = np.ndarray(out.shape, dtype=np.float64, buffer=shm.buf)
+        return states
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def run_kernels(jobs, mode=None):
+    """Exécute les jobs (éventuellement en parallèle) et retourne la liste des états finaux."""
+    mode = mode or get_mode()
+    longest = max((job[3].shape[0] for job in jobs), default=0)
+    if mode == 'off' or len(jobs) < 2 or longest < config.CHAOS_PARALLEL_MIN_LENGTH:
+        return [_run_job(job) for job in jobs]
+
+    if mode == 'process':
+        return _run_jobs_in_processes(jobs, get_process_pool('chaos', config.CHAOS_WORKERS))
+    return list(get_thread_pool('chaos', config.CHAOS_WORKERS).map(_run_job, jobs))
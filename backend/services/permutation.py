@@ -20,17 +20,16 @@ class PermutationService:
         S[0] = P
         S[i][j] = S[i-1][(j + AL[i]) mod 256]
         """
-        s_box = np.zeros((256, 256), dtype=np.uint8)
-        s_box[0] = p_box
-        
         # We need the first 256 values of AL for the 256 rows
-        al_subset = al_sequence[:256].astype(np.int32)
+        al_subset = al_sequence[:256].astype(np.int64)
         
-        for i in range(1, 256):
-            # Formula: S[i][j] = S[i-1][(j + AL[i]) % 256]
-            # This effectively shifts S[i-1] to the LEFT by AL[i] positions.
-            shift = al_subset[i]
-            s_box[i] = np.roll(s_box[i-1], -shift)
+        # Formula: S[i][j] = S[i-1][(j + AL[i]) % 256]
+        # Each row is P shifted to the LEFT by the cumulated shift AL[1] + ... + AL[i],
+        # so the whole table is a single fancy-indexed lookup into P.
+        offsets = np.zeros(256, dtype=np.int64)
+        offsets[1:] = np.cumsum(al_subset[1:])
+        indices = (np.arange(256)[np.newaxis, :] + offsets[:, np.newaxis]) % 256
+        s_box = np.asarray(p_box, dtype=np.uint8)[indices]
             
         return s_box
 
@@ -40,10 +39,9 @@ class PermutationService:
         Génère la S-Box inverse pour le déchiffrement.
         Si Y = S[row][X], alors X = S_inv[row][Y].
         """
+        # For each row, we invert the permutation (all rows at once)
+        # If s_box[i][x] = y, then s_box_inv[i][y] = x
         s_box_inv = np.zeros((256, 256), dtype=np.uint8)
-        for i in range(256):
-            # For each row, we invert the permutation
-            # If s_box[i][x] = y, then s_box_inv[i][y] = x
-            s_box_inv[i][s_box[i]] = np.arange(256, dtype=np.uint8)
+        s_box_inv[np.arange(256)[:, np.newaxis], s_box] = np.arange(256, dtype=np.uint8)
             
         return s_box_inv
@@ -0,0 +1,36 @@
+import time
+
+import config
+
+
+class ProgressMeter:
+    """
+    Compteur de progression de la boucle CBC, alimenté aux frontières de tranches
+    (jamais à chaque itération). N'émet qu'au plus un événement 'progress' toutes les
+    `interval` secondes, plus un dernier en fin de boucle.
+    emit(event, data) est le même callback que celui des étapes du process_log.
+    """
+
+    def __init__(self, emit, total, interval=None):
+        self.emit = emit
+        self.total = total
+        self.interval = config.PROGRESS_INTERVAL if interval is None else interval
+        self.done = 0
+        self.start = time.time()
+        self._last = 0.0
+
+    def advance(self, count):
+        """Ajoute `count` octets chiffrés; émet si l'intervalle est écoulé ou si tout est traité."""
+        self.done += count
+        now = time.time()
+        if self.done < self.total and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.start
+        self.emit('progress', {
+            'bytes': self.done,
+            'total': self.total,
+            'percent': 100.0 * self.done / self.total if self.total else 100.0,
+            'elapsed': elapsed,
+            'mpixels_per_s': self.done / elapsed / 1e6 if elapsed > 0 else 0.0,
+        })
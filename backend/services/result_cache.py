@@ -0,0 +1,234 @@
+# Cache des résultats adressé par contenu.
+#
+# Clé: SHA-256 de l'image envoyée, paramètres chaotiques normalisés, mode de chaînage
+# (et sa version), découpage et format de sortie. Une même image renvoyée avec la même clé
+# (rafraîchissement, nouvel essai) réutilise le chiffré et les métriques d'analyse, sans
+# refaire la boucle de chiffrement. Rien d'équivalent à la clé (itérés des cartes, S-Box,
+# journal du processus qui cite la clé et des octets du keystream) n'est conservé: ces
+# données sont reconstruites depuis les paramètres de la requête. Deux niveaux: mémoire (LRU du processus) et disque (partagé
+# entre workers, LRU d'après la date d'accès des fichiers), chacun borné en octets.
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from services import cipher_modes
+from services.chaotic_maps import ChaoticMaps
+
+# Champs de l'entrée stockés en JSON (fichier .json); les autres sont des tableaux (.npz)
+META_FIELDS = ('mimetype', 'ext', 'key_check', 'length', 'analysis')
+ARRAY_FIELDS = ('ciphertext',)
+# Lecture de l'upload par blocs (hashlib.file_digest n'existe qu'à partir de Python 3.11)
+DIGEST_CHUNK_SIZE = 1 << 20
+
+
+def content_digest(source):
+    """SHA-256 (hexadécimal) de l'upload: octets, ou chemin du fichier enregistré."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(digest, params, mode, tiles, output_format):
+    """Clé d'un résultat; les paramètres sont normalisés (flottants, ordre fixe)."""
+    normalized = [repr(float(params[k])) for k in ChaoticMaps.PARAM_KEYS]
+    parts = [digest, normalized, mode, cipher_modes.VERSIONS[mode], int(tiles), output_format]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def _nbytes(entry):
+    size = sum(len(entry[key]) if isinstance(entry[key], bytes) else np.asarray(entry[key]).nbytes
+               for key in ARRAY_FIELDS if key in entry)
+    return size + len(json.dumps({key: entry.get(key) for key in META_FIELDS}))
+
+
+class ResultCache:
+    """
+    Résultats de chiffrement par clé de contenu. Une entrée est un dict:
+    ciphertext (octets encodés), mimetype, ext, key_check (hexadécimal), length (octets
+    de l'image) et, après la première analyse, analysis (métriques).
+    Statistiques: `misses` compte les entrées absentes, `field_misses` les entrées
+    présentes dont le champ demandé manque encore (analyse pas encore calculée).
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir if disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.field_misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, field=None):
+        """
+        Entrée de `key` (ou son champ `field`), depuis la mémoire puis le disque; None si absente.
+        Une entrée lue sur disque est remontée en mémoire.
+        """
+        if not key:
+            return None
+        entry, from_disk = self._lookup(key)
+        value = entry if field is None or entry is None else entry.get(field)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            elif value is None:
+                self.field_misses += 1
+            else:
+                self.hits += 1
+                self.disk_hits += from_disk
+        return value
+
+    def _lookup(self, key):
+        """(entrée, lue sur disque ou non), sans compter dans les statistiques."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, False
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry, entry is not None
+
+    def put(self, key, entry):
+        """Enregistre une entrée dans les deux niveaux."""
+        self._remember(key, entry)
+        self._save(key, entry, arrays=True)
+
+    def update(self, key, **fields):
+        """Complète une entrée existante (par ex. les métriques d'analyse); sans effet si absente."""
+        entry = self._lookup(key)[0] if key else None
+        if entry is None:
+            return
+        entry = dict(entry, **fields)
+        self._remember(key, entry)
+        self._save(key, entry, arrays=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'field_misses': self.field_misses,
+            }
+        if self.disk_dir is not None:
+            files = self._disk_files()
+            stats['disk'] = {'entries': len({name.rsplit('.', 1)[0] for name, _, _ in files}),
+                             'bytes': sum(size for _, size, _ in files), 'max_bytes': self.disk_max_bytes}
+        return stats
+
+    def _remember(self, key, entry):
+        size = _nbytes(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= _nbytes(old)
+            self._entries[key] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= _nbytes(evicted)
+
+    # --- Niveau disque: <clé>.npz (tableaux) + <clé>.json (champs légers) ---
+
+    def _path(self, key, ext):
+        return os.path.join(self.disk_dir, f'{key}{ext}')
+
+    def _write(self, path, write):
+        # Fichier temporaire puis renommage: un autre worker ne lit jamais une entrée partielle
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _save(self, key, entry, arrays=True):
+        if self.disk_dir is None:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        try:
+            if arrays:
+                data = {k: np.frombuffer(entry[k], dtype=np.uint8) if isinstance(entry[k], bytes) else entry[k]
+                        for k in ARRAY_FIELDS}
+                self._write(self._path(key, '.npz'), lambda f: np.savez(f, **data))
+            meta = json.dumps({k: entry.get(k) for k in META_FIELDS}).encode()
+            self._write(self._path(key, '.json'), lambda f: f.write(meta))
+        except OSError:
+            return  # Disque plein ou dossier supprimé: le niveau mémoire suffit
+        self._trim_disk()
+
+    def _load(self, key):
+        if self.disk_dir is None:
+            return None
+        npz_path, json_path = self._path(key, '.npz'), self._path(key, '.json')
+        try:
+            with open(json_path, 'rb') as f:
+                entry = json.loads(f.read())
+            with np.load(npz_path, allow_pickle=False) as data:
+                entry.update({k: data[k] for k in ARRAY_FIELDS})
+            # Date d'accès: ordre LRU de l'éviction sur disque
+            os.utime(npz_path)
+            os.utime(json_path)
+        except (OSError, ValueError, KeyError):
+            return None  # Absente, ou évincée entre-temps par un autre worker
+        entry['ciphertext'] = entry['ciphertext'].tobytes()
+        return entry
+
+    def _disk_files(self):
+        """[(nom, taille, date)] des fichiers du cache disque."""
+        files = []
+        try:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(('.npz', '.json')):
+                    st = os.stat(os.path.join(self.disk_dir, name))
+                    files.append((name, st.st_size, st.st_mtime))
+        except OSError:
+            pass
+        return files
+
+    def _trim_disk(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de disk_max_bytes."""
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        if total <= self.disk_max_bytes:
+            return
+        entries = {}
+        for name, size, mtime in files:
+            key = name.rsplit('.', 1)[0]
+            last, nbytes = entries.get(key, (0, 0))
+            entries[key] = (max(last, mtime), nbytes + size)
+        for key, (_, nbytes) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.disk_max_bytes:
+                break
+            for ext in ('.npz', '.json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:
+                    pass
+            total -= nbytes
+
+
+RESULT_CACHE = ResultCache(config.RESULT_CACHE_BYTES, config.RESULT_CACHE_DIR, config.RESULT_CACHE_DISK_BYTES)
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import config
+from services import chaos_kernels
+
+
+class _Orbit:
+    """Orbite calculée jusqu'ici et état final de la carte (pour la reprendre)."""
+    __slots__ = ('sequence', 'state')
+
+    def __init__(self, sequence, state):
+        self.sequence = sequence
+        self.state = state
+
+
+class SequenceCache:
+    """
+    Cache LRU d'orbites chaotiques, clé (carte, x0, paramètre), borné en octets.
+    Une orbite de longueur L est le préfixe exact de la même orbite plus longue:
+    - longueur plus courte  -> vue (slice) sans copie de l'orbite stockée
+    - longueur plus longue  -> on reprend l'itération depuis l'état final sauvegardé
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, map_name, x0, param, length):
+        return self.get_many([(map_name, x0, param)], length)[0]
+
+    def get_many(self, requests, length, run_kernels=None):
+        """
+        Sert plusieurs orbites [(carte, x0, paramètre), ...] de même longueur.
+        Les calculs manquants sont confiés ensemble à `run_kernels(jobs)` (voir
+        services.parallel_chaos), séquentiellement par défaut.
+        """
+        results = [None] * len(requests)
+        jobs, pending = [], []
+        for idx, (map_name, x0, param) in enumerate(requests):
+            key = (map_name, float(x0), float(param))
+            with self._lock:
+                orbit = self._entries.get(key)
+                if orbit is not None:
+                    self._entries.move_to_end(key)
+                    if len(orbit.sequence) >= length:
+                        self.hits += 1
+                        results[idx] = orbit.sequence[:length]
+                        continue
+
+            sequence = np.empty(length)
+            if orbit is not None:
+                # Extension: copie du préfixe connu puis reprise depuis l'état final
+                done = len(orbit.sequence)
+                sequence[:done] = orbit.sequence
+                jobs.append((map_name, orbit.state, float(param), sequence[done:]))
+            else:
+                jobs.append((map_name, float(x0), float(param), sequence))
+            pending.append((idx, key, sequence, orbit is not None))
+
+        if jobs:
+            states = (run_kernels or self._run_sequential)(jobs)
+            for (idx, key, sequence, extended), state in zip(pending, states):
+                sequence.setflags(write=False)
+                self._store(key, _Orbit(sequence, state), extended)
+                results[idx] = sequence
+        return results
+
+    @staticmethod
+    def _run_sequential(jobs):
+        return [chaos_kernels.KERNELS[name](state, param, out) for name, state, param, out in jobs]
+
+    def _store(self, key, orbit, extended):
+        with self._lock:
+            if extended:
+                self.extensions += 1
+            else:
+                self.misses += 1
+            size = orbit.sequence.nbytes
+            if size > self.max_bytes:
+                return
+            previous = self._entries.get(key)
+            if previous is not None:
+                # Une autre requête a pu étendre l'orbite entre-temps: garder la plus longue
+                if len(previous.sequence) >= len(orbit.sequence):
+                    return
+                self.current_bytes -= previous.sequence.nbytes
+            self._entries[key] = orbit
+            self._entries.move_to_end(key)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.sequence.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'extensions': self.extensions,
+                'misses': self.misses,
+            }
+
+
+SEQUENCE_CACHE = SequenceCache(config.SEQUENCE_CACHE_BYTES)
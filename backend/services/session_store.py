@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+# Champs volumineux gardés en mémoire pour éviter de relire les PNG de static/.
+# Ils sont les premiers sacrifiés quand un plafond mémoire est atteint: les routes
+# retombent alors sur les fichiers (chemins conservés dans la session).
+HEAVY_KEYS = ('original', 'encrypted', 'schedule')
+
+_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def _field_nbytes(value):
+    # ndarray et KeySchedule exposent tous deux nbytes
+    return getattr(value, 'nbytes', 0)
+
+
+class Session:
+    """
+    Données d'un client: chemins, paramètres, chiffrement, dernier résultat et tableaux décodés.
+    `version` est celle de l'entrée partagée (backend d'état) dont les champs légers sont issus.
+    """
+    __slots__ = ('id', 'data', 'nbytes', 'version', 'created', 'last_access')
+
+    def __init__(self, session_id, data=None, version=0):
+        self.id = session_id
+        self.data = dict(data or {})
+        self.nbytes = 0
+        self.version = version
+        self.created = self.last_access = time.time()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+
+class SessionStore:
+    """
+    Sessions par jeton client, thread-safe, ordonnées par dernier accès (LRU).
+    - TTL: une session inactive depuis `ttl` secondes est supprimée.
+    - Plafond par session: au-delà de `session_max_bytes`, ses tableaux sont abandonnés.
+    - Plafond global: au-delà de `max_bytes`, les tableaux des sessions les moins
+      récemment utilisées sont abandonnés; au-delà de `max_sessions`, les sessions elles-mêmes.
+    Avec un `backend` d'état partagé (plusieurs workers), les champs légers y sont persistés
+    et font foi: la copie locale ne sert que de cache, avec les tableaux propres au processus.
+    """
+
+    NAMESPACE = 'sessions'
+    # Index identifiant d'export -> jeton (l'identifiant figure dans les URLs des graphes, pas le jeton)
+    EXPORT_NAMESPACE = 'exports'
+
+    def __init__(self, max_bytes, session_max_bytes, ttl, max_sessions, backend=None):
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.backend = backend
+        self.current_bytes = 0
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._export_index = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    @staticmethod
+    def valid_token(token):
+        return bool(token) and _TOKEN_RE.match(token) is not None
+
+    def get(self, token, create=False):
+        """Session du jeton (rafraîchie), ou une nouvelle si `create` (jeton client repris s'il est valide)."""
+        # Lecture de l'entrée partagée hors verrou (E/S disque)
+        record = self._load(token)
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            session = self._sessions.get(token) if token else None
+            if self.backend is not None and token:
+                if record is None and session is not None:
+                    # Expirée (ou jamais persistée): l'entrée partagée fait foi
+                    self._remove(session)
+                    session = None
+                elif record is not None and (session is None or session.version != record[0]):
+                    # Modifiée par un autre worker: champs légers repris, tableaux locaux abandonnés
+                    if session is not None:
+                        self._remove(session)
+                    session = Session(token, record[1], record[0])
+                    self._sessions[token] = session
+            if session is None:
+                if not create:
+                    return None
+                session = Session(token if self.valid_token(token) else uuid.uuid4().hex)
+                self._sessions[session.id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._remove(next(iter(self._sessions.values())))
+                    self.evictions += 1
+            self._sessions.move_to_end(session.id)
+            session.last_access = now
+            return session
+
+    def update(self, session, **fields):
+        """Met à jour les champs de la session et applique les plafonds mémoire."""
+        version = None
+        light = {key: value for key, value in fields.items() if key not in HEAVY_KEYS}
+        if self.backend is not None and light:
+            version = self.backend.put(self.NAMESPACE, session.id, light, merge=True)
+        with self._lock:
+            if version is not None:
+                session.version = version
+            # Session expirée ou remplacée pendant un job: elle est réinsérée (la plus récente)
+            current = self._sessions.get(session.id)
+            if current is not session:
+                if current is not None:
+                    self._remove(current)
+                self._sessions[session.id] = session
+                self.current_bytes += session.nbytes
+                if self.backend is None and session.get('export_id'):
+                    self._export_index[session['export_id']] = session.id
+            self._sessions.move_to_end(session.id)
+            for value in fields.values():
+                if isinstance(value, np.ndarray):
+                    # Partagés entre requêtes et jobs: jamais modifiés sur place
+                    value.setflags(write=False)
+            session.data.update(fields)
+            self._account(session)
+            if session.nbytes > self.session_max_bytes:
+                self._strip(session)
+            for other in list(self._sessions.values()):
+                if self.current_bytes <= self.max_bytes:
+                    break
+                if other is not session:
+                    self._strip(other)
+            if self.current_bytes > self.max_bytes:
+                self._strip(session)
+
+    def export_id(self, session):
+        """
+        Identifiant opaque des fichiers exportés de la session (dossier et URLs des graphes),
+        créé au premier besoin. Distinct du jeton: une URL de graphe ne donne pas accès à la session.
+        """
+        export_id = session.get('export_id')
+        if export_id is None:
+            export_id = uuid.uuid4().hex
+            if self.backend is not None:
+                self.backend.put(self.EXPORT_NAMESPACE, export_id, {'session': session.id})
+            else:
+                with self._lock:
+                    self._export_index[export_id] = session.id
+            self.update(session, export_id=export_id)
+        return export_id
+
+    def get_by_export_id(self, export_id):
+        """Session dont les exports portent l'identifiant `export_id`, ou None."""
+        if not self.valid_token(export_id):
+            return None
+        if self.backend is not None:
+            record = self.backend.get(self.EXPORT_NAMESPACE, export_id)
+            token = record[1]['session'] if record else None
+        else:
+            with self._lock:
+                token = self._export_index.get(export_id)
+        session = self.get(token) if token else None
+        if session is None or session.get('export_id') != export_id:
+            return None
+        return session
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'session_max_bytes': self.session_max_bytes,
+                'evictions': self.evictions,
+            }
+
+    def _account(self, session):
+        size = sum(_field_nbytes(session.data.get(key)) for key in HEAVY_KEYS)
+        self.current_bytes += size - session.nbytes
+        session.nbytes = size
+
+    def _strip(self, session):
+        if not session.nbytes:
+            return
+        for key in HEAVY_KEYS:
+            session.data.pop(key, None)
+        self._account(session)
+        self.evictions += 1
+
+    def _remove(self, session):
+        if self._sessions.pop(session.id, None) is not None:
+            self.current_bytes -= session.nbytes
+            if self.backend is None:
+                self._export_index.pop(session.get('export_id'), None)
+
+    def _expire(self, now):
+        # Ordre LRU: les sessions expirées sont en tête
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_access <= self.ttl:
+                break
+            self._remove(session)
+
+    def _load(self, token):
+        """Entrée partagée (version, champs) du jeton; prolonge son TTL. None sans backend."""
+        if self.backend is None or not token:
+            return None
+        now = time.time()
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            self.backend.purge(self.NAMESPACE, self.ttl)
+            self.backend.purge(self.EXPORT_NAMESPACE, self.ttl)
+        record = self.backend.get(self.NAMESPACE, token)
+        if record is None:
+            return None
+        version, data, updated = record
+        if now - updated > self.ttl:
+            return None
+        if now - updated > self.ttl / 10:
+            # Accès récent: l'entrée n'est réécrite qu'occasionnellement (peu d'écritures)
+            self.backend.touch(self.NAMESPACE, token)
+            if data.get('export_id'):
+                self.backend.touch(self.EXPORT_NAMESPACE, data['export_id'])
+        return version, data
@@ -0,0 +1,94 @@
+# État partagé entre processus (workers gunicorn) sans service externe.
+#
+# Une base SQLite locale (mode WAL) sert d'index clé/valeur JSON par espace de noms
+# ('sessions', 'jobs'). Chaque écriture incrémente la version de l'entrée: un worker
+# compare sa copie locale à cette version pour savoir si un autre worker l'a modifiée.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+)
+"""
+
+
+def _json_default(value):
+    # Scalaires / tableaux NumPy présents dans les résultats (métriques)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Valeur non sérialisable: {type(value).__name__}")
+
+
+class SqliteStateBackend:
+    """Index clé/valeur JSON partagé par tous les processus qui ouvrent le même fichier."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        # Une connexion par thread (les connexions sqlite3 ne se partagent pas entre threads)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, ns, key):
+        """(version, valeur, date de mise à jour) de l'entrée, ou None si absente."""
+        row = self._connect().execute(
+            'SELECT version, value, updated FROM state WHERE ns = ? AND key = ?', (ns, key)).fetchone()
+        return (row[0], json.loads(row[1]), row[2]) if row else None
+
+    def put(self, ns, key, value, merge=False):
+        """Écrit (ou fusionne avec `merge`) la valeur; retourne la nouvelle version."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT version, value FROM state WHERE ns = ? AND key = ?', (ns, key)).fetchone()
+            version = row[0] + 1 if row else 1
+            if merge and row:
+                value = {**json.loads(row[1]), **value}
+            conn.execute('INSERT OR REPLACE INTO state (ns, key, value, version, updated) VALUES (?, ?, ?, ?, ?)',
+                         (ns, key, json.dumps(value, default=_json_default), version, time.time()))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return version
+
+    def touch(self, ns, key):
+        self._connect().execute('UPDATE state SET updated = ? WHERE ns = ? AND key = ?', (time.time(), ns, key))
+
+    def delete(self, ns, key):
+        self._connect().execute('DELETE FROM state WHERE ns = ? AND key = ?', (ns, key))
+
+    def purge(self, ns, max_age):
+        """Supprime les entrées non modifiées ni consultées depuis `max_age` secondes."""
+        self._connect().execute('DELETE FROM state WHERE ns = ? AND updated < ?', (ns, time.time() - max_age))
+
+
+def _create_backend():
+    if config.STATE_BACKEND == 'sqlite':
+        return SqliteStateBackend(config.STATE_DB_PATH)
+    return None
+
+
+# None en mode 'memory': l'état reste local au processus (un seul worker)
+STATE_BACKEND = _create_backend()
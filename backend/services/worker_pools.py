@@ -0,0 +1,29 @@
+# Pools d'exécution partagés par le processus (créés à la première utilisation).
+# Les pools de processus utilisent 'spawn': pas de fork d'un serveur multi-threadé.
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_thread_pool(name, workers):
+    """Pool de threads nommé, réutilisé tant que le nombre de workers est inchangé."""
+    return _get_pool(('thread', name, workers),
+                     lambda: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name))
+
+
+def get_process_pool(name, workers):
+    """Pool de processus nommé, réutilisé tant que le nombre de workers est inchangé."""
+    return _get_pool(('process', name, workers),
+                     lambda: ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('spawn')))
+
+
+def _get_pool(key, factory):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+        return pool
@@ -1,3 +1,67 @@
-# Simple in-memory session storage
-# In a real production app, use Flask-Session with Redis/Filesystem
-SESSION_DATA = {}
+# Sessions, une par client (jeton X-Session-Id ou cookie; jamais dans l'URL: c'est un jeton porteur).
+# Remplace l'ancien dictionnaire global SESSION_DATA partagé par tous les utilisateurs.
+# Les champs légers sont partagés entre workers via le backend d'état (SQLite);
+# les tableaux décodés restent un cache propre à chaque processus.
+import io
+import os
+
+from flask import g, request
+
+import config
+from models.image_processor import ImageProcessor
+from services.artifacts import ARTIFACT_CACHE
+from services.session_store import SessionStore
+from services.state_backend import STATE_BACKEND
+
+SESSION_HEADER = 'X-Session-Id'
+SESSION_COOKIE = 'chaos_session'
+
+SESSIONS = SessionStore(config.SESSIONS_MAX_BYTES, config.SESSION_MAX_BYTES,
+                        config.SESSION_TTL_SECONDS, config.SESSION_MAX_COUNT, STATE_BACKEND)
+
+
+def get_session(create=False):
+    """Session du client courant; avec `create`, une session est ouverte si besoin."""
+    token = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    session = SESSIONS.get(token, create)
+    if session is not None and session.id != token:
+        # Nouveau jeton: renvoyé au client par attach_session_token
+        g.new_session_id = session.id
+    return session
+
+
+def attach_session_token(response):
+    """after_request: transmet au client le jeton d'une session qui vient d'être créée."""
+    session_id = g.pop('new_session_id', None)
+    if session_id:
+        response.headers[SESSION_HEADER] = session_id
+        response.set_cookie(SESSION_COOKIE, session_id, max_age=config.SESSION_TTL_SECONDS,
+                            httponly=True, samesite='Lax')
+    return response
+
+
+def load_session_image(session, which):
+    """
+    Image 'original' ou 'encrypted' de la session: tableau en mémoire, sinon relue depuis
+    static/ ou depuis le cache d'artefacts (mode 'memory') si elle a été évincée.
+    None si plus aucune source n'est disponible.
+    """
+    image = session.get(which)
+    if image is not None:
+        return image
+    path = session.get(f'{which}_path')
+    if path and os.path.exists(path):
+        return ImageProcessor.load_image(path)
+    entry = ARTIFACT_CACHE.get(session.get(f'{which}_artifact') or '')
+    if entry is not None:
+        return ImageProcessor.load_image(io.BytesIO(entry[0]))
+    return None
+
+
+def load_session_images(session):
+    """(original, chiffrée) de la session; lève ValueError si l'une n'est plus disponible."""
+    orig_img = load_session_image(session, 'original')
+    enc_img = load_session_image(session, 'encrypted')
+    if orig_img is None or enc_img is None:
+        raise ValueError("Session images are no longer available. Encrypt the image again.")
+    return orig_img, enc_img
@@ -0,0 +1,12 @@
+# Les tests importent les modules du backend comme l'application (services.*, models.*):
+# le dossier backend/ est ajouté au chemin, quel que soit le dossier de lancement de pytest.
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# État partagé et cache de résultats des tests hors de backend/instance/ (lus par config à l'import)
+_STATE_DIR = tempfile.mkdtemp(prefix='chaos_tests_')
+os.environ.setdefault('STATE_DB_PATH', os.path.join(_STATE_DIR, 'state.sqlite3'))
+os.environ.setdefault('RESULT_CACHE_DIR', os.path.join(_STATE_DIR, 'results'))
@@ -0,0 +1,97 @@
+# Les noyaux numba doivent produire exactement les mêmes flottants (bit à bit) que les
+# boucles Python de référence: le keystream, donc le chiffré, ne dépend pas du backend.
+# Chaque test tourne sous les deux backends (CHAOS_KERNEL_BACKEND=python et numba).
+import numpy as np
+import pytest
+
+import config
+from services import chaos_kernels
+from services.chaotic_maps import ChaoticMaps
+from services.sequence_cache import SEQUENCE_CACHE
+
+LENGTH = 5000
+MAPS = (('logistic', 'log_x0', 'log_mu'), ('tent', 'tent_x0', 'tent_r'), ('pwlcm', 'pwlcm_x0', 'pwlcm_p'))
+
+
+def make_param_sets(count, seed=0):
+    """Jeux de paramètres dans les plages acceptées par l'API, plus quelques cas limites."""
+    rng = np.random.default_rng(seed)
+    sets = [{
+        'log_x0': rng.uniform(0.01, 0.99), 'log_mu': rng.uniform(3.57, 4.0),
+        'tent_x0': rng.uniform(0.01, 0.99), 'tent_r': rng.uniform(1.5, 2.0),
+        'pwlcm_x0': rng.uniform(0.01, 0.99), 'pwlcm_p': rng.uniform(0.01, 0.49),
+    } for _ in range(count)]
+    # Points de bascule des branches (x = 0.5, x = p)
+    sets[0].update(tent_x0=0.5, pwlcm_x0=0.5)
+    sets[-1].update(pwlcm_x0=0.25, pwlcm_p=0.25)
+    return sets
+
+
+def reference_orbit(name, x0, param, length):
+    """Orbite calculée avec le noyau Python scalaire (référence)."""
+    out = np.empty(length)
+    chaos_kernels.PYTHON_KERNELS[name](float(x0), float(param), out)
+    return out
+
+
+@pytest.fixture(params=['python', 'numba'])
+def backend(request, monkeypatch):
+    """Active un backend de noyaux comme le ferait CHAOS_KERNEL_BACKEND à l'import."""
+    if request.param == 'numba' and chaos_kernels._load_numba_kernels() is None:
+        pytest.skip('numba is not installed')
+    selected = chaos_kernels._select_backend(request.param)
+    assert selected[0] == request.param
+    monkeypatch.setattr(config, 'CHAOS_KERNEL_BACKEND', request.param)
+    monkeypatch.setattr(chaos_kernels, 'BACKEND', selected[0])
+    monkeypatch.setattr(chaos_kernels, 'KERNELS', selected[1])
+    monkeypatch.setattr(chaos_kernels, 'BATCH_KERNELS', selected[2])
+    # Séquentiel: des workers en processus réimporteraient le backend configuré par l'environnement
+    monkeypatch.setattr(config, 'CHAOS_PARALLEL_MODE', 'off')
+    SEQUENCE_CACHE.clear()
+    yield request.param
+    SEQUENCE_CACHE.clear()
+
+
+@pytest.mark.parametrize('name, x_key, p_key', MAPS)
+def test_scalar_kernels_bit_identical(backend, name, x_key, p_key):
+    for params in make_param_sets(4):
+        out = np.empty(LENGTH)
+        final = chaos_kernels.KERNELS[name](float(params[x_key]), float(params[p_key]), out)
+        expected = reference_orbit(name, params[x_key], params[p_key], LENGTH)
+        np.testing.assert_array_equal(out, expected)
+        assert final == expected[-1]
+
+
+@pytest.mark.parametrize('name, x_key, p_key', MAPS)
+def test_kernel_resumes_from_final_state(backend, name, x_key, p_key):
+    params = make_param_sets(1)[0]
+    head, tail = np.empty(1234), np.empty(LENGTH - 1234)
+    state = chaos_kernels.KERNELS[name](float(params[x_key]), float(params[p_key]), head)
+    chaos_kernels.KERNELS[name](state, float(params[p_key]), tail)
+    expected = reference_orbit(name, params[x_key], params[p_key], LENGTH)
+    np.testing.assert_array_equal(np.concatenate([head, tail]), expected)
+
+
+# Sous VECTOR_MIN_KEYS clés le backend Python itère clé par clé, au-delà il vectorise
+@pytest.mark.parametrize('keys', [3, chaos_kernels.VECTOR_MIN_KEYS + 2])
+def test_generate_sequences_batch_matches_reference(backend, keys):
+    param_sets = make_param_sets(keys, seed=keys)
+    batch = ChaoticMaps.generate_sequences_batch(param_sets, LENGTH)
+    for k, params in enumerate(param_sets):
+        for seq, (name, x_key, p_key) in zip(batch, MAPS):
+            np.testing.assert_array_equal(seq[k], reference_orbit(name, params[x_key], params[p_key], LENGTH))
+
+
+def test_generate_sequences_matches_reference(backend):
+    for params in make_param_sets(3, seed=1):
+        for seq, (name, x_key, p_key) in zip(ChaoticMaps.generate_sequences(params, LENGTH), MAPS):
+            np.testing.assert_array_equal(seq, reference_orbit(name, params[x_key], params[p_key], LENGTH))
+
+
+def test_generate_keystream_batch_matches_per_key(backend):
+    param_sets = make_param_sets(5, seed=2)
+    batch = ChaoticMaps.generate_keystream_batch(param_sets, LENGTH, block_size=1000)
+    for k, params in enumerate(param_sets):
+        u, v, w = (reference_orbit(name, params[x_key], params[p_key], LENGTH) for name, x_key, p_key in MAPS)
+        expected = ChaoticMaps.generate_control_vectors(u, v, w)
+        np.testing.assert_array_equal(batch[k], np.stack(expected))
@@ -0,0 +1,187 @@
+# Clients concurrents contre deux workers: l'état partagé (sessions, jobs, base SQLite)
+# et les fichiers par session (artefacts) ne doivent pas se mélanger entre clients.
+#
+# Deux processus Flask indépendants partagent la même base d'état. Chaque client chiffre
+# sa propre image avec sa propre clé, puis lance l'analyse et le déchiffrement (mode
+# session) en alternant les workers, et vérifie que l'image déchiffrée est bien la sienne.
+# Un job asynchrone est soumis à un worker et suivi sur l'autre.
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import numpy as np
+import pytest
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BACKEND_DIR, 'static')
+SESSION_EXPORTS_DIR = os.path.join(STATIC_DIR, 'exports', 'sessions')
+WORKERS = 2
+CLIENTS = 4
+ROUNDS = 2
+SIZE = 48
+
+
+def _request(url, session_id, method='GET', body=None, content_type=None):
+    headers = {'X-Session-Id': session_id}
+    if content_type:
+        headers['Content-Type'] = content_type
+    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: image/png\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _png(image):
+    buf = io.BytesIO()
+    Image.fromarray(image).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_client(index, urls, failures, artifacts):
+    """Scénario complet d'un client; chaque requête part vers le worker suivant."""
+    session_id = f'client-{index:04d}-{uuid.uuid4().hex[:8]}'
+    rng = np.random.default_rng(index)
+    turn = index
+
+    def next_url():
+        nonlocal turn
+        turn += 1
+        return urls[turn % len(urls)]
+
+    def check(condition, message):
+        if not condition:
+            failures.append(f'client {index}: {message}')
+        return condition
+
+    for round_id in range(ROUNDS):
+        image = rng.integers(0, 256, (SIZE, SIZE + index % 3, 3), dtype=np.uint8)
+        log_x0 = round(0.1 + 0.01 * index + 0.001 * round_id, 6)
+        body, ctype = _multipart({'log_x0': log_x0}, {'image': ('img.png', _png(image))})
+
+        status, data = _request(f'{next_url()}/api/encrypt', session_id, 'POST', body, ctype)
+        if not check(status == 200, f'encrypt -> {status}'):
+            return
+        result = json.loads(data)
+        check(result['session_id'] == session_id, 'session id not echoed')
+
+        # Artefact chiffré: le même fichier, servi par chacun des workers
+        served = [_request(f"{url}{result['encrypted_url']}", session_id) for url in urls]
+        check(all(status == 200 for status, _ in served) and served[0][1] == served[1][1],
+              'encrypted artifact differs between workers')
+        artifacts.append((session_id, result['encrypted_url']))
+
+        status, data = _request(f'{next_url()}/api/result', session_id)
+        check(status == 200 and json.loads(data)['params']['log_x0'] == log_x0, 'result belongs to another client')
+
+        status, data = _request(f'{next_url()}/api/analysis', session_id)
+        check(status == 200 and json.loads(data)['metrics']['npcr'] > 99, f'analysis -> {status}')
+
+        status, data = _request(f'{next_url()}/api/decrypt', session_id, 'POST', b'{}', 'application/json')
+        if not check(status == 200, f'decrypt -> {status}'):
+            return
+        decrypted_url = json.loads(data)['decrypted_url']
+        artifacts.append((session_id, decrypted_url))
+        status, png = _request(f'{next_url()}{decrypted_url}', session_id)
+        decrypted = np.array(Image.open(io.BytesIO(png)).convert('RGB'))
+        check(decrypted.shape == image.shape and np.array_equal(decrypted, image), 'decrypted image mismatch')
+
+    # Job asynchrone soumis à un worker, suivi sur l'autre
+    body, ctype = _multipart({'async': '1'}, {'image': ('img.png', _png(image))})
+    status, data = _request(f'{next_url()}/api/encrypt', session_id, 'POST', body, ctype)
+    if not check(status == 202, f'async encrypt -> {status}'):
+        return
+    result_url = json.loads(data)['result_url']
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        status, data = _request(f'{next_url()}{result_url}', session_id)
+        if status != 202:
+            break
+        time.sleep(0.2)
+    check(status == 200 and json.loads(data)['status'] == 'success', f'async job result -> {status}')
+
+
+@pytest.fixture(scope='module')
+def worker_urls(tmp_path_factory):
+    """Lance deux processus serveur indépendants partageant la même base d'état."""
+    tmpdir = tmp_path_factory.mktemp('chaos_state')
+    # Pas de nettoyage par âge pendant le test: les fichiers de static/ créés ici sont retirés à la fin
+    env = dict(os.environ, STATE_BACKEND='sqlite', STATE_DB_PATH=str(tmpdir / 'state.sqlite3'),
+               RESULT_CACHE_DIR=str(tmpdir / 'results'), ARTIFACT_RETENTION_SECONDS=str(10 ** 9))
+    before = {d: set(os.listdir(d)) if os.path.isdir(d) else set() for d in (STATIC_DIR, SESSION_EXPORTS_DIR)}
+    procs, urls = [], []
+    for _ in range(WORKERS):
+        port = _free_port()
+        code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+        procs.append(subprocess.Popen([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        urls.append(f'http://127.0.0.1:{port}')
+    try:
+        for url in urls:
+            for _ in range(600):
+                try:
+                    urllib.request.urlopen(f'{url}/api/jobs', timeout=1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            else:
+                pytest.fail(f'Worker {url} did not start')
+        yield urls
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+        for d, names in before.items():
+            for name in set(os.listdir(d) if os.path.isdir(d) else ()) - names:
+                path = os.path.join(d, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+
+def test_sessions_and_artifacts_do_not_collide(worker_urls):
+    failures, artifacts = [], []
+    threads = [threading.Thread(target=run_client, args=(i, worker_urls, failures, artifacts))
+               for i in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not failures, '\n'.join(failures)
+    assert len(artifacts) == CLIENTS * ROUNDS * 2
+    # Aucun fichier de résultat n'est partagé entre deux sessions
+    owners = {}
+    for session_id, url in artifacts:
+        assert owners.setdefault(url, session_id) == session_id, f'{url} served to two sessions'
@@ -0,0 +1,80 @@
+# Le déchiffrement vectorisé (DecryptionService.decrypt_vector) doit reproduire exactement
+# la boucle CBC inverse d'origine, octet par octet, avec la bonne clé comme avec une mauvaise.
+import numpy as np
+import pytest
+
+from models.image_processor import ImageProcessor
+from services.chaotic_maps import ChaoticMaps
+from services.decryption_service import DecryptionService
+from services.encryption_service import EncryptionService
+from services.permutation import PermutationService
+
+PARAMS = {'log_x0': 0.1, 'log_mu': 3.99, 'tent_x0': 0.2, 'tent_r': 1.99, 'pwlcm_x0': 0.3, 'pwlcm_p': 0.254}
+WRONG_PARAMS = dict(PARAMS, log_x0=0.1 + 1e-12)
+
+# Tailles impaires et formes dégénérées (au moins 256 octets: la S-Box lit AL[:256])
+SIZES = [(7, 13), (9, 11), (1, 97), (31, 17), (89, 1)]
+
+
+def reference_decrypt(img_array, params):
+    """Boucle de déchiffrement d'origine (une itération Python par octet)."""
+    X_prime, N, M = ImageProcessor.vectorize(img_array)
+    total_pixels = 3 * N * M
+
+    u, v, w = ChaoticMaps.generate_sequences(params, total_pixels)
+    AL, BL, CL, C = ChaoticMaps.generate_control_vectors(u, v, w)
+    BL = BL.astype(np.uint8) | 1
+
+    P_Box = PermutationService.generate_permutation(AL)
+    S_Box = PermutationService.generate_sbox(P_Box, AL)
+    Inv_S_Box = np.zeros_like(S_Box)
+    for r in range(256):
+        Inv_S_Box[r] = np.argsort(S_Box[r])
+    Inv_S_Box = Inv_S_Box.astype(np.int32)
+    BL_inv = np.array([pow(int(b), -1, 256) for b in BL], dtype=np.int32)
+
+    iv_val = (int(np.sum(AL)) + int(np.sum(BL)) + int(np.sum(CL))) % 256
+
+    X_prime_int = X_prime.astype(np.int32)
+    AL_int, CL_int, C_int = AL.astype(np.int32), CL.astype(np.int32), C.astype(np.int32)
+    X_rec = np.zeros(total_pixels, dtype=np.uint8)
+    for i in range(total_pixels - 1, -1, -1):
+        prev_cipher = X_prime_int[i - 1] if i > 0 else iv_val
+        curr_cipher = X_prime_int[i]
+        if C_int[i] == 0:
+            temp = Inv_S_Box[AL_int[i], curr_cipher]
+        else:
+            temp = ((curr_cipher - CL_int[i]) * BL_inv[i]) % 256
+        X_rec[i] = temp ^ prev_cipher
+
+    X_final = np.bitwise_xor(X_rec, AL.astype(np.uint8))
+    return ImageProcessor.reshape(X_final, N, M)
+
+
+@pytest.fixture(params=SIZES, ids=lambda s: f'{s[0]}x{s[1]}')
+def encrypted(request):
+    rng = np.random.default_rng(sum(request.param))
+    plain = rng.integers(0, 256, (*request.param, 3), dtype=np.uint8)
+    cipher = EncryptionService.encrypt_image(plain, PARAMS)[0]
+    return plain, cipher
+
+
+def test_correct_key_matches_reference(encrypted):
+    plain, cipher = encrypted
+    vectorized = DecryptionService.decrypt_array(cipher, PARAMS)
+    np.testing.assert_array_equal(vectorized, reference_decrypt(cipher, PARAMS))
+    np.testing.assert_array_equal(vectorized, plain)
+
+
+def test_wrong_key_matches_reference(encrypted):
+    plain, cipher = encrypted
+    vectorized = DecryptionService.decrypt_array(cipher, WRONG_PARAMS)
+    np.testing.assert_array_equal(vectorized, reference_decrypt(cipher, WRONG_PARAMS))
+    assert not np.array_equal(vectorized, plain)
+
+
+def test_random_ciphertext_matches_reference():
+    # Chiffré quelconque (pas issu du chiffrement): toutes les branches sur des octets arbitraires
+    cipher = np.random.default_rng(7).integers(0, 256, (11, 23, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(DecryptionService.decrypt_array(cipher, PARAMS),
+                                  reference_decrypt(cipher, PARAMS))
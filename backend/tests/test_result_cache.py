@@ -0,0 +1,60 @@
+# Le cache de résultats (niveau disque partagé entre workers, sans TTL) ne doit contenir
+# aucune donnée équivalente à la clé: ni les paramètres, ni le journal du processus qui les cite.
+import glob
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import config
+from app import app
+from services.result_cache import RESULT_CACHE
+
+# Valeurs reconnaissables dans un fichier texte
+PARAMS = {'log_x0': 0.1234567, 'log_mu': 3.9876543, 'tent_x0': 0.2345671, 'tent_r': 1.9765432,
+          'pwlcm_x0': 0.3456712, 'pwlcm_p': 0.2567123}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(RESULT_CACHE, 'disk_dir', str(tmp_path))
+    monkeypatch.setattr(config, 'ARTIFACT_STORE', 'memory')
+    RESULT_CACHE.clear()
+    yield app.test_client()
+    RESULT_CACHE.clear()
+
+
+def _encrypt(client, png):
+    data = {'image': (io.BytesIO(png), 'image.png'), **{k: str(v) for k, v in PARAMS.items()}}
+    response = client.post('/api/encrypt?charts=data', data=data, headers={'X-Session-Id': 'cache-test-0001'})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_cached_entry_holds_no_key_material(client, tmp_path):
+    buf = io.BytesIO()
+    Image.fromarray(np.random.default_rng(5).integers(0, 256, (24, 37, 3), dtype=np.uint8)).save(buf, format='PNG')
+    first = _encrypt(client, buf.getvalue())
+    response = client.get('/api/analysis?charts=data', headers={'X-Session-Id': 'cache-test-0001'})
+    assert response.status_code == 200
+
+    files = glob.glob(os.path.join(str(tmp_path), '*.json'))
+    assert len(files) == 1
+    with open(files[0], encoding='utf-8') as f:
+        text = f.read()
+    entry = json.loads(text)
+    assert 'process_log' not in entry
+    assert entry['analysis'] is not None
+    for value in PARAMS.values():
+        assert repr(value) not in text and str(value)[2:] not in text
+
+    # Résultat réutilisé depuis le disque: journal reconstruit depuis les paramètres de la requête
+    RESULT_CACHE.clear()
+    second = _encrypt(client, buf.getvalue())
+    assert second['cached']
+    assert [e['step'] for e in second['process_log']] == [e['step'] for e in first['process_log']]
+    assert second['process_log'][2]['description'] == first['process_log'][2]['description']
+    assert second['charts'] == first['charts']
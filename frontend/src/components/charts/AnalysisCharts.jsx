@@ -0,0 +1,107 @@
+import React, { useEffect, useMemo, useRef } from 'react';
+import {
+    BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, CartesianGrid, ReferenceLine, Legend, Cell
+} from 'recharts';
+
+const COLORS = { red: '#ef4444', green: '#22c55e', blue: '#3b82f6' };
+
+// Séries d'octets envoyées en base64 par le backend (paires de corrélation, S-Box)
+export const decodeBytes = (b64) => Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+
+const axisStyle = { fill: '#94a3b8', fontSize: 11 };
+
+// Histogramme 256 niveaux à partir des comptages
+export const HistogramChart = ({ counts, channel, title }) => {
+    const data = useMemo(() => counts.map((count, value) => ({ value, count })), [counts]);
+    return (
+        <div>
+            <p className="text-sm text-gray-400 text-center mb-1">{title}</p>
+            <ResponsiveContainer width="100%" height={200}>
+                <BarChart data={data} barCategoryGap={0}>
+                    <XAxis dataKey="value" ticks={[0, 64, 128, 192, 255]} tick={axisStyle} />
+                    <YAxis tick={axisStyle} width={45} />
+                    <Tooltip contentStyle={{ background: '#0f172a', border: 'none' }} />
+                    <Bar dataKey="count" fill={COLORS[channel]} isAnimationActive={false} />
+                </BarChart>
+            </ResponsiveContainer>
+        </div>
+    );
+};
+
+// Nuage de corrélation (3000 points): dessiné sur un canvas plutôt qu'en SVG
+export const ScatterCanvas = ({ pairs, channel, title, size = 256 }) => {
+    const canvasRef = useRef(null);
+
+    useEffect(() => {
+        const canvas = canvasRef.current;
+        if (!canvas) return;
+        const ctx = canvas.getContext('2d');
+        const xs = decodeBytes(pairs.x);
+        const ys = decodeBytes(pairs.y);
+        ctx.fillStyle = '#020617';
+        ctx.fillRect(0, 0, size, size);
+        ctx.fillStyle = COLORS[channel];
+        const scale = size / 256;
+        for (let i = 0; i < xs.length; i++) {
+            ctx.fillRect(xs[i] * scale, size - (ys[i] + 1) * scale, scale, scale);
+        }
+    }, [pairs, channel, size]);
+
+    return (
+        <div>
+            <canvas ref={canvasRef} width={size} height={size} className="w-full rounded" />
+            <p className="text-xs text-gray-400 text-center mt-1">{title}</p>
+        </div>
+    );
+};
+
+// NPCR / UACI calculés face aux valeurs idéales
+export const DifferentialChart = ({ npcr, uaci }) => {
+    const data = [
+        { name: 'NPCR', calcule: npcr, ideal: 99.6094 },
+        { name: 'UACI', calcule: uaci, ideal: 33.4635 }
+    ];
+    return (
+        <div>
+            <p className="text-sm text-gray-400 text-center mb-1">Test Analyse Différentielle</p>
+            <ResponsiveContainer width="100%" height={260}>
+                <BarChart data={data}>
+                    <CartesianGrid strokeDasharray="3 3" stroke="#1e293b" />
+                    <XAxis dataKey="name" tick={axisStyle} />
+                    <YAxis tick={axisStyle} unit="%" />
+                    <Tooltip contentStyle={{ background: '#0f172a', border: 'none' }} />
+                    <Legend />
+                    <Bar dataKey="calcule" name="Calculé" fill="#3b82f6" />
+                    <Bar dataKey="ideal" name="Idéal" fill="#10b981" fillOpacity={0.5} />
+                </BarChart>
+            </ResponsiveContainer>
+        </div>
+    );
+};
+
+// Entropie de l'original et du chiffré face au maximum théorique (8 bits)
+export const EntropyChart = ({ original, encrypted }) => {
+    const data = [
+        { name: 'Original', value: original, color: '#ef4444' },
+        { name: 'Chiffré', value: encrypted, color: '#3b82f6' },
+        { name: 'Idéal (8)', value: 8, color: '#10b981' }
+    ];
+    return (
+        <div>
+            <p className="text-sm text-gray-400 text-center mb-1">Comparaison Entropie</p>
+            <ResponsiveContainer width="100%" height={260}>
+                <BarChart data={data}>
+                    <CartesianGrid strokeDasharray="3 3" stroke="#1e293b" />
+                    <XAxis dataKey="name" tick={axisStyle} />
+                    <YAxis tick={axisStyle} domain={[0, 8.5]} />
+                    <Tooltip contentStyle={{ background: '#0f172a', border: 'none' }}
+                             formatter={(v) => v.toFixed(4)} />
+                    <ReferenceLine y={8} stroke="#10b981" strokeDasharray="4 4" />
+                    <Bar dataKey="value" name="Entropie (bits)">
+                        {data.map((d) => <Cell key={d.name} fill={d.color} />)}
+                    </Bar>
+                </BarChart>
+            </ResponsiveContainer>
+        </div>
+    );
+};
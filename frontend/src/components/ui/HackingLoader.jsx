@@ -31,7 +31,7 @@ const HackingLoader = ({ messages = [] }) => {
             </div>
 
             <div className="font-mono text-sm text-primary animate-pulse text-center min-h-[1.5rem]">
-                {`> ${currentMessages[msgIndex]}`}
+                {`> ${currentMessages[msgIndex % currentMessages.length]}`}
             </div>
 
             <div className="flex gap-2 text-xs text-gray-500 font-mono">
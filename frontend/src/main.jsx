@@ -1,8 +1,18 @@
 import React from 'react'
 import ReactDOM from 'react-dom/client'
+import axios from 'axios'
 import App from './App.jsx'
 import './index.css'
 
+// Jeton de session client: isole les données de cet onglet/navigateur côté backend
+const SESSION_KEY = 'chaosSessionId'
+let sessionId = localStorage.getItem(SESSION_KEY)
+if (!sessionId) {
+    sessionId = crypto.randomUUID()
+    localStorage.setItem(SESSION_KEY, sessionId)
+}
+axios.defaults.headers.common['X-Session-Id'] = sessionId
+
 ReactDOM.createRoot(document.getElementById('root')).render(
     <React.StrictMode>
         <App />
@@ -1,6 +1,9 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { Download, Share2, BarChart2 } from 'lucide-react';
+import { HistogramChart, ScatterCanvas, DifferentialChart, EntropyChart } from '../components/charts/AnalysisCharts';
+
+const CHANNELS = [['red', 'Red'], ['green', 'Green'], ['blue', 'Blue']];
 
 const AnalysisPage = () => {
     const [data, setData] = useState(null);
@@ -19,13 +22,27 @@ const AnalysisPage = () => {
         fetchData();
     }, []);
 
-    const handleExport = () => {
-        window.location.href = 'http://localhost:5000/api/export/zip';
+    const handleExport = async () => {
+        // Téléchargé via axios: le jeton de session reste dans l'en-tête X-Session-Id, jamais dans l'URL
+        try {
+            const response = await axios.get('http://localhost:5000/api/export/zip', { responseType: 'blob' });
+            const url = URL.createObjectURL(response.data);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = 'output_graphs.zip';
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (error) {
+            console.error("Export error", error);
+        }
     };
 
     if (loading) return <div className="text-center mt-20">Calcul des métriques et génération des graphes...</div>;
     if (!data) return <div className="text-center mt-20 text-red-500">Aucune donnée d'analyse disponible. Veuillez chiffrer une image d'abord.</div>;
 
+    // Séries brutes (tracées ici) ou, si le serveur rend les PNG (charts=png), URLs des graphes
+    const charts = data.charts;
+
     return (
         <div className="space-y-12 animate-in fade-in duration-700">
             <div className="flex justify-between items-end">
@@ -71,9 +88,14 @@ const AnalysisPage = () => {
             <section>
                 <h3 className="text-xl font-bold mb-4 flex items-center gap-2"><BarChart2 /> Histogrammes</h3>
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
-                    {data.graphs.histograms.filter(p => p.includes('enc')).map((path, i) => (
+                    {charts ? CHANNELS.map(([channel, label]) => (
+                        <div key={channel} className="glass-card p-2 rounded-lg">
+                            <HistogramChart counts={charts.histograms.encrypted[channel]} channel={channel}
+                                            title={`Histogramme ${label} (Chiffré)`} />
+                        </div>
+                    )) : data.graphs.histograms.filter(p => p.includes('enc')).map((path, i) => (
                         <div key={i} className="glass-card p-2 rounded-lg">
-                            <img src={`http://localhost:5000${path}`} className="w-full rounded" alt="Histogram" />
+                            <img src={`http://localhost:5000${path}`} loading="lazy" className="w-full rounded" alt="Histogram" />
                         </div>
                     ))}
                 </div>
@@ -83,9 +105,14 @@ const AnalysisPage = () => {
             <section>
                 <h3 className="text-xl font-bold mb-4 flex items-center gap-2"><Share2 /> Corrélations (Chiffré)</h3>
                 <div className="grid grid-cols-3 md:grid-cols-6 gap-2">
-                    {data.graphs.correlation.filter(p => p.includes('enc')).slice(0, 6).map((path, i) => (
+                    {charts ? ['horizontal', 'vertical'].flatMap(direction => CHANNELS.map(([channel, label]) => (
+                        <div key={`${direction}-${channel}`} className="glass-card p-1 rounded-lg hover:scale-150 transition-transform z-0 hover:z-10 bg-dark-bg">
+                            <ScatterCanvas pairs={charts.correlation.encrypted[direction][channel]} channel={channel}
+                                           title={`${label} ${direction}`} />
+                        </div>
+                    ))) : data.graphs.correlation.filter(p => p.includes('enc')).slice(0, 6).map((path, i) => (
                         <div key={i} className="glass-card p-1 rounded-lg hover:scale-150 transition-transform z-0 hover:z-10 bg-dark-bg">
-                            <img src={`http://localhost:5000${path}`} className="w-full rounded" alt="Correlation" />
+                            <img src={`http://localhost:5000${path}`} loading="lazy" className="w-full rounded" alt="Correlation" />
                         </div>
                     ))}
                 </div>
@@ -95,9 +122,18 @@ const AnalysisPage = () => {
             <section>
                 <h3 className="text-xl font-bold mb-4">Métriques Visuelles</h3>
                 <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
-                    {data.graphs.metrics.map((path, i) => (
+                    {charts ? (
+                        <>
+                            <div className="glass-card p-4 rounded-xl">
+                                <DifferentialChart npcr={data.metrics.npcr} uaci={data.metrics.uaci} />
+                            </div>
+                            <div className="glass-card p-4 rounded-xl">
+                                <EntropyChart original={data.metrics.entropy.original} encrypted={data.metrics.entropy.encrypted} />
+                            </div>
+                        </>
+                    ) : data.graphs.metrics.map((path, i) => (
                         <div key={i} className="glass-card p-4 rounded-xl">
-                            <img src={`http://localhost:5000${path}`} className="w-full rounded" alt="Metric Plot" />
+                            <img src={`http://localhost:5000${path}`} loading="lazy" className="w-full rounded" alt="Metric Plot" />
                         </div>
                     ))}
                 </div>
@@ -66,7 +66,11 @@ const DecryptionPage = () => {
             }
         } catch (error) {
             console.error("Decryption error", error);
-            alert("Erreur lors du déchiffrement. Vérifiez la clé ou le fichier.");
+            if (error.response?.data?.code === 'key_mismatch') {
+                alert("Clé incorrecte : ces paramètres ne correspondent pas à l'image chiffrée.");
+            } else {
+                alert("Erreur lors du déchiffrement. Vérifiez la clé ou le fichier.");
+            }
         }
         setLoading(false);
     };
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { CheckCircle, AlertTriangle, Download, BarChart3, Unlock, Clock, Image as ImageIcon, Sparkles } from 'lucide-react';
@@ -11,6 +11,9 @@ const EncryptionPage = () => {
     const [loading, setLoading] = useState(true);
     const [result, setResult] = useState(null);
     const [error, setError] = useState(null);
+    const [liveSteps, setLiveSteps] = useState([]);
+    const [progress, setProgress] = useState(null);
+    const eventSourceRef = useRef(null);
 
     useEffect(() => {
         let active = true;
@@ -24,12 +27,29 @@ const EncryptionPage = () => {
                     const params = location.state.params;
                     Object.keys(params).forEach(key => formData.append(key, params[key]));
 
-                    const response = await axios.post('http://localhost:5000/api/encrypt', formData, {
+                    // Job asynchrone: les étapes et la progression arrivent en direct (SSE)
+                    const response = await axios.post('http://localhost:5000/api/encrypt?async=1', formData, {
                         headers: { 'Content-Type': 'multipart/form-data' }
                     });
+                    const job = response.data;
 
+                    await new Promise((resolve) => {
+                        const source = new EventSource(`http://localhost:5000${job.status_url}/events`);
+                        eventSourceRef.current = source;
+                        source.addEventListener('log', (e) => {
+                            const entry = JSON.parse(e.data);
+                            if (active) setLiveSteps(prev => [...prev, entry.step]);
+                        });
+                        source.addEventListener('progress', (e) => {
+                            if (active) setProgress(JSON.parse(e.data));
+                        });
+                        source.addEventListener('end', () => { source.close(); resolve(); });
+                        source.onerror = () => { source.close(); resolve(); };
+                    });
+
+                    const final = await axios.get(`http://localhost:5000${job.result_url}`);
                     if (active) {
-                        setResult(response.data);
+                        setResult(final.data);
                         setLoading(false);
                     }
                 } catch (err) {
@@ -63,19 +83,32 @@ const EncryptionPage = () => {
 
         startEncryption();
 
-        return () => { active = false; };
+        return () => {
+            active = false;
+            eventSourceRef.current?.close();
+        };
     }, []);
 
     if (loading) {
         return (
             <div className="flex flex-col items-center justify-center min-h-[60vh] animate-in fade-in">
-                <HackingLoader messages={[
+                <HackingLoader messages={liveSteps.length > 0 ? liveSteps.slice(-1) : [
                     "Initialisation des vecteurs chaotiques...",
                     "Génération des P-Box & S-Box dynamiques...",
                     "Injection de la condition initiale sensible...",
                     "Exécution des itérations de diffusion...",
                     "Application de la transformation affine..."
                 ]} />
+                {progress && (
+                    <div className="w-full max-w-md space-y-2">
+                        <div className="h-2 rounded-full bg-gray-200 dark:bg-white/10 overflow-hidden">
+                            <div className="h-full bg-primary transition-all" style={{ width: `${progress.percent}%` }} />
+                        </div>
+                        <p className="font-mono text-xs text-gray-500 text-center">
+                            {`${progress.bytes} / ${progress.total} octets • ${progress.mpixels_per_s.toFixed(2)} Mpixels/s`}
+                        </p>
+                    </div>
+                )}
             </div>
         );
     }